@@ -5,9 +5,20 @@ import sys
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, backend_dir)
 
-from neo4j import GraphDatabase
+from services.neo4j_driver import get_shared_driver, close_shared_drivers
+from services.etl.build_graph import assign_quote_seq
 from services.rag.embeddings import EmbeddingService
+from services.rag.cache import get_embedding_cache
+from services.rag.vector_index import (
+    EMBEDDING_STORE_PATH, NEO4J_VECTOR_INDEX, QuoteVectorIndex, export_embedding_store,
+    ensure_neo4j_vector_index, store_exists
+)
+from services.rag.similarity_graph import DEFAULT_QUOTE_K, build_similarity_graph
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm  # Progress bar
 
 from dotenv import load_dotenv
@@ -17,17 +28,91 @@ NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
-def generate_embeddings(limit=None, batch_size=50):
-    """Generate embeddings for all quotes"""
+# Pages walk the quote_seq_unique index in q.seq order, so each page is one
+# range seek instead of a scan and sort of every remaining quote
+FETCH_QUOTES_CYPHER = """
+MATCH (q:Quote)
+WHERE q.seq > $after AND q.embedding IS NULL
+RETURN elementId(q) as id, q.seq as seq,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) as text
+ORDER BY q.seq
+LIMIT $fetch_size
+"""
+
+# Seconds the producer waits on a full write queue before checking the writer
+WRITER_CHECK_INTERVAL = 1.0
+
+WRITE_EMBEDDINGS_CYPHER = """
+UNWIND $rows AS row
+MATCH (q:Quote)
+WHERE elementId(q) = row.id
+SET q.embedding = row.embedding
+"""
+
+
+def fetch_batches(driver, batch_size, fetch_size=1000, limit=None):
+    """
+    Stage 1: page through quotes without embeddings
+
+    Pages are keyed on the last q.seq seen, so quotes that are skipped or
+    still in flight are never fetched twice. Quotes must be numbered (see
+    assign_quote_seq) to be visited.
+
+    Yields:
+        (batch of {'id', 'text'} dicts, number of quotes skipped as too short)
+    """
+    after = -1
+    fetched = 0
+    while limit is None or fetched < limit:
+        page_size = fetch_size if limit is None else min(fetch_size, limit - fetched)
+        with driver.session() as session:
+            page = session.run(FETCH_QUOTES_CYPHER, after=after, fetch_size=page_size).data()
+        if not page:
+            return
+        after = page[-1]['seq']
+        fetched += len(page)
+        
+        valid = [q for q in page if q['text'] and len(q['text'].strip()) >= 5]
+        skipped = len(page) - len(valid)
+        for start in range(0, len(valid), batch_size):
+            yield valid[start:start + batch_size], skipped
+            skipped = 0
+        if not valid and skipped:
+            yield [], skipped
+
+
+def embed_batch(embedder, batch):
+    """Stage 2: embed one batch with a single batched request"""
+    embeddings = embedder.embed_text([q['text'] for q in batch])
+    embeddings = embeddings.reshape(len(batch), -1)
+    return [
+        {'id': q['id'], 'embedding': embedding.tolist()}
+        for q, embedding in zip(batch, embeddings)
+    ]
+
+
+def write_embeddings(tx, rows):
+    """Stage 3: store a batch of embeddings with one UNWIND"""
+    tx.run(WRITE_EMBEDDINGS_CYPHER, rows=rows)
+
+
+def generate_embeddings(limit=None, batch_size=50, concurrency=4, fetch_size=1000):
+    """
+    Generate embeddings for all quotes
+    
+    Runs as a three-stage pipeline: the main thread pages through quotes
+    missing embeddings, a pool of `concurrency` threads embeds batches, and
+    a writer thread stores each batch with one UNWIND ... SET. Every stage
+    is bounded, so at most about 2 * concurrency batches are in memory.
+    If the writer thread dies, the producer stops and raises its error.
+    """
     
     print("🔌 Connecting to Neo4j...")
-    driver = GraphDatabase.driver(
-        NEO4J_URI,
-        auth=(NEO4J_USER, NEO4J_PASSWORD)
-    )
+    driver = get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
     
     print("🤖 Initializing embedding service...")
-    embedder = EmbeddingService()
+    embedder = EmbeddingService(batch_size=batch_size, pool_size=concurrency,
+                                cache=get_embedding_cache())
     
     # Get count first
     with driver.session() as session:
@@ -42,62 +127,119 @@ def generate_embeddings(limit=None, batch_size=50):
     
     if total == 0:
         print("✅ All quotes already have embeddings!")
-        driver.close()
         return
     
+    # Paging follows q.seq, so number any quotes loaded with --no-seq
+    with driver.session() as session:
+        numbered = assign_quote_seq(session)
+    if numbered:
+        print(f"🔢 Numbered {numbered} quotes without q.seq")
+    
     if limit:
         total = min(total, limit)
         print(f"🎯 Processing first {total} quotes")
     
-    # Process in batches with progress bar
-    processed = 0
+    max_in_flight = concurrency * 2
+    write_queue = queue.Queue(maxsize=max_in_flight)
+    stats = {'processed': 0, 'failed': 0, 'skipped': 0}
+    writer_errors = []
+    started = time.perf_counter()
     
     with tqdm(total=total, desc="Generating embeddings") as pbar:
-        while processed < total:
-            # Fetch batch
-            with driver.session() as session:
-                result = session.run("""
-                    MATCH (q:Quote)
-                    WHERE q.embedding IS NULL
-                    RETURN elementId(q) as id, 
-                           coalesce(q.short_text, q.full_text, q.text) as text
-                    LIMIT $batch_size
-                """, batch_size=batch_size)
-                batch = list(result)
-            
-            if not batch:
-                break
-            
-            # Process batch
-            for quote in batch:
+        
+        def writer():
+            try:
+                with driver.session() as session:
+                    for rows in iter(write_queue.get, None):
+                        try:
+                            session.execute_write(write_embeddings, rows)
+                            stats['processed'] += len(rows)
+                        except Exception as e:
+                            print(f"\n⚠️  Write error: {e}")
+                            stats['failed'] += len(rows)
+                        pbar.update(len(rows))
+                        elapsed = time.perf_counter() - started
+                        pbar.set_postfix(rate=f"{stats['processed'] / max(elapsed, 1e-9):.1f} q/s")
+            except BaseException as e:
+                writer_errors.append(e)
+        
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        writer_thread.start()
+        
+        def put(item):
+            """write_queue.put that raises instead of blocking on a dead writer"""
+            while True:
+                if writer_errors:
+                    raise RuntimeError("Embedding writer stopped") from writer_errors[0]
                 try:
-                    text = quote['text']
-                    if not text or len(text.strip()) < 5:
-                        continue
-                    
-                    # Generate embedding
-                    embedding = embedder.embed_text(text)
-                    embedding_list = embedding.tolist()
-                    
-                    # Store in Neo4j
-                    with driver.session() as session:
-                        session.run("""
-                            MATCH (q:Quote)
-                            WHERE elementId(q) = $id
-                            SET q.embedding = $embedding
-                        """, id=quote['id'], embedding=embedding_list)
-                    
-                    processed += 1
-                    pbar.update(1)
-                    
-                except Exception as e:
-                    print(f"\n⚠️  Error: {e}")
+                    write_queue.put(item, timeout=WRITER_CHECK_INTERVAL)
+                    return
+                except queue.Full:
                     continue
-            
-            time.sleep(0.1)  # Brief pause
+        
+        def drain_one(pending):
+            future, batch = pending.popleft()
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"\n⚠️  Embedding error: {e}")
+                stats['failed'] += len(batch)
+                pbar.update(len(batch))
+                return
+            put(rows)
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = deque()
+            for batch, skipped in fetch_batches(driver, batch_size, fetch_size, limit):
+                stats['skipped'] += skipped
+                pbar.update(skipped)
+                if not batch:
+                    continue
+                pending.append((pool.submit(embed_batch, embedder, batch), batch))
+                if len(pending) >= max_in_flight:
+                    drain_one(pending)
+            while pending:
+                drain_one(pending)
+        
+        put(None)
+        writer_thread.join()
+        if writer_errors:
+            raise RuntimeError("Embedding writer stopped") from writer_errors[0]
     
-    print(f"\n✅ Successfully generated embeddings for {processed} quotes!")
-    driver.close()
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ Successfully generated embeddings for {stats['processed']} quotes "
+          f"in {elapsed:.1f}s ({stats['processed'] / max(elapsed, 1e-9):.1f} quotes/s sustained)")
+    if stats['skipped'] or stats['failed']:
+        print(f"   Skipped {stats['skipped']} short quotes, {stats['failed']} failed")
+
+
+def export_store(path=EMBEDDING_STORE_PATH):
+    """Write all quote embeddings to the memory-mapped store used by the RAG workers"""
+    driver = get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    print(f"💾 Exporting embeddings to {path}.manifest.json ...")
+    count = export_embedding_store(driver, path)
+    print(f"✅ Exported {count} embeddings")
+
+def create_vector_index():
+    """Create the Neo4j vector index used by retrieval_mode='neo4j'"""
+    driver = get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    dimensions = ensure_neo4j_vector_index(driver)
+    if dimensions is None:
+        print("⚠️  No embeddings found, skipping vector index creation")
+    else:
+        print(f"✅ Vector index {NEO4J_VECTOR_INDEX} ensured ({dimensions} dimensions)")
+
+def write_similarity_graph(path=EMBEDDING_STORE_PATH, k=DEFAULT_QUOTE_K):
+    """Precompute quote and author SIMILAR_TO edges from the embedding store"""
+    driver = get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    if store_exists(path):
+        index = QuoteVectorIndex.from_store(path)
+    else:
+        index = QuoteVectorIndex.from_neo4j(driver)
+    print(f"🕸️  Computing {k} nearest neighbours for {len(index)} quotes...")
+    stats = build_similarity_graph(driver, index, quote_k=k)
+    print(f"✅ Wrote {stats['quote_edges']} quote and {stats['author_edges']} author "
+          f"SIMILAR_TO edges (kNN {stats['knn_s']:.1f}s, write {stats['write_s']:.1f}s)")
 
 if __name__ == "__main__":
     import argparse
@@ -105,14 +247,40 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate embeddings for quotes')
     parser.add_argument('--limit', type=int, help='Limit number of quotes to process')
     parser.add_argument('--batch-size', type=int, default=50, help='Batch size')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Embedding requests in flight at once')
+    parser.add_argument('--fetch-size', type=int, default=1000,
+                        help='Quotes fetched from Neo4j per page')
+    parser.add_argument('--store', default=EMBEDDING_STORE_PATH,
+                        help='Base path of the memory-mapped embedding store')
+    parser.add_argument('--no-store', action='store_true', help='Skip exporting the embedding store')
+    parser.add_argument('--store-only', action='store_true',
+                        help='Only export the embedding store, do not generate embeddings')
+    parser.add_argument('--no-vector-index', action='store_true',
+                        help='Skip creating the Neo4j vector index on Quote.embedding')
+    parser.add_argument('--similarity', action='store_true',
+                        help='Also precompute quote and author SIMILAR_TO edges')
+    parser.add_argument('--similar-k', type=int, default=DEFAULT_QUOTE_K,
+                        help='Neighbours per quote for --similarity')
     
     args = parser.parse_args()
     
     try:
-        generate_embeddings(limit=args.limit, batch_size=args.batch_size)
+        if not args.store_only:
+            generate_embeddings(limit=args.limit, batch_size=args.batch_size,
+                                concurrency=args.concurrency, fetch_size=args.fetch_size)
+        if not args.no_vector_index:
+            create_vector_index()
+        if not args.no_store:
+            export_store(args.store)
+        if args.similarity:
+            write_similarity_graph(args.store, args.similar_k)
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupted by user")
     except Exception as e:
         print(f"\n❌ Error: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        # One driver served every step above
+        close_shared_drivers()
\ No newline at end of file
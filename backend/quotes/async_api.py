@@ -0,0 +1,71 @@
+"""
+Async (ASGI) counterpart of DRF's @api_view
+
+DRF views are synchronous, so under ASGI every one of them would occupy a
+worker thread for the whole request. Views wrapped here are native
+coroutines that still go through an APIView for everything around the
+handler: authentication, permissions, throttling, content negotiation,
+exception handling and rendering use the configured DRF classes (in a
+thread, since they may touch the database), and only the view itself
+awaits its I/O on the event loop.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+def prepare_request(api_view: APIView, request):
+    """Run APIView.initial (auth, permissions, throttles, negotiation) and parse the body"""
+    if request.method.lower() not in api_view.http_method_names:
+        raise MethodNotAllowed(request.method)
+    api_view.initial(request)
+    # Evaluate the lazy body here, outside the event loop
+    request.data
+
+
+def finalize_response(api_view: APIView, request, response):
+    """APIView.finalize_response, rendering DRF Responses as dispatch would"""
+    response = api_view.finalize_response(request, response)
+    if isinstance(response, Response):
+        response.render()
+    return response
+
+
+def async_api_view(methods=('GET',), permission_class=AllowAny):
+    """
+    Decorate an `async def view(request, ...)` that receives a DRF Request
+    and returns a DRF Response (or any HttpResponse, e.g. a stream)
+
+    Args:
+        methods: Allowed HTTP methods
+        permission_class: DRF permission checked before the view runs
+    """
+    def decorator(view):
+        class AsyncAPIView(APIView):
+            http_method_names = [method.lower() for method in methods]
+            permission_classes = [permission_class]
+
+        AsyncAPIView.__name__ = view.__name__
+        AsyncAPIView.__doc__ = view.__doc__
+
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            api_view = AsyncAPIView()
+            api_view.args, api_view.kwargs = args, kwargs
+            api_view.headers = api_view.default_response_headers
+            drf_request = api_view.initialize_request(request, *args, **kwargs)
+            api_view.request = drf_request
+            try:
+                await sync_to_async(prepare_request)(api_view, drf_request)
+                response = await view(drf_request, *args, **kwargs)
+            except Exception as exc:
+                response = await sync_to_async(api_view.handle_exception)(exc)
+            return await sync_to_async(finalize_response)(api_view, drf_request, response)
+
+        # Like APIView.as_view: CSRF is enforced by SessionAuthentication only
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
@@ -6,8 +6,8 @@ CALL db.index.fulltext.queryNodes('quoteTextIndex', $q)
 YIELD node AS q, score
 MATCH (q)-[:SAID]-(a:Author)
 RETURN elementId(q) AS qid,
-       q.text_clean AS short_text,
-       q.text_clean AS full_text,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) AS short_text,
+       coalesce(q.full_text, q.short_text, q.text_clean, q.text) AS full_text,
        a.name AS author,
        score
 ORDER BY score DESC
@@ -18,11 +18,17 @@ DETAIL_BY_ID = """
 MATCH (q:Quote)-[:SAID]-(a:Author)
 WHERE elementId(q) = $qid
 RETURN elementId(q) AS qid,
-       q.text_clean AS short_text,
-       q.full_text AS full_text,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) AS short_text,
+       coalesce(q.full_text, q.short_text, q.text_clean, q.text) AS full_text,
        collect(a.name) AS authors,
        null AS year,
        null AS page,
        null AS rev_id,
        null AS section
-"""
\ No newline at end of file
+"""
+
+# Bumped by the ETL after every load (services/etl/build_graph.bump_graph_version)
+GRAPH_VERSION = """
+OPTIONAL MATCH (v:GraphVersion {name: 'graph'})
+RETURN coalesce(v.version, 0) AS version
+"""
@@ -1,33 +1,172 @@
 import os
-from neo4j import GraphDatabase
+import json
+import asyncio
+import threading
+import weakref
+from services.loop_resources import loop_resource, loop_resources
+from services.neo4j_driver import create_driver, get_shared_driver, pool_stats, shared_pool_stats
 
 _URI = os.getenv("NEO4J_URI")
 _USER = os.getenv("NEO4J_USER")
 _PASS = os.getenv("NEO4J_PASSWORD")
 _DB   = os.getenv("NEO4J_DATABASE")
 
-_driver = None
+# Identical concurrent reads share one database call (set to 'false' to disable)
+SINGLE_FLIGHT = os.getenv("NEO4J_SINGLE_FLIGHT", "true").lower() == "true"
 
 def get_driver():
-    global _driver
-    if _driver is None:
-        _driver = GraphDatabase.driver(_URI, auth=(_USER, _PASS))
-    return _driver
+    """The process-wide driver, shared with RAGChatbot, neomodel and the services"""
+    return get_shared_driver(_URI, _USER, _PASS)
+
+def get_async_driver():
+    """Async driver for the running event loop (one per ASGI worker), closed
+    with the loop (see services.loop_resources)"""
+    return loop_resource(
+        "neo4j",
+        lambda: create_driver(_URI, _USER, _PASS, asynchronous=True),
+        lambda driver: driver.close(),
+    )
+
+# ---- SINGLE-FLIGHT (collapse identical concurrent reads) ----
+class _Call:
+    """One in-flight sync read that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.rows = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+# In-flight async reads, per event loop: key -> Task
+_async_calls = weakref.WeakKeyDictionary()
+_flight_stats = {"executed": 0, "deduplicated": 0}
+
+
+def _flight_key(cypher: str, params: dict):
+    return (_DB, cypher, json.dumps(params, sort_keys=True, default=str))
+
+
+def _count(name: str):
+    with _calls_lock:
+        _flight_stats[name] += 1
+
+
+def single_flight_stats() -> dict:
+    """Reads executed and reads answered by joining an identical one in flight"""
+    with _calls_lock:
+        executed, deduplicated = _flight_stats["executed"], _flight_stats["deduplicated"]
+        in_flight = len(_calls) + sum(len(calls) for calls in list(_async_calls.values()))
+    total = executed + deduplicated
+    return {
+        "enabled": SINGLE_FLIGHT,
+        "executed": executed,
+        "deduplicated": deduplicated,
+        "dedup_rate": deduplicated / total if total else 0.0,
+        "in_flight": in_flight,
+    }
+
 
 # ---- SAFE READ HELPERS (materialize inside the session) ----
-def run_read(cypher: str, params: dict):
-    """Return a list[dict] where each dict is a record (keys → values)."""
+def _run_read(cypher: str, params: dict):
     def _work(tx):
         res = tx.run(cypher, **params)
         return [r.data() for r in res]   # materialize before session closes
     with get_driver().session(database=_DB) as session:
         return session.execute_read(_work)
 
+def run_read(cypher: str, params: dict):
+    """Return a list[dict] where each dict is a record (keys → values).
+
+    A call made while an identical (cypher, params) read is running waits
+    for that read and gets its rows instead of querying again. Each caller
+    gets its own list, but the record dicts are shared: do not mutate them.
+    """
+    if not SINGLE_FLIGHT:
+        _count("executed")
+        return _run_read(cypher, params)
+
+    key = _flight_key(cypher, params)
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+            _flight_stats["executed"] += 1
+        else:
+            _flight_stats["deduplicated"] += 1
+
+    if leader:
+        try:
+            call.rows = _run_read(cypher, params)
+        except BaseException as e:
+            call.error = e
+        finally:
+            with _calls_lock:
+                del _calls[key]
+            call.done.set()
+    else:
+        call.done.wait()
+
+    if call.error is not None:
+        raise call.error
+    return list(call.rows)
+
 def run_read_one(cypher: str, params: dict):
     """Return a single dict or None."""
     rows = run_read(cypher, params)
     return rows[0] if rows else None
 
+async def _arun_read(cypher: str, params: dict):
+    async def _work(tx):
+        res = await tx.run(cypher, **params)
+        return [r.data() async for r in res]
+    async with get_async_driver().session(database=_DB) as session:
+        return await session.execute_read(_work)
+
+async def arun_read(cypher: str, params: dict):
+    """Async run_read for ASGI views, single-flight within the event loop.
+
+    The read runs in its own task, so a waiter that is cancelled (e.g. the
+    client went away) does not cancel it for the others.
+    """
+    if not SINGLE_FLIGHT:
+        _count("executed")
+        return await _arun_read(cypher, params)
+
+    loop = asyncio.get_running_loop()
+    calls = _async_calls.get(loop)
+    if calls is None:
+        calls = _async_calls[loop] = {}
+    key = _flight_key(cypher, params)
+    task = calls.get(key)
+    if task is None:
+        task = calls[key] = loop.create_task(_arun_read(cypher, params))
+
+        def _finished(t):
+            calls.pop(key, None)
+            # Retrieve the error even if every waiter was cancelled
+            if not t.cancelled():
+                t.exception()
+
+        task.add_done_callback(_finished)
+        _count("executed")
+    else:
+        _count("deduplicated")
+    return list(await asyncio.shield(task))
+
+async def arun_read_one(cypher: str, params: dict):
+    rows = await arun_read(cypher, params)
+    return rows[0] if rows else None
+
+def connection_pool_stats() -> dict:
+    """In-use/idle/waiting connections of every shared driver and of the async drivers"""
+    return {
+        "shared": shared_pool_stats(),
+        "async": [pool_stats(driver) for driver in loop_resources("neo4j")],
+    }
+
 def health_check_details() -> dict:
     try:
         row = run_read_one("RETURN 1 AS ok", {})
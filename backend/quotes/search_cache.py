@@ -0,0 +1,189 @@
+"""
+Two-level cache for quote search results
+
+Results are keyed by (normalized query, k) in a per-process LRU, in front
+of an optional Django cache shared by every worker (the 'search' alias in
+settings.CACHES). Keys also carry the graph version the ETL bumps after
+each load, so a reload invalidates both levels at once; workers notice the
+new version within GRAPH_VERSION_TTL seconds.
+"""
+import hashlib
+import os
+import time
+import unicodedata
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.autocomplete.prefix_index import MAX_TOKENS, tokenize
+from services.rag.cache import LRUCache
+
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '4096'))
+
+# Seconds a result stays valid if the graph version never changes
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', '600'))
+
+# Seconds between graph version checks
+GRAPH_VERSION_TTL = float(os.getenv('GRAPH_VERSION_TTL', '30'))
+
+# Shortest cached query tried when answering a longer one by filtering
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize_query(q: str, casefold: bool = False) -> str:
+    """NFC, single spaces, and case folded if the backend ignores case"""
+    q = " ".join(unicodedata.normalize("NFC", q).split())
+    return q.casefold() if casefold else q
+
+
+def prefix_match(query: str, row: Dict) -> bool:
+    """Whether the prefix backend would return a search row for query
+
+    Mirrors PrefixIndex.search_ids for a stripped query: every word but
+    the last is a whole token of the quote or its author, the last a prefix.
+    """
+    words = tokenize(query)
+    if not words:
+        return False
+    tokens = (tokenize(row.get('short_text') or '') + tokenize(row.get('author') or ''))[:MAX_TOKENS]
+    return (all(w in tokens for w in words[:-1])
+            and any(t.startswith(words[-1]) for t in tokens))
+
+
+class SearchCache:
+    """Search results by (normalized query, k), per process and optionally shared
+
+    With a match predicate, a query that misses is answered from a cached
+    shorter prefix of it, by filtering those rows with the predicate. This
+    is only exact for backends whose matches for a longer query are a
+    subset of those for its prefix, in the same order (the prefix index,
+    not Lucene scoring); and only when the prefix's results were complete
+    (fewer than k) or enough of them survive the filter.
+    """
+
+    def __init__(self, maxsize: int = SEARCH_CACHE_SIZE, ttl: Optional[float] = SEARCH_CACHE_TTL,
+                 shared=None, match: Optional[Callable[[str, Dict], bool]] = None,
+                 casefold: bool = False, load_version: Optional[Callable[[], Awaitable[int]]] = None,
+                 version_ttl: float = GRAPH_VERSION_TTL):
+        """
+        Args:
+            maxsize: Entries kept per process
+            ttl: Seconds an entry stays valid in either level
+            shared: Django cache used as the second level (None: per process only)
+            match: (query, row) -> bool for prefix reuse (None: disabled)
+            casefold: Whether queries differing only in case share entries
+            load_version: Coroutine function returning the current graph version
+            version_ttl: Seconds between load_version calls
+        """
+        self.local = LRUCache(maxsize, ttl)
+        self.ttl = ttl
+        self.shared = shared
+        self.match = match
+        self.casefold = casefold
+        self.load_version = load_version
+        self.version_ttl = version_ttl
+        self.version = 0
+        self._version_at = None
+        self.counts = {'local': 0, 'shared': 0, 'prefix': 0, 'miss': 0}
+
+    def key(self, q: str, k: int):
+        return (self.version, normalize_query(q, self.casefold), k)
+
+    @staticmethod
+    def shared_key(key) -> str:
+        version, q, k = key
+        digest = hashlib.sha256(q.encode("utf-8")).hexdigest()
+        return f"quote-search:{version}:{k}:{digest}"
+
+    async def refresh_version(self):
+        """Reload the graph version if it is older than version_ttl
+
+        A changed version makes every cached key unreachable; the local
+        level is cleared so it does not hold dead entries.
+        """
+        if self.load_version is None:
+            return
+        now = time.monotonic()
+        if self._version_at is not None and now - self._version_at < self.version_ttl:
+            return
+        self._version_at = now
+        try:
+            version = await self.load_version()
+        except Exception as e:
+            print(f"⚠️  Graph version check failed: {e}")
+            return
+        if version != self.version:
+            self.local.clear()
+            self.version = version
+
+    def _from_prefix(self, key) -> Optional[Dict]:
+        version, q, k = key
+        for length in range(len(q) - 1, MIN_PREFIX_LENGTH - 1, -1):
+            cached = self.local.get((version, q[:length], k))
+            if cached is None or cached['corrected'] is not None:
+                continue
+            rows = [r for r in cached['rows'] if self.match(q, r)]
+            # Empty answers go to the backend, which may spell-correct them
+            if rows and (len(cached['rows']) < k or len(rows) >= k):
+                return {'rows': rows[:k], 'corrected': None}
+        return None
+
+    async def get(self, q: str, k: int) -> Optional[Dict]:
+        """Cached {'rows', 'corrected'} for a query, or None"""
+        await self.refresh_version()
+        key = self.key(q, k)
+        value = self.local.get(key)
+        if value is not None:
+            self.counts['local'] += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                value = await self.shared.aget(self.shared_key(key))
+            except Exception as e:
+                print(f"⚠️  Shared search cache read failed: {e}")
+            if value is not None:
+                self.local.set(key, value)
+                self.counts['shared'] += 1
+                return value
+
+        if self.match is not None:
+            value = self._from_prefix(key)
+            if value is not None:
+                self.local.set(key, value)
+                self.counts['prefix'] += 1
+                return value
+
+        self.counts['miss'] += 1
+        return None
+
+    async def set(self, q: str, k: int, value: Dict):
+        """Store {'rows', 'corrected'} in both levels"""
+        key = self.key(q, k)
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.aset(self.shared_key(key), value, self.ttl)
+            except Exception as e:
+                print(f"⚠️  Shared search cache write failed: {e}")
+
+    def invalidate(self):
+        """Drop this process's entries and recheck the graph version on the next lookup
+
+        Shared entries are left to expire: once the ETL has bumped the
+        version they can no longer be reached.
+        """
+        self.local.clear()
+        self._version_at = None
+
+    def stats(self) -> Dict:
+        """Hits by level, misses and local size"""
+        total = sum(self.counts.values())
+        hits = total - self.counts['miss']
+        return {
+            **{f'{level}_hits': n for level, n in self.counts.items() if level != 'miss'},
+            'misses': self.counts['miss'],
+            'hit_rate': hits / total if total else 0.0,
+            'size': len(self.local),
+            'maxsize': self.local.maxsize,
+            'version': self.version,
+            'shared': self.shared is not None,
+        }
@@ -9,4 +9,5 @@ urlpatterns = [
     path('favorites/', views.favorite_quotes),
     path('favorites/<int:favorite_id>/', views.delete_favorite),
     path("chat/", views.chat_with_quotes),
+    path("chat/stream/", views.chat_with_quotes_stream),
 ]
@@ -3,14 +3,24 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from .neo4j_client import run_read, run_read_one, health_check_details
-from .cypher import AUTOCOMPLETE, DETAIL_BY_ID
+from .neo4j_client import (get_driver, run_read, run_read_one, arun_read, arun_read_one,
+                           health_check_details, single_flight_stats,
+                           connection_pool_stats)
+from .async_api import async_api_view
+from .cypher import AUTOCOMPLETE, DETAIL_BY_ID, GRAPH_VERSION
+from .search_cache import SearchCache, prefix_match
 from .serializers import QueryHistorySerializer, FavoriteQuoteSerializer
 from .models import QueryHistory, FavoriteQuote
 from services.rag.rag_chatbot import RAGChatbot
+from services.autocomplete.prefix_index import get_shared_engine, get_loaded_engine
 from django.conf import settings
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
 from dotenv import load_dotenv
 import os
+import asyncio
+import threading
+import json
 
 # Load credentials
 load_dotenv()
@@ -18,6 +28,147 @@ NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
+# 'prefix' answers search from the in-memory autocomplete index, 'neo4j' from
+# the fulltext index
+SEARCH_BACKEND = os.getenv('QUOTE_SEARCH_BACKEND', 'neo4j')
+
+# Results returned by search when the request does not ask for k
+SEARCH_DEFAULT_K = 8
+
+# Whether searches with no results are retried spell-corrected. Correction
+# uses the autocomplete index, so with the 'neo4j' backend that index is
+# loaded (or built from Neo4j) on the first empty search
+SEARCH_SPELLING = os.getenv('QUOTE_SEARCH_SPELLING', 'true').lower() == 'true'
+
+# Shared RAG chatbot (one per worker process, created on first chat request)
+chatbot = None
+chatbot_lock = threading.Lock()
+
+def get_chatbot():
+    global chatbot
+    if chatbot is None:
+        with chatbot_lock:
+            if chatbot is None:
+                instance = RAGChatbot(
+                    neo4j_uri=NEO4J_URI,
+                    neo4j_user=NEO4J_USER,
+                    neo4j_password=NEO4J_PASSWORD,
+                    llm_provider="ollama",  # or make this configurable
+                    llm_config={'model': 'llama3.2:3b'},
+                    check_connections=False
+                )
+                instance.start_health_monitor(
+                    interval=float(os.getenv('RAG_HEALTH_CHECK_INTERVAL', '60'))
+                )
+                chatbot = instance
+    return chatbot
+
+
+# Search result cache (one per worker process, created on first search)
+search_cache = None
+search_cache_lock = threading.Lock()
+
+
+async def graph_version():
+    row = await arun_read_one(GRAPH_VERSION, {})
+    return row["version"] if row else 0
+
+
+def get_search_cache():
+    """The process-wide search cache, shared across workers through the
+    'search' alias of settings.CACHES when it is configured"""
+    global search_cache
+    if search_cache is None:
+        with search_cache_lock:
+            if search_cache is None:
+                prefix = SEARCH_BACKEND == 'prefix'
+                search_cache = SearchCache(
+                    shared=caches['search'] if 'search' in settings.CACHES else None,
+                    match=prefix_match if prefix else None,
+                    casefold=prefix,
+                    load_version=graph_version,
+                )
+    return search_cache
+
+
+def invalidate_search_cache():
+    """Forget this worker's cached search results (the ETL invalidates all
+    workers by bumping the graph version)"""
+    if search_cache is not None:
+        search_cache.invalidate()
+
+
+def prefix_search(q, k):
+    """Search rows in the AUTOCOMPLETE Cypher shape from the in-memory index,
+    and the spell-corrected query if one was needed"""
+    engine = get_shared_engine(get_driver())
+    entries, corrected = engine.search_quotes(q, k)
+    return [{
+        "qid": e["id"],
+        "short_text": e["text"],
+        "full_text": e["text"],
+        "author": e["author"],
+        "score": e["score"],
+    } for e in entries], corrected
+
+
+# Set once the speller failed to load, so empty searches do not retry it
+speller_failed = False
+
+
+def get_speller():
+    """The autocomplete engine used for typo correction, loaded on first use,
+    or None if correction is disabled or the index could not be loaded"""
+    global speller_failed
+    engine = get_loaded_engine()
+    if engine is None and SEARCH_SPELLING and not speller_failed:
+        try:
+            engine = get_shared_engine(get_driver())
+        except Exception as e:
+            speller_failed = True
+            print(f"⚠️  Spelling correction unavailable: {e}")
+    return engine
+
+
+async def search_rows(q, k):
+    """Returns (rows, corrected query or None)"""
+    if SEARCH_BACKEND == 'prefix':
+        try:
+            # The first call loads (or builds) the index, so keep it off the loop
+            return await asyncio.to_thread(prefix_search, q, k)
+        except Exception as e:
+            print(f"⚠️  Prefix search failed, using Neo4j: {e}")
+    rows = await arun_read(AUTOCOMPLETE, {"q": q, "k": k})
+    if rows:
+        return rows, None
+    # The first call may load the index, so keep it off the loop
+    engine = await asyncio.to_thread(get_speller)
+    if engine is not None:
+        corrected = engine.correct_query(q)
+        if corrected is not None:
+            return await arun_read(AUTOCOMPLETE, {"q": corrected, "k": k}), corrected
+    return rows, None
+
+
+async def search_hits(q, k):
+    """Search results as the search endpoint returns them, through the
+    search cache; returns (hits, corrected query or None)"""
+    cache = get_search_cache()
+    cached = await cache.get(q, k)
+    if cached is None:
+        rows, corrected = await search_rows(q, k)
+        await cache.set(q, k, {"rows": rows, "corrected": corrected})
+    else:
+        rows, corrected = cached["rows"], cached["corrected"]
+    return [{
+        "quote_id": r["qid"],
+        "text": r["short_text"],
+        "short_text": r["short_text"],
+        "full_text": r["full_text"],
+        "author": r.get("author"),
+        "score": r["score"],
+    } for r in rows], corrected
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -25,40 +176,40 @@ def healthz(request):
     """Health check endpoint"""
     details = health_check_details()
     return Response(
-        {"neo4j_ok": details["ok"], "error": details["error"]},
+        {
+            "neo4j_ok": details["ok"],
+            "error": details["error"],
+            "rag_cache": RAGChatbot.cache_stats(),
+            "rag_health": chatbot.health if chatbot is not None else None,
+            "rag_hybrid": chatbot.hybrid.stats() if chatbot is not None and chatbot.hybrid is not None else None,
+            "search_cache": search_cache.stats() if search_cache is not None else None,
+            "neo4j_single_flight": single_flight_stats(),
+            "neo4j_pool": connection_pool_stats(),
+        },
         status=200
     )
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def search_quotes(request):
+@async_api_view(['GET'], permission_class=AllowAny)
+async def search_quotes(request):
     """Search quotes endpoint"""
     q = (request.query_params.get("q") or "").strip()
     try:
-        k = int(request.query_params.get("k", 8))
+        k = int(request.query_params.get("k", SEARCH_DEFAULT_K))
     except ValueError:
-        k = 8
+        k = SEARCH_DEFAULT_K
     k = max(1, min(k, 20))
     
     if len(q) < 2:
         return Response({"results": [], "query": q, "count": 0}, status=200)
 
     try:
-        rows = run_read(AUTOCOMPLETE, {"q": q, "k": k})
-        hits = [{
-            "quote_id": r["qid"],
-            "text": r["short_text"],
-            "short_text": r["short_text"],
-            "full_text": r["full_text"],
-            "author": r.get("author"),
-            "score": r["score"],
-        } for r in rows]
+        hits, corrected = await search_hits(q, k)
         
         # Track query history (only if user is authenticated)
         if request.user and request.user.is_authenticated:
             try:
-                QueryHistory.objects.create(
+                await QueryHistory.objects.acreate(
                     user=request.user,
                     query_text=q,
                     results_found=len(hits)
@@ -70,6 +221,7 @@ def search_quotes(request):
             "success": True,
             "results": hits,
             "query": q,
+            "corrected_query": corrected,
             "count": len(hits)
         }, status=200)
         
@@ -175,9 +327,8 @@ def delete_favorite(request, favorite_id):
             'error': 'Favorite not found'
         }, status=status.HTTP_404_NOT_FOUND)
     
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def chat_with_quotes(request):
+@async_api_view(['POST'], permission_class=IsAuthenticated)
+async def chat_with_quotes(request):
     """RAG-powered conversational quote search"""
     query = request.data.get('query', '').strip()
     username = request.data.get('username')
@@ -190,18 +341,8 @@ def chat_with_quotes(request):
         }, status=400)
     
     try:
-        # Initialize RAG chatbot
-        chatbot = RAGChatbot(
-            neo4j_uri=NEO4J_URI,
-            neo4j_user=NEO4J_USER,
-            neo4j_password=NEO4J_PASSWORD,
-            llm_provider="ollama",  # or make this configurable
-            llm_config={'model': 'llama3.2:3b'}
-        )
-        
-        # Get RAG response
-        result = chatbot.query(query, username, accent)
-        chatbot.close()
+        # Get RAG response without holding a thread while Ollama generates
+        result = await get_chatbot().aquery(query, username, accent)
         
         return Response({
             'success': True,
@@ -216,4 +357,45 @@ def chat_with_quotes(request):
         return Response({
             'success': False,
             'error': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@async_api_view(['POST'], permission_class=IsAuthenticated)
+async def chat_with_quotes_stream(request):
+    """Streaming variant of chat_with_quotes (server-sent events)
+    
+    Emits a 'quotes' event once retrieval finishes, one 'token' event per
+    generated chunk and a final 'done' event with the full response. The
+    events come from an async generator: under ASGI Django would read a
+    sync iterator to the end before sending anything.
+    """
+    query = request.data.get('query', '').strip()
+    username = request.data.get('username')
+    accent = request.data.get('accent', 'american')
+    
+    if not query:
+        return Response({
+            'success': False,
+            'error': 'Query required'
+        }, status=400)
+    
+    async def events():
+        try:
+            async for item in get_chatbot().aquery_stream(query, username, accent):
+                yield sse_event(item['event'], item['data'])
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            import traceback
+            traceback.print_exc()
+            yield sse_event('error', {'error': str(e)})
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
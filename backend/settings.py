@@ -15,6 +15,7 @@ from dotenv import load_dotenv
 import os
 import sys
 from neomodel import config
+from services.neo4j_driver import get_shared_driver
 
 load_dotenv()
 
@@ -144,12 +145,35 @@ else:
     }
 
 
+# Caches: per-process by default; SEARCH_CACHE_LOCATION adds a 'search'
+# cache shared by all workers for quote search results. The default backend
+# ships with Django (LOCATION is a directory shared by the workers on one
+# host); to share across hosts set SEARCH_CACHE_BACKEND, e.g. to
+# django.core.cache.backends.redis.RedisCache, and install its client library
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+if os.environ.get("SEARCH_CACHE_LOCATION"):
+    CACHES["search"] = {
+        "BACKEND": os.environ.get(
+            "SEARCH_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ["SEARCH_CACHE_LOCATION"],
+        "KEY_PREFIX": "wikiquote",
+    }
+
+
 # Neo4j Configuration
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
-# Configure neomodel
-config.DATABASE_URL = f"{NEO4J_URI.replace('neo4j+s://', 'bolt+s://')}?user={NEO4J_USER}&password={NEO4J_PASSWORD}"
+# Configure neomodel on the shared driver, so it uses the same connection pool
+# as the views (the driver connects lazily, on first query). neomodel prefers
+# DATABASE_URL when set, so clear its default.
+config.DATABASE_URL = None
+config.DRIVER = get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
 config.AUTO_INSTALL_LABELS = True
 config.FORCE_TIMEZONE = True
 
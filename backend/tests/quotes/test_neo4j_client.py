@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+import pytest
+
+
+@pytest.fixture
+def client(mocker):
+    """neo4j_client with fresh single-flight counters"""
+    from backend.quotes import neo4j_client
+
+    mocker.patch.object(neo4j_client, 'SINGLE_FLIGHT', True)
+    mocker.patch.dict(neo4j_client._flight_stats, {'executed': 0, 'deduplicated': 0})
+    return neo4j_client
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Test identical concurrent reads share one Neo4j call"""
+
+    def test_concurrent_sync_reads_share_one_call(self, client, mocker):
+        """Test threads asking for the same read wait for the first one"""
+        release = threading.Event()
+
+        def slow_read(cypher, params):
+            release.wait(5)
+            return [{'qid': 'q1'}]
+
+        run = mocker.patch.object(client, '_run_read', side_effect=slow_read)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.run_read('MATCH', {'q': 'lo'})))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        while client.single_flight_stats()['deduplicated'] < 7:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert run.call_count == 1
+        assert results == [[{'qid': 'q1'}]] * 8
+        assert results[0] is not results[1]
+        assert client.single_flight_stats()['in_flight'] == 0
+
+    def test_different_params_are_not_shared(self, client, mocker):
+        """Test reads are only collapsed for identical (cypher, params)"""
+        run = mocker.patch.object(client, '_run_read', return_value=[])
+
+        client.run_read('MATCH', {'q': 'lo', 'k': 8})
+        client.run_read('MATCH', {'k': 8, 'q': 'lo'})
+        client.run_read('MATCH', {'q': 'lov', 'k': 8})
+
+        assert run.call_count == 3
+        assert client.single_flight_stats()['deduplicated'] == 0
+
+    def test_concurrent_async_reads_share_one_call(self, client, mocker):
+        """Test coroutines share one read, and errors reach every waiter"""
+        calls = []
+
+        async def read(cypher, params):
+            calls.append(params)
+            await asyncio.sleep(0.01)
+            if params.get('fail'):
+                raise RuntimeError('boom')
+            return [{'qid': 'q1'}]
+
+        mocker.patch.object(client, '_arun_read', side_effect=read)
+
+        async def main():
+            rows = await asyncio.gather(*[client.arun_read('MATCH', {'q': 'lo'}) for _ in range(5)])
+            failed = await asyncio.gather(*[client.arun_read('MATCH', {'fail': True}) for _ in range(3)],
+                                          return_exceptions=True)
+            return rows, failed
+
+        rows, failed = asyncio.run(main())
+
+        assert rows == [[{'qid': 'q1'}]] * 5
+        assert all(isinstance(e, RuntimeError) for e in failed)
+        assert len(calls) == 2
+        assert client.single_flight_stats()['deduplicated'] == 6
+
+    def test_cancelled_waiter_does_not_cancel_read(self, client, mocker):
+        """Test the shared read finishes for others when one waiter is cancelled"""
+        async def read(cypher, params):
+            await asyncio.sleep(0.02)
+            return [{'qid': 'q1'}]
+
+        mocker.patch.object(client, '_arun_read', side_effect=read)
+
+        async def main():
+            first = asyncio.ensure_future(client.arun_read('MATCH', {}))
+            second = asyncio.ensure_future(client.arun_read('MATCH', {}))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(main()) == [{'qid': 'q1'}]
+
+
+@pytest.mark.unit
+class TestAsyncDriver:
+    """Test the per-event-loop async driver"""
+
+    def test_driver_is_closed_with_its_loop(self, client, mocker):
+        """Test each async_to_sync call (a new loop) closes the driver it opened"""
+        from asgiref.sync import async_to_sync
+
+        drivers = []
+
+        def create_driver(*args, **kwargs):
+            driver = mocker.MagicMock()
+            driver.close = mocker.AsyncMock()
+            drivers.append(driver)
+            return driver
+
+        mocker.patch.object(client, 'create_driver', side_effect=create_driver)
+
+        async def view():
+            assert client.get_async_driver() is client.get_async_driver()
+
+        for _ in range(3):
+            async_to_sync(view)()
+
+        assert len(drivers) == 3
+        for driver in drivers:
+            driver.close.assert_awaited_once()
@@ -0,0 +1,94 @@
+import pytest
+from asgiref.sync import async_to_sync
+
+
+def row(qid, text, author='Oscar Wilde'):
+    return {'qid': qid, 'short_text': text, 'full_text': text, 'author': author, 'score': 1.0}
+
+
+ROWS = [
+    row('q1', 'Be yourself; everyone else is already taken'),
+    row('q2', 'Beauty is in the eye of the beholder', 'Margaret Hungerford'),
+    row('q3', 'Be the change', 'Gandhi'),
+]
+
+
+class FakeSharedCache:
+    """Stands in for a Django cache alias"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def aget(self, key, default=None):
+        return self.data.get(key, default)
+
+    async def aset(self, key, value, timeout=None):
+        self.data[key] = value
+
+
+@pytest.mark.unit
+class TestSearchCache:
+    """Test the two-level quote search result cache"""
+
+    def test_keys_normalize_query(self):
+        """Test whitespace, and case when folding, do not split entries"""
+        from backend.quotes.search_cache import SearchCache
+
+        cache = SearchCache(casefold=True)
+        async_to_sync(cache.set)('Be  Yourself', 8, {'rows': ROWS[:1], 'corrected': None})
+
+        assert async_to_sync(cache.get)(' be yourself', 8)['rows'] == ROWS[:1]
+        assert async_to_sync(cache.get)('be yourself', 5) is None
+
+    def test_shared_level_fills_local(self):
+        """Test a worker reuses results another worker stored in the shared cache"""
+        from backend.quotes.search_cache import SearchCache
+
+        shared = FakeSharedCache()
+        async_to_sync(SearchCache(shared=shared).set)('be', 8, {'rows': ROWS, 'corrected': None})
+        cache = SearchCache(shared=shared)
+
+        assert async_to_sync(cache.get)('be', 8)['rows'] == ROWS
+        assert async_to_sync(cache.get)('be', 8)['rows'] == ROWS
+        assert cache.stats()['shared_hits'] == 1
+        assert cache.stats()['local_hits'] == 1
+
+    def test_longer_query_filters_complete_prefix(self):
+        """Test a prefix's complete results answer a longer query"""
+        from backend.quotes.search_cache import SearchCache, prefix_match
+
+        cache = SearchCache(match=prefix_match, casefold=True)
+        async_to_sync(cache.set)('be', 8, {'rows': ROWS, 'corrected': None})
+
+        assert [r['qid'] for r in async_to_sync(cache.get)('bea', 8)['rows']] == ['q2']
+        assert [r['qid'] for r in async_to_sync(cache.get)('be the ch', 8)['rows']] == ['q3']
+        assert cache.stats()['prefix_hits'] == 2
+
+    def test_truncated_prefix_is_not_filtered(self):
+        """Test a prefix cut off at k cannot answer a query it may be missing results for"""
+        from backend.quotes.search_cache import SearchCache, prefix_match
+
+        cache = SearchCache(match=prefix_match)
+        async_to_sync(cache.set)('be', 3, {'rows': ROWS, 'corrected': None})
+
+        assert async_to_sync(cache.get)('bea', 3) is None
+        assert async_to_sync(cache.get)('gandhi', 3) is None
+
+    def test_graph_version_change_invalidates(self):
+        """Test entries from before an ETL load are not served"""
+        from backend.quotes.search_cache import SearchCache
+
+        version = {'value': 1}
+
+        async def load_version():
+            return version['value']
+
+        cache = SearchCache(load_version=load_version, version_ttl=0)
+        async_to_sync(cache.refresh_version)()
+        async_to_sync(cache.set)('be', 8, {'rows': ROWS, 'corrected': None})
+        assert async_to_sync(cache.get)('be', 8) is not None
+
+        version['value'] = 2
+
+        assert async_to_sync(cache.get)('be', 8) is None
+        assert cache.stats()['version'] == 2
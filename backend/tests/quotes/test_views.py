@@ -0,0 +1,341 @@
+import pytest
+import json
+import threading
+
+
+@pytest.fixture
+def fresh_chatbot(mocker):
+    """Reset the shared chatbot and stub out RAGChatbot construction"""
+    from backend.quotes import views
+
+    mocker.patch.object(views, 'chatbot', None)
+    return mocker.patch.object(views, 'RAGChatbot')
+
+
+@pytest.fixture(autouse=True)
+def fresh_search_cache(mocker):
+    """Give every test an empty search cache that never checks the graph version"""
+    from backend.quotes import views
+    from backend.quotes.search_cache import SearchCache
+
+    cache = SearchCache()
+    mocker.patch.object(views, 'search_cache', cache)
+    return cache
+
+
+@pytest.mark.unit
+class TestHealthz:
+    """Test the health check endpoint"""
+
+    def test_reports_hybrid_retrieval_stats(self, mocker):
+        """Test healthz reports hybrid legs dropped or failed next to the RAG caches"""
+        from rest_framework.test import APIRequestFactory
+        from services.rag.hybrid import HybridRetriever
+        from backend.quotes import views
+
+        hybrid = HybridRetriever()
+        hybrid.fail('vector', RuntimeError('down'))
+        mocker.patch.object(views, 'chatbot', mocker.MagicMock(hybrid=hybrid))
+        mocker.patch.object(views, 'health_check_details', return_value={'ok': True, 'error': None})
+        mocker.patch.object(views, 'connection_pool_stats', return_value={})
+
+        response = views.healthz(APIRequestFactory().get('/healthz'))
+
+        assert response.data['rag_hybrid']['failed'] == {'vector': 1}
+        assert 'rag_cache' in response.data
+
+
+@pytest.mark.unit
+class TestSharedChatbot:
+    """Test the process-wide RAG chatbot"""
+
+    def test_chatbot_is_created_once(self, fresh_chatbot):
+        """Test concurrent first requests share one lazily built chatbot"""
+        from backend.quotes import views
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(views.get_chatbot())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert fresh_chatbot.call_count == 1
+        assert all(r is results[0] for r in results)
+        assert fresh_chatbot.call_args[1]['check_connections'] is False
+        results[0].start_health_monitor.assert_called_once()
+
+    @pytest.mark.django_db
+    @pytest.mark.api
+    def test_chat_reuses_chatbot(self, fresh_chatbot, django_user_model):
+        """Test chat requests neither rebuild nor close the chatbot"""
+        from unittest.mock import AsyncMock
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from backend.quotes.views import chat_with_quotes
+
+        user = django_user_model.objects.create_user(username='chatter', password='testpass123')
+        bot = fresh_chatbot.return_value
+        bot.aquery = AsyncMock(return_value={'response': 'Hi', 'quotes': [], 'method': 'rag'})
+
+        for _ in range(2):
+            request = APIRequestFactory().post('/api/v1/quotes/chat/', {'query': 'love'}, format='json')
+            force_authenticate(request, user=user)
+            response = async_to_sync(chat_with_quotes)(request)
+            assert response.status_code == 200
+            assert json.loads(response.content)['response'] == 'Hi'
+
+        assert fresh_chatbot.call_count == 1
+        assert bot.aquery.await_count == 2
+        bot.close.assert_not_called()
+
+    @pytest.mark.django_db
+    @pytest.mark.api
+    def test_chat_stream_sends_events(self, fresh_chatbot, django_user_model):
+        """Test the streaming endpoint relays chatbot events as SSE"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from backend.quotes.views import chat_with_quotes_stream
+
+        user = django_user_model.objects.create_user(username='streamer', password='testpass123')
+
+        async def stream(*args):
+            yield {'event': 'quotes', 'data': {'quotes': [], 'method': 'rag'}}
+            yield {'event': 'token', 'data': {'token': 'Hi'}}
+            yield {'event': 'done', 'data': {'response': 'Hi', 'method': 'rag'}}
+
+        fresh_chatbot.return_value.aquery_stream = stream
+
+        request = APIRequestFactory().post('/api/v1/quotes/chat/stream/', {'query': 'love'}, format='json')
+        force_authenticate(request, user=user)
+        response = async_to_sync(chat_with_quotes_stream)(request)
+
+        async def read():
+            return ''.join([chunk.decode() async for chunk in response])
+
+        body = async_to_sync(read)()
+
+        assert response.is_async
+        assert response['Content-Type'] == 'text/event-stream'
+        assert body.startswith('event: quotes\ndata: ')
+        assert 'event: token\ndata: {"token": "Hi"}\n\n' in body
+        assert body.endswith('event: done\ndata: {"response": "Hi", "method": "rag"}\n\n')
+
+    @pytest.mark.django_db
+    @pytest.mark.api
+    def test_chat_stream_sends_events_before_generation_ends(self, fresh_chatbot, django_user_model):
+        """Test the first events reach the client while the LLM is still generating"""
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from backend.quotes.views import chat_with_quotes_stream
+
+        user = django_user_model.objects.create_user(username='streamer', password='testpass123')
+        request = APIRequestFactory().post('/api/v1/quotes/chat/stream/', {'query': 'love'}, format='json')
+        force_authenticate(request, user=user)
+
+        async def main():
+            finish = asyncio.Event()
+
+            async def stream(*args):
+                yield {'event': 'quotes', 'data': {'quotes': [], 'method': 'rag'}}
+                yield {'event': 'token', 'data': {'token': 'Hi'}}
+                await finish.wait()
+                yield {'event': 'done', 'data': {'response': 'Hi', 'method': 'rag'}}
+
+            fresh_chatbot.return_value.aquery_stream = stream
+            response = await chat_with_quotes_stream(request)
+            chunks = response.__aiter__()
+            first = [await asyncio.wait_for(chunks.__anext__(), timeout=1) for _ in range(2)]
+            generating = not finish.is_set()
+            finish.set()
+            rest = [chunk async for chunk in chunks]
+            return first, generating, rest
+
+        first, generating, rest = async_to_sync(main)()
+
+        assert generating
+        assert first[0].startswith(b'event: quotes')
+        assert first[1].startswith(b'event: token')
+        assert rest[0].startswith(b'event: done')
+
+
+@pytest.mark.unit
+class TestAsyncViews:
+    """Test the async (ASGI) view wrapper"""
+
+    @pytest.mark.django_db
+    def test_async_view_requires_authentication(self, fresh_chatbot):
+        """Test anonymous requests are rejected before the view runs"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from backend.quotes.views import chat_with_quotes
+
+        request = APIRequestFactory().post('/api/v1/quotes/chat/', {'query': 'love'}, format='json')
+        response = async_to_sync(chat_with_quotes)(request)
+
+        assert response.status_code == 401
+        assert response['WWW-Authenticate'] == 'Token'
+        fresh_chatbot.assert_not_called()
+
+    @pytest.mark.django_db
+    def test_async_view_forbids_authenticated_users(self, django_user_model):
+        """Test an authenticated user failing the permission gets 403, as in DRF"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.authtoken.models import Token
+        from rest_framework.permissions import IsAdminUser
+        from rest_framework.test import APIRequestFactory
+        from django.http import JsonResponse
+        from backend.quotes.async_api import async_api_view
+
+        @async_api_view(['GET'], permission_class=IsAdminUser)
+        async def admin_only(request):
+            return JsonResponse({'ok': True})
+
+        user = django_user_model.objects.create_user(username='plain', password='testpass123')
+        token = Token.objects.create(user=user)
+        request = APIRequestFactory().get('/admin-only/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = async_to_sync(admin_only)(request)
+
+        assert response.status_code == 403
+        assert 'WWW-Authenticate' not in response
+
+    def test_async_view_negotiates_content(self, mocker):
+        """Test async views render through DRF's negotiated renderers"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from backend.quotes.views import search_quotes
+
+        ok = async_to_sync(search_quotes)(APIRequestFactory().get('/api/v1/quotes/search/?q=a'))
+        refused = async_to_sync(search_quotes)(
+            APIRequestFactory().get('/api/v1/quotes/search/?q=a', HTTP_ACCEPT='application/xml'))
+
+        assert ok['Content-Type'] == 'application/json'
+        assert json.loads(ok.content) == {'results': [], 'query': 'a', 'count': 0}
+        assert refused.status_code == 406
+
+    def test_async_view_applies_throttles(self, mocker):
+        """Test configured throttle classes apply to async views"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from rest_framework.throttling import BaseThrottle
+        from rest_framework.views import APIView
+        from backend.quotes.views import search_quotes
+
+        class Deny(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+        mocker.patch.object(APIView, 'throttle_classes', [Deny])
+
+        response = async_to_sync(search_quotes)(APIRequestFactory().get('/api/v1/quotes/search/?q=a'))
+
+        assert response.status_code == 429
+
+    def test_async_view_rejects_other_methods(self):
+        """Test methods outside the allowed list get 405"""
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+        from rest_framework.test import APIRequestFactory
+        from backend.quotes.views import search_quotes
+
+        response = async_to_sync(search_quotes)(APIRequestFactory().delete('/api/v1/quotes/search/'))
+
+        assert iscoroutinefunction(search_quotes)
+        assert response.status_code == 405
+
+    @pytest.mark.django_db
+    def test_search_uses_async_neo4j(self, mocker):
+        """Test search awaits the async Neo4j helper"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from backend.quotes import views
+
+        arun_read = mocker.patch.object(views, 'arun_read', mocker.AsyncMock(return_value=[
+            {'qid': 'q1', 'short_text': 'Be yourself.', 'full_text': 'Be yourself.',
+             'author': 'Oscar Wilde', 'score': 2.5}
+        ]))
+
+        response = async_to_sync(views.search_quotes)(APIRequestFactory().get('/api/v1/quotes/search/?q=be'))
+        body = json.loads(response.content)
+
+        assert response.status_code == 200
+        assert body['results'][0]['author'] == 'Oscar Wilde'
+        arun_read.assert_awaited_once()
+
+    @pytest.mark.django_db
+    def test_repeated_search_is_cached(self, mocker, fresh_search_cache):
+        """Test a repeated query is answered without Neo4j until invalidated"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from backend.quotes import views
+
+        arun_read = mocker.patch.object(views, 'arun_read', mocker.AsyncMock(return_value=[
+            {'qid': 'q1', 'short_text': 'Be yourself.', 'full_text': 'Be yourself.',
+             'author': 'Oscar Wilde', 'score': 2.5}
+        ]))
+        search = async_to_sync(views.search_quotes)
+
+        for q in ('be', ' be ', 'be'):
+            body = json.loads(search(APIRequestFactory().get('/api/v1/quotes/search/', {'q': q})).content)
+            assert body['results'][0]['quote_id'] == 'q1'
+        assert arun_read.await_count == 1
+
+        views.invalidate_search_cache()
+        search(APIRequestFactory().get('/api/v1/quotes/search/?q=be'))
+
+        assert arun_read.await_count == 2
+        assert fresh_search_cache.stats()['local_hits'] == 2
+
+    @pytest.mark.django_db
+    def test_search_prefix_backend_skips_neo4j(self, mocker):
+        """Test the prefix backend answers search from the in-memory index"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from services.autocomplete.prefix_index import AutocompleteEngine
+        from backend.quotes import views
+
+        engine = AutocompleteEngine.build(
+            [{'id': 'q1', 'text': 'Be yourself.', 'author': 'Oscar Wilde'}],
+            [{'name': 'Oscar Wilde', 'quotes': 1}],
+        )
+        mocker.patch.object(views, 'SEARCH_BACKEND', 'prefix')
+        mocker.patch.object(views, 'get_shared_engine', return_value=engine)
+        mocker.patch.object(views, 'get_driver')
+        arun_read = mocker.patch.object(views, 'arun_read', mocker.AsyncMock())
+
+        response = async_to_sync(views.search_quotes)(APIRequestFactory().get('/api/v1/quotes/search/?q=yo'))
+        body = json.loads(response.content)
+
+        assert body['results'][0]['quote_id'] == 'q1'
+        assert body['results'][0]['author'] == 'Oscar Wilde'
+        arun_read.assert_not_awaited()
+
+    @pytest.mark.django_db
+    def test_search_neo4j_backend_corrects_typos(self, mocker):
+        """Test an empty Neo4j search loads the speller and retries corrected"""
+        from asgiref.sync import async_to_sync
+        from rest_framework.test import APIRequestFactory
+        from services.autocomplete.prefix_index import AutocompleteEngine
+        from backend.quotes import views
+
+        engine = AutocompleteEngine.build(
+            [{'id': 'q1', 'text': 'Be yourself.', 'author': 'Oscar Wilde'},
+             {'id': 'q2', 'text': 'Yourself first.', 'author': 'Oscar Wilde'}],
+            [{'name': 'Oscar Wilde', 'quotes': 2}],
+        )
+        mocker.patch.object(views, 'SEARCH_BACKEND', 'neo4j')
+        mocker.patch.object(views, 'speller_failed', False)
+        mocker.patch.object(views, 'get_loaded_engine', return_value=None)
+        get_shared_engine = mocker.patch.object(views, 'get_shared_engine', return_value=engine)
+        mocker.patch.object(views, 'get_driver')
+        arun_read = mocker.patch.object(views, 'arun_read', mocker.AsyncMock(side_effect=[[], [
+            {'qid': 'q1', 'short_text': 'Be yourself.', 'full_text': 'Be yourself.',
+             'author': 'Oscar Wilde', 'score': 2.5}
+        ]]))
+
+        response = async_to_sync(views.search_quotes)(APIRequestFactory().get('/api/v1/quotes/search/?q=yourslef'))
+        body = json.loads(response.content)
+
+        get_shared_engine.assert_called_once()
+        assert arun_read.await_args_list[1].args[1]['q'] == 'yourself'
+        assert body['results'][0]['quote_id'] == 'q1'
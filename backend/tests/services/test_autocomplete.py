@@ -0,0 +1,137 @@
+import pytest
+
+
+QUOTES = [
+    {'id': 'q1', 'text': 'To be, or not to be', 'author': 'William Shakespeare'},
+    {'id': 'q2', 'text': 'Love all, trust a few', 'author': 'William Shakespeare'},
+    {'id': 'q3', 'text': 'Love is patient', 'author': 'Paul'},
+    {'id': 'q4', 'text': 'Be yourself; everyone else is already taken', 'author': 'Oscar Wilde'},
+]
+AUTHORS = [
+    {'name': 'William Shakespeare', 'quotes': 2},
+    {'name': 'Paul', 'quotes': 1},
+    {'name': 'Oscar Wilde', 'quotes': 1},
+]
+
+
+def make_engine():
+    from services.autocomplete.prefix_index import AutocompleteEngine
+
+    return AutocompleteEngine.build(QUOTES, AUTHORS)
+
+
+@pytest.mark.unit
+class TestPrefixIndex:
+    """Test the in-memory autocomplete prefix index"""
+
+    def test_prefix_matches_any_token_ranked(self):
+        """Test a prefix matches words anywhere, prolific authors first"""
+        engine = make_engine()
+
+        assert [q['id'] for q in engine.quotes.search('lo')] == ['q2', 'q3']
+        assert [q['id'] for q in engine.quotes.search('BE')] == ['q1', 'q4']
+        assert [a['name'] for a in engine.authors.search('wil')] == ['William Shakespeare', 'Oscar Wilde']
+
+    def test_earlier_words_must_match_exactly(self):
+        """Test multi-word queries intersect whole words with a final prefix"""
+        engine = make_engine()
+
+        assert [q['id'] for q in engine.quotes.search('love pat')] == ['q3']
+        assert [q['id'] for q in engine.quotes.search('shakespeare lo')] == ['q2']
+        assert engine.quotes.search('lov ') == []
+
+    def test_heavy_prefixes_are_precomputed(self, mocker):
+        """Test large trie nodes store their top-k and agree with a postings scan"""
+        from services.autocomplete import prefix_index
+
+        mocker.patch.object(prefix_index, 'HEAVY_POSTINGS', 2)
+        quotes = [{'id': f'q{i}', 'text': f'lesson {i} learned', 'author': 'A'} for i in range(30)]
+        engine = prefix_index.AutocompleteEngine.build(quotes, [{'name': 'A', 'quotes': 30}])
+
+        assert 'le' in engine.quotes.topk
+        assert list(engine.quotes.prefix_ids('le', 5)) == [0, 1, 2, 3, 4]
+        assert list(engine.quotes.prefix_ids('le', 25)) == list(range(25))
+
+    def test_save_and_load(self, tmp_path):
+        """Test a persisted engine answers the same queries"""
+        from services.autocomplete.prefix_index import AutocompleteEngine
+
+        engine = make_engine()
+        path = str(tmp_path / 'index')
+        engine.save(path)
+        loaded = AutocompleteEngine.load(path)
+
+        assert AutocompleteEngine.exists(path)
+        assert loaded.complete('lo') == engine.complete('lo')
+        assert loaded.quotes.topk.keys() == engine.quotes.topk.keys()
+
+
+@pytest.mark.unit
+class TestSpellingIndex:
+    """Test SymSpell-style typo correction"""
+
+    def make_index(self):
+        from services.autocomplete.spelling import SpellingIndex
+
+        return SpellingIndex.build({
+            'shakespeare': 40, 'motivation': 12, 'motivations': 2,
+            'love': 90, 'live': 30, 'rare': 1, 'x1y2': 5,
+        })
+
+    def test_corrects_common_edits(self):
+        """Test deletions, insertions, substitutions and transpositions"""
+        index = self.make_index()
+
+        assert index.correct('shakespear') == 'shakespeare'
+        assert index.correct('motivaton') == 'motivation'
+        assert index.correct('shakepseare') == 'shakespeare'
+        assert index.lookup('lvoe') == ('love', 1, 90)
+
+    def test_prefers_fewer_edits_then_frequency(self):
+        """Test ties on distance go to the more frequent word"""
+        index = self.make_index()
+
+        assert index.correct('lxve') == 'love'
+        assert index.correct('motivationss') == 'motivations'
+
+    def test_vocabulary_and_distance_limits(self):
+        """Test rare, short and non-alphabetic words are never suggested"""
+        index = self.make_index()
+
+        assert 'rare' not in index and 'x1y2' not in index
+        assert index.lookup('lo') is None
+        assert index.lookup('lxxe') is None
+        assert index.correct('qwertyuiop') == 'qwertyuiop'
+
+    def test_edit_distance(self):
+        """Test optimal string alignment distance with its cutoff"""
+        from services.autocomplete.spelling import edit_distance
+
+        assert edit_distance('love', 'lvoe', 2) == 1
+        assert edit_distance('kitten', 'sitting', 3) == 3
+        assert edit_distance('kitten', 'sitting', 2) == 3
+
+
+@pytest.mark.unit
+class TestTypoTolerantAutocomplete:
+    """Test typo correction in the autocomplete engine"""
+
+    def test_unmatched_words_are_corrected(self):
+        """Test a query matching nothing is retried with corrected words"""
+        from services.autocomplete.prefix_index import AutocompleteEngine
+
+        quotes = QUOTES + [{'id': 'q5', 'text': 'Love is blind', 'author': 'William Shakespeare'}]
+        engine = AutocompleteEngine.build(quotes, AUTHORS)
+
+        results = engine.complete('shakespaere lov')
+
+        assert results['corrected'] == 'shakespeare lov'
+        assert [q['id'] for q in results['quotes']] == ['q5', 'q2']
+        assert engine.search_quotes('lov')[1] is None
+
+    def test_partial_word_kept_while_it_prefixes(self):
+        """Test a word still being typed is only corrected once it is finished"""
+        engine = make_engine()
+
+        assert engine.correct_query('patie') is None
+        assert engine.correct_query('lovee ') == 'love '
@@ -0,0 +1,270 @@
+import pytest
+from unittest.mock import MagicMock
+
+
+@pytest.mark.unit
+class TestBatchedIngestion:
+    """Test batched UNWIND ingestion in the ETL"""
+
+    def test_iter_batches_groups_rows(self):
+        """Test rows are grouped into batches of at most batch_size"""
+        from services.etl.build_graph import iter_batches
+
+        rows = [(f'Author {i}', f'short {i}', f'full {i}') for i in range(5)]
+        batches = list(iter_batches(rows, 2))
+
+        assert [len(b) for b in batches] == [2, 2, 1]
+        assert batches[0][0] == {
+            'author': 'Author 0',
+            'short_text': 'short 0',
+            'full_text': 'full 0'
+        }
+
+    def test_insert_quotes_batch_uses_unwind(self):
+        """Test a whole batch is sent as one UNWIND query"""
+        from services.etl.build_graph import insert_quotes_batch
+
+        tx = MagicMock()
+        rows = [{'author': 'A', 'short_text': 's', 'full_text': 'f'}]
+        insert_quotes_batch(tx, rows)
+
+        tx.run.assert_called_once()
+        query = tx.run.call_args[0][0]
+        assert 'UNWIND $rows AS row' in query
+        assert 'MERGE (q:Quote {short_text: row.short_text})' in query
+        assert tx.run.call_args[1]['rows'] == rows
+
+    def test_write_batches_counts_rows(self):
+        """Test one write transaction per batch when every batch succeeds"""
+        from services.etl.build_graph import write_batches
+
+        session = MagicMock()
+        batches = [[{}] * 3, [{}] * 2, [{}]]
+
+        count = write_batches(session, batches)
+
+        assert session.execute_write.call_count == 3
+        assert count == 6
+
+    def test_write_batches_retries_failed_batch_per_row(self):
+        """Test a failed batch is retried row by row and only bad rows are skipped"""
+        from services.etl.build_graph import insert_quote, write_batches
+
+        session = MagicMock()
+        session.execute_write.side_effect = [
+            None, Exception('batch'), None, Exception('row'), None
+        ]
+        rows = [{'author': 'A', 'short_text': f's{i}', 'full_text': f'q{i}'} for i in range(3)]
+        batches = [[{}] * 2, rows]
+
+        count = write_batches(session, batches)
+
+        assert count == 4
+        retries = session.execute_write.call_args_list[2:]
+        assert [c.args for c in retries] == [(insert_quote, 'A', f'q{i}') for i in range(3)]
+
+
+@pytest.mark.unit
+class TestParallelPipeline:
+    """Test the multi-process parsing pipeline"""
+
+    PAGE = (
+        '  <page>\n'
+        '    <title>Ada Lovelace</title>\n'
+        '    <revision><text>== Quotes ==\n'
+        'The Analytical Engine weaves algebraic patterns.\n'
+        'short\n'
+        '</text></revision>\n'
+        '  </page>\n'
+    )
+
+    def write_dump(self, tmp_path, pages):
+        import bz2
+
+        path = tmp_path / 'dump.xml.bz2'
+        with bz2.open(path, 'wt', encoding='utf-8') as f:
+            f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">\n')
+            f.write('  <siteinfo><sitename>Wikiquote</sitename></siteinfo>\n')
+            f.write(''.join(pages))
+            f.write('</mediawiki>\n')
+        return str(path)
+
+    def test_iter_page_blobs(self, tmp_path):
+        """Test the reader yields one raw blob per page"""
+        from services.etl.build_graph import iter_page_blobs
+
+        path = self.write_dump(tmp_path, [self.PAGE, self.PAGE])
+        blobs = list(iter_page_blobs(path))
+
+        assert len(blobs) == 2
+        assert blobs[0].strip().startswith('<page>')
+        assert blobs[0].strip().endswith('</page>')
+
+    def test_extract_page_rows(self):
+        """Test a page blob is turned into quote rows"""
+        from services.etl.build_graph import extract_page_rows
+
+        rows = extract_page_rows(self.PAGE)
+
+        assert rows == [(
+            'Ada Lovelace',
+            'The Analytical Engine weaves algebraic patterns.',
+            'The Analytical Engine weaves algebraic patterns.'
+        )]
+
+    def test_parallel_rows_match_serial_parse(self, tmp_path):
+        """Test the process pool produces the same rows as the serial parser"""
+        from services.etl.build_graph import iter_parallel_rows, iter_quote_rows
+
+        path = self.write_dump(tmp_path, [self.PAGE] * 5)
+
+        parallel = list(iter_parallel_rows(path, workers=2, pages_per_task=2))
+
+        assert parallel == list(iter_quote_rows(path))
+        assert len(parallel) == 5
+
+
+@pytest.mark.unit
+class TestCsvExport:
+    """Test the neo4j-admin CSV export"""
+
+    def test_export_deduplicates_with_stable_ids(self, tmp_path):
+        """Test duplicate authors, quotes and SAID pairs are written once"""
+        import csv
+        from services.etl.build_graph import export_csv, stable_id
+
+        rows = [
+            ('Ada', 'Quote one', 'Quote one'),
+            ('Ada', 'Quote one', 'Quote one'),
+            ('Ada', 'Quote, "two"', 'Quote, "two"'),
+            ('Babbage', 'Quote one', 'Quote one'),
+        ]
+
+        counts = export_csv(rows, str(tmp_path))
+
+        assert counts == {'authors': 2, 'quotes': 2, 'said': 3}
+        with open(tmp_path / 'quotes.csv', newline='', encoding='utf-8') as f:
+            quotes = list(csv.reader(f))
+        assert quotes[0] == ['quoteId:ID(Quote)', 'short_text', 'full_text', 'seq:long', ':LABEL']
+        assert quotes[2][1] == 'Quote, "two"'
+        assert [q[3] for q in quotes[1:]] == ['0', '1']
+        assert quotes[1][0] == stable_id('q', 'Quote one')
+
+    def test_stable_id_is_deterministic(self):
+        """Test IDs do not depend on process or insertion order"""
+        from services.etl.build_graph import stable_id
+
+        assert stable_id('a', 'Ada') == stable_id('a', 'Ada')
+        assert stable_id('a', 'Ada') != stable_id('q', 'Ada')
+
+
+@pytest.mark.unit
+class TestQuoteSeq:
+    """Test dense q.seq numbering for random sampling"""
+
+    def test_assign_continues_after_max(self):
+        """Test unnumbered quotes are numbered after the current maximum, in batches"""
+        from services.etl.build_graph import assign_quote_seq
+
+        session = MagicMock()
+        session.run.side_effect = [
+            MagicMock(**{'single.return_value': {'seq': 9}}),
+            [{'id': 'q1'}, {'id': 'q2'}, {'id': 'q3'}],
+        ]
+        tx = MagicMock()
+        session.execute_write.side_effect = lambda fn: fn(tx)
+
+        assert assign_quote_seq(session, batch_size=2) == 3
+        rows = [r for c in tx.run.call_args_list for r in c[1]['rows']]
+        assert rows == [{'id': 'q1', 'seq': 10}, {'id': 'q2', 'seq': 11}, {'id': 'q3', 'seq': 12}]
+        assert session.execute_write.call_count == 2
+
+    def test_bump_graph_version(self):
+        """Test a load bumps the version that keys cached search results"""
+        from services.etl.build_graph import bump_graph_version
+
+        session = MagicMock()
+        session.run.return_value.single.return_value = {'version': 4}
+
+        assert bump_graph_version(session) == 4
+        assert 'MERGE (v:GraphVersion' in session.run.call_args[0][0]
+
+
+@pytest.mark.unit
+class TestIncrementalEtl:
+    """Test checkpointed, incremental ETL runs"""
+
+    def page(self, title, rev_id, body):
+        return (
+            f'  <page>\n    <title>{title}</title>\n'
+            f'    <revision><id>{rev_id}</id><text>{body}\n</text></revision>\n  </page>\n'
+        )
+
+    def write_dump(self, path, pages):
+        import bz2
+
+        with bz2.open(path, 'wt', encoding='utf-8') as f:
+            f.write('<mediawiki>\n' + ''.join(pages) + '</mediawiki>\n')
+
+    def run(self, mocker, dump, state):
+        from services.etl import build_graph
+
+        session = MagicMock()
+        driver = MagicMock()
+        driver.session.return_value.__enter__.return_value = session
+        mocker.patch.object(build_graph, 'get_driver', return_value=driver)
+
+        build_graph.build_graph_incremental(str(dump), str(state), batch_size=1)
+        return [
+            c for c in session.execute_write.call_args_list
+            if c[0][0] is build_graph.sync_pages_batch
+        ]
+
+    def test_unchanged_pages_are_skipped(self, mocker, tmp_path):
+        """Test a second run over a new dump only writes changed pages"""
+        import os
+
+        dump = tmp_path / 'dump.xml.bz2'
+        state = tmp_path / 'state.sqlite3'
+        self.write_dump(dump, [
+            self.page('Ada', 1, 'First quote from Ada here.'),
+            self.page('Babbage', 2, 'First quote from Babbage here.'),
+        ])
+        assert len(self.run(mocker, dump, state)) == 2
+
+        self.write_dump(dump, [
+            self.page('Ada', 1, 'First quote from Ada here.'),
+            self.page('Babbage', 3, 'Edited quote from Babbage here.'),
+        ])
+        os.utime(dump, (1, 1))
+        writes = self.run(mocker, dump, state)
+
+        assert len(writes) == 1
+        rows, pages = writes[0][0][1], writes[0][0][2]
+        assert rows[0]['short_text'] == 'Edited quote from Babbage here.'
+        assert pages == [{'author': 'Babbage', 'keep': ['Edited quote from Babbage here.']}]
+
+    def test_sync_deletes_orphaned_quotes(self):
+        """Test quotes left without a SAID edge are deleted with the edge"""
+        from services.etl.build_graph import sync_pages_batch
+
+        tx = MagicMock()
+        sync_pages_batch(tx, [], [{'author': 'Ada', 'keep': []}])
+
+        cypher = tx.run.call_args_list[-1][0][0]
+        assert cypher.index('DELETE r') < cypher.index('DETACH DELETE q')
+        assert 'WHERE NOT ()-[:SAID]->(q)' in cypher
+
+    def test_rerun_resumes_from_checkpoint(self, mocker, tmp_path):
+        """Test a rerun over the same dump resumes after the last checkpoint"""
+        from services.etl.build_graph import EtlState
+
+        dump = tmp_path / 'dump.xml.bz2'
+        state = tmp_path / 'state.sqlite3'
+        self.write_dump(dump, [self.page('Ada', 1, 'First quote from Ada here.')])
+        self.run(mocker, dump, state)
+
+        checkpoint = EtlState(str(state)).get_checkpoint()
+        assert checkpoint['position'] == 1
+        assert checkpoint['title'] == 'Ada'
+        assert self.run(mocker, dump, state) == []
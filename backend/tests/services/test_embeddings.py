@@ -0,0 +1,172 @@
+import pytest
+import numpy as np
+from unittest.mock import Mock
+
+
+def json_response(data, status_code=200, text=''):
+    response = Mock()
+    response.status_code = status_code
+    response.text = text
+    response.json.return_value = data
+    return response
+
+
+@pytest.fixture
+def ollama_session(mocker):
+    """Mock the pooled requests.Session used by EmbeddingService"""
+    session = mocker.patch('services.rag.embeddings.requests.Session').return_value
+    session.get.return_value = json_response({'models': [{'name': 'nomic-embed-text:latest'}]})
+    return session
+
+
+@pytest.mark.unit
+class TestEmbeddingService:
+    """Test batched embedding requests"""
+
+    def test_batches_use_api_embed(self, ollama_session):
+        """Test texts are sent in batches to /api/embed over the shared session"""
+        from services.rag.embeddings import EmbeddingService
+
+        ollama_session.post.side_effect = lambda url, json, timeout: json_response(
+            {'embeddings': [[float(i), 1.0] for i in range(len(json['input']))]}
+        )
+        embedder = EmbeddingService(batch_size=2)
+
+        result = embedder.embed_text(['a', 'b', 'c'])
+
+        assert result.shape == (3, 2)
+        assert ollama_session.post.call_count == 2
+        url = ollama_session.post.call_args_list[0][0][0]
+        assert url.endswith('/api/embed')
+        assert ollama_session.post.call_args_list[0][1]['json']['input'] == ['a', 'b']
+
+    def test_single_text_returns_vector(self, ollama_session):
+        """Test a single string still returns a 1-D vector"""
+        from services.rag.embeddings import EmbeddingService
+
+        ollama_session.post.return_value = json_response({'embeddings': [[0.1, 0.2, 0.3]]})
+        embedder = EmbeddingService()
+
+        result = embedder.embed_text('hello')
+
+        assert result.shape == (3,)
+        np.testing.assert_allclose(result, [0.1, 0.2, 0.3])
+
+    def test_falls_back_without_api_embed(self, ollama_session):
+        """Test older Ollama versions fall back to /api/embeddings"""
+        from services.rag.embeddings import EmbeddingService
+
+        ollama_session.post.side_effect = [
+            json_response({}, status_code=404, text='404 page not found'),
+            json_response({'embedding': [1.0, 0.0]}),
+            json_response({'embedding': [0.0, 1.0]}),
+        ]
+        embedder = EmbeddingService()
+
+        result = embedder.embed_text(['a', 'b'])
+
+        assert result.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+        assert embedder.batch_supported is False
+        assert ollama_session.post.call_args_list[1][0][0].endswith('/api/embeddings')
+
+
+@pytest.mark.unit
+class TestEmbeddingCache:
+    """Test the content-addressed embedding cache"""
+
+    def test_cache_round_trip(self, tmp_path):
+        """Test vectors persist on disk and are keyed per model"""
+        from services.rag.cache import EmbeddingCache, text_hash
+
+        path = str(tmp_path / 'cache.sqlite3')
+        cache = EmbeddingCache(path)
+        cache.set_many('model-a', {text_hash('hello'): np.array([1.0, 2.0])})
+        cache.close()
+
+        reopened = EmbeddingCache(path)
+        found = reopened.get_many('model-a', [text_hash('hello'), text_hash('other')])
+
+        assert list(found) == [text_hash('hello')]
+        np.testing.assert_allclose(found[text_hash('hello')], [1.0, 2.0])
+        assert reopened.get_many('model-b', [text_hash('hello')]) == {}
+
+    def test_async_embed_reads_sqlite_off_the_loop(self, ollama_session, tmp_path, mocker):
+        """Test aembed_text answers from SQLite through a worker thread"""
+        import asyncio
+        import threading
+        from services.rag.cache import EmbeddingCache, text_hash
+        from services.rag.embeddings import EmbeddingService
+
+        path = str(tmp_path / 'cache.sqlite3')
+        EmbeddingCache(path).set_many('nomic-embed-text:latest', {text_hash('hello'): np.array([1.0, 2.0])})
+        cache = EmbeddingCache(path)
+        threads = []
+        get_many = cache.get_many
+        mocker.patch.object(cache, 'get_many',
+                            side_effect=lambda *a: threads.append(threading.get_ident()) or get_many(*a))
+        embedder = EmbeddingService(cache=cache, check_connection=False)
+
+        async def embed():
+            return threading.get_ident(), await embedder.aembed_text('hello')
+
+        loop_thread, vector = asyncio.run(embed())
+
+        np.testing.assert_allclose(vector, [1.0, 2.0])
+        assert threads and loop_thread not in threads
+        assert asyncio.run(embedder.aembed_text('hello')) is not None
+        assert len(threads) == 1
+
+    def test_cache_evicts_least_recently_used(self, tmp_path):
+        """Test prune() drops expired rows, then the least recently used beyond max_rows"""
+        import time
+        from services.rag.cache import EmbeddingCache
+
+        cache = EmbeddingCache(str(tmp_path / 'cache.sqlite3'), max_rows=2,
+                               max_age_days=1, prune_every=0)
+        cache.set_many('m', {'old': np.ones(2), 'a': np.ones(2), 'b': np.ones(2)})
+        with cache._conn:
+            cache._conn.execute("UPDATE embeddings SET used_at = ? WHERE text_hash = 'old'",
+                                (time.time() - 2 * 86400,))
+            cache._conn.execute("UPDATE embeddings SET used_at = used_at - 60 WHERE text_hash = 'a'")
+        cache.memory.clear()
+        cache.get_many('m', ['a'])
+        cache.set_many('m', {'c': np.ones(2)})
+
+        assert cache.prune() == 2
+        cache.memory.clear()
+        assert sorted(cache.get_many('m', ['old', 'a', 'b', 'c'])) == ['a', 'c']
+
+    def test_model_tag_is_resolved_for_cache_keys(self, ollama_session):
+        """Test untagged model names key the cache as :latest with or without a server check"""
+        from services.rag.embeddings import EmbeddingService, resolve_model_tag
+
+        assert EmbeddingService(check_connection=False).model_name == 'nomic-embed-text:latest'
+        assert EmbeddingService().model_name == 'nomic-embed-text:latest'
+        assert resolve_model_tag('nomic-embed-text:v1.5') == 'nomic-embed-text:v1.5'
+        assert resolve_model_tag('localhost:5000/team/embed') == 'localhost:5000/team/embed:latest'
+
+    def test_normalized_text_shares_key(self):
+        """Test whitespace and unicode variants hash to the same key"""
+        from services.rag.cache import text_hash
+
+        assert text_hash('  quotes about\tlove ') == text_hash('quotes about love')
+        assert text_hash('caf\u00e9') == text_hash('cafe\u0301')
+
+    def test_service_only_embeds_misses(self, ollama_session, tmp_path):
+        """Test cached and repeated texts never reach Ollama"""
+        from services.rag.cache import EmbeddingCache
+        from services.rag.embeddings import EmbeddingService
+
+        ollama_session.post.side_effect = lambda url, json, timeout: json_response(
+            {'embeddings': [[float(len(t)), 1.0] for t in json['input']]}
+        )
+        embedder = EmbeddingService(cache=EmbeddingCache(str(tmp_path / 'cache.sqlite3')))
+
+        first = embedder.embed_text(['love', 'hope', 'love'])
+        second = embedder.embed_text(['hope', 'courage'])
+
+        assert first.shape == (3, 2)
+        assert [c[1]['json']['input'] for c in ollama_session.post.call_args_list] == [
+            ['love', 'hope'], ['courage']
+        ]
+        np.testing.assert_allclose(second[1], [7.0, 1.0])
@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+
+
+def paged_driver(quotes):
+    """Mock driver serving FETCH_QUOTES_CYPHER pages with keyset pagination on seq"""
+    driver = MagicMock()
+    session = driver.session.return_value.__enter__.return_value
+
+    def run(query, **params):
+        result = MagicMock()
+        if 'count(q)' in query:
+            result.single.return_value = {'total': len(quotes)}
+        elif '$after' in query:
+            page = [q for q in quotes if q['seq'] > params['after']][:params['fetch_size']]
+            result.data.return_value = page
+        else:
+            # assign_quote_seq: every quote is already numbered
+            result.single.return_value = None
+        return result
+
+    session.run.side_effect = run
+    return driver, session
+
+
+@pytest.mark.unit
+class TestEmbeddingBackfill:
+    """Test the pipelined embedding backfill"""
+
+    def test_fetch_batches_pages_by_seq(self):
+        """Test keyset pagination visits each quote once and skips short texts"""
+        from backend.generate_embeddings import FETCH_QUOTES_CYPHER, fetch_batches
+
+        quotes = [{'id': f'q{i:02d}', 'seq': i, 'text': 'x' if i == 3 else f'quote number {i}'}
+                  for i in range(10)]
+        driver, _ = paged_driver(quotes)
+
+        batches = list(fetch_batches(driver, batch_size=3, fetch_size=4))
+
+        ids = [q['id'] for batch, _ in batches for q in batch]
+        assert ids == [q['id'] for q in quotes if q['id'] != 'q03']
+        assert sum(skipped for _, skipped in batches) == 1
+        assert 'ORDER BY q.seq' in FETCH_QUOTES_CYPHER and 'elementId(q) >' not in FETCH_QUOTES_CYPHER
+
+    def test_pipeline_writes_one_unwind_per_batch(self, mocker):
+        """Test every batch is embedded once and written with one UNWIND"""
+        from backend import generate_embeddings as ge
+
+        quotes = [{'id': f'q{i:02d}', 'seq': i, 'text': f'quote number {i}'} for i in range(7)]
+        driver, session = paged_driver(quotes)
+        mocker.patch.object(ge, 'get_shared_driver', return_value=driver)
+        mocker.patch.object(ge, 'get_embedding_cache', return_value=None)
+        embedder = mocker.patch.object(ge, 'EmbeddingService').return_value
+        embedder.embed_text.side_effect = lambda texts: np.ones((len(texts), 4))
+
+        ge.generate_embeddings(batch_size=3, concurrency=2, fetch_size=5)
+
+        writes = [c for c in session.execute_write.call_args_list if c[0][0] is ge.write_embeddings]
+        written = sorted(row['id'] for c in writes for row in c[0][1])
+        assert written == [q['id'] for q in quotes]
+        assert len(writes) == embedder.embed_text.call_count
+        assert all(len(c[0][1]) <= 3 for c in writes)
+
+    def test_writer_failure_stops_the_producer(self, mocker):
+        """Test a dead writer thread is raised instead of blocking the full queue"""
+        import threading
+        from backend import generate_embeddings as ge
+
+        quotes = [{'id': f'q{i:02d}', 'seq': i, 'text': f'quote number {i}'} for i in range(40)]
+        driver, _ = paged_driver(quotes)
+        main_thread = threading.get_ident()
+        main_session = driver.session.return_value
+
+        def session():
+            if threading.get_ident() != main_thread:
+                raise ConnectionError('neo4j down')
+            return main_session
+
+        driver.session.side_effect = session
+        mocker.patch.object(ge, 'get_shared_driver', return_value=driver)
+        mocker.patch.object(ge, 'get_embedding_cache', return_value=None)
+        mocker.patch.object(ge, 'WRITER_CHECK_INTERVAL', 0.01)
+        embedder = mocker.patch.object(ge, 'EmbeddingService').return_value
+        embedder.embed_text.side_effect = lambda texts: np.ones((len(texts), 4))
+
+        with pytest.raises(RuntimeError, match='writer stopped'):
+            ge.generate_embeddings(batch_size=1, concurrency=1, fetch_size=5)
+
+    def test_nothing_to_embed_keeps_shared_driver_open(self, mocker):
+        """Test the shared driver stays usable for the later CLI steps"""
+        from backend import generate_embeddings as ge
+
+        driver, _ = paged_driver([])
+        mocker.patch.object(ge, 'get_shared_driver', return_value=driver)
+        mocker.patch.object(ge, 'get_embedding_cache', return_value=None)
+        mocker.patch.object(ge, 'EmbeddingService')
+
+        ge.generate_embeddings()
+
+        driver.close.assert_not_called()
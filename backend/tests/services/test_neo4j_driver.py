@@ -0,0 +1,68 @@
+import pytest
+from collections import deque
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def drivers(mocker):
+    """services.neo4j_driver with no shared drivers yet"""
+    from services import neo4j_driver
+
+    mocker.patch.dict(neo4j_driver._drivers, clear=True)
+    return neo4j_driver
+
+
+@pytest.mark.unit
+class TestSharedDriver:
+    """Test the process-wide Neo4j driver factory"""
+
+    def test_pool_settings_are_applied(self, drivers, mocker):
+        """Test every driver is created with the configured pool"""
+        factory = mocker.patch.object(drivers.GraphDatabase, 'driver')
+
+        drivers.create_driver('bolt://db:7687', 'neo4j', 'secret')
+
+        kwargs = factory.call_args[1]
+        assert kwargs['auth'] == ('neo4j', 'secret')
+        assert kwargs['max_connection_pool_size'] == drivers.NEO4J_MAX_POOL_SIZE
+        assert kwargs['connection_acquisition_timeout'] == drivers.NEO4J_ACQUISITION_TIMEOUT
+        assert kwargs['max_connection_lifetime'] == drivers.NEO4J_MAX_CONNECTION_LIFETIME
+        assert kwargs['keep_alive'] == drivers.NEO4J_KEEP_ALIVE
+
+    def test_components_share_one_driver(self, drivers, mocker):
+        """Test the services and views get the same driver for the same database"""
+        mocker.patch.object(drivers.GraphDatabase, 'driver', side_effect=lambda *a, **k: MagicMock())
+        from services.etl.neo4j_service import Neo4jQuoteService
+
+        service = Neo4jQuoteService('bolt://db:7687', 'neo4j', 'secret')
+        service.close()
+
+        assert drivers.get_shared_driver('bolt://db:7687', 'neo4j', 'secret') is service.driver
+        assert drivers.get_shared_driver('bolt://other:7687', 'neo4j', 'secret') is not service.driver
+        service.driver.close.assert_not_called()
+
+        drivers.close_shared_drivers()
+        service.driver.close.assert_called_once()
+
+    def test_pool_stats_counts_connections(self, drivers):
+        """Test in-use, idle and waiting connections are read from the pool"""
+        driver = MagicMock()
+        driver._pool.connections = {'db:7687': deque([MagicMock(in_use=True), MagicMock(in_use=False),
+                                                      MagicMock(in_use=True)])}
+        driver._pool.cond._waiters = deque([object()])
+        driver._pool.pool_config.max_connection_pool_size = 4
+
+        assert drivers.pool_stats(driver) == {
+            'in_use': 2, 'idle': 1, 'waiting': 1, 'max_size': 4, 'utilization': 0.5,
+        }
+
+    def test_pool_stats_on_real_driver(self, drivers):
+        """Test the driver internals read by pool_stats exist (no connection needed)"""
+        driver = drivers.create_driver('bolt://localhost:7687', 'neo4j', 'secret')
+        try:
+            stats = drivers.pool_stats(driver)
+        finally:
+            driver.close()
+
+        assert stats == {'in_use': 0, 'idle': 0, 'waiting': 0,
+                         'max_size': drivers.NEO4J_MAX_POOL_SIZE, 'utilization': 0.0}
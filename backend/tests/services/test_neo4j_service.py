@@ -0,0 +1,174 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+
+
+def make_service():
+    from services.etl.neo4j_service import Neo4jQuoteService
+
+    service = Neo4jQuoteService.__new__(Neo4jQuoteService)
+    service.driver = MagicMock()
+    service._max_seq = None
+    service._max_seq_at = 0.0
+    return service, service.driver.session.return_value.__enter__.return_value
+
+
+def plan(operator, *children):
+    return {'operatorType': f'{operator}@neo4j', 'children': list(children)}
+
+
+@pytest.mark.unit
+class TestQueryPlanHarness:
+    """Test the EXPLAIN plan checks"""
+
+    def test_plan_operators_flattens_tree(self):
+        """Test nested operators are collected without the database suffix"""
+        from services.etl.neo4j_service import plan_operators
+
+        tree = plan('ProduceResults', plan('Expand(All)', plan('NodeUniqueIndexSeek')))
+
+        assert plan_operators(tree) == ['ProduceResults', 'Expand(All)', 'NodeUniqueIndexSeek']
+
+    def test_check_query_plans_reports_full_scans(self):
+        """Test scans and cartesian products are reported per query"""
+        from services.etl.neo4j_service import check_query_plans
+
+        session = MagicMock()
+        plans = {
+            'EXPLAIN clean': plan('ProduceResults', plan('NodeIndexSeek')),
+            'EXPLAIN scan': plan('CartesianProduct', plan('AllNodesScan'), plan('NodeByLabelScan')),
+        }
+        session.run.side_effect = lambda query, **params: MagicMock(
+            **{'consume.return_value.plan': plans[query]}
+        )
+
+        report = check_query_plans(session, {'clean': ('clean', {}), 'scan': ('scan', {})})
+
+        assert report == {'clean': [], 'scan': ['AllNodesScan', 'CartesianProduct', 'NodeByLabelScan']}
+
+
+@pytest.mark.unit
+class TestNeo4jQuoteService:
+    """Test query selection in Neo4jQuoteService"""
+
+    def test_similar_authors_falls_back_to_quote_edges(self):
+        """Test quote-level edges are aggregated when author edges are missing"""
+        from services.etl.neo4j_service import LOCAL_SIMILAR_AUTHORS_CYPHER
+
+        service, session = make_service()
+        session.run.side_effect = [[], [{'name': 'Seneca'}]]
+
+        assert service.get_similar_authors('Marcus Aurelius') == ['Seneca']
+        assert session.run.call_args[0][0] == LOCAL_SIMILAR_AUTHORS_CYPHER
+
+    def test_theme_is_reduced_to_plain_terms(self):
+        """Test Lucene syntax in a theme cannot break the fulltext query"""
+        service, session = make_service()
+        session.run.return_value = [{'text': 'Love all.', 'author': 'Shakespeare'}]
+
+        quotes = service.get_quotes_by_theme('love AND (war')
+
+        assert quotes == [{'text': 'Love all.', 'author': 'Shakespeare'}]
+        assert session.run.call_args[1]['theme'] == 'love and war'
+        assert service.get_quotes_by_theme('!!') == []
+
+    def test_ensure_indexes_rebuilds_index_over_other_fields(self):
+        """Test a fulltext index over only text_clean is dropped and recreated"""
+        from services.etl.neo4j_service import CREATE_FULLTEXT_INDEX_CYPHER, DROP_FULLTEXT_INDEX_CYPHER
+
+        service, session = make_service()
+        session.run.return_value.single.return_value = {'properties': ['text_clean']}
+
+        service.ensure_indexes()
+
+        queries = [c[0][0] for c in session.run.call_args_list]
+        assert queries[1:] == [DROP_FULLTEXT_INDEX_CYPHER, CREATE_FULLTEXT_INDEX_CYPHER]
+
+    def test_queries_read_the_indexed_text_fields(self):
+        """Test every quote text projection coalesces the fields the fulltext index covers"""
+        import re
+        from services.etl import neo4j_service
+        from services.rag import hybrid, vector_index
+        from services.autocomplete import prefix_index
+        from backend.quotes import cypher
+
+        fields = neo4j_service.QUOTE_TEXT_PROPERTIES
+        indexed = re.search(r"ON EACH \[(.*)\]", neo4j_service.CREATE_FULLTEXT_INDEX_CYPHER).group(1)
+        assert indexed == ", ".join(f"q.{f}" for f in fields)
+
+        expected = "coalesce(q.{})".format(", q.".join(fields))
+        for query in (neo4j_service.QUOTES_BY_THEME_CYPHER, neo4j_service.RANDOM_QUOTE_CYPHER,
+                      neo4j_service.RANDOM_AUTHOR_QUOTE_CYPHER, hybrid.FULLTEXT_QUERY_CYPHER,
+                      vector_index.LOAD_QUOTES_CYPHER, vector_index.VECTOR_QUERY_CYPHER,
+                      prefix_index.LOAD_QUOTES_CYPHER, cypher.AUTOCOMPLETE):
+            assert expected in query
+
+
+@pytest.mark.unit
+class TestRandomQuotes:
+    """Test random quote sampling through q.seq"""
+
+    def result(self, record):
+        return MagicMock(**{'single.return_value': record})
+
+    def test_random_quote_seeks_sampled_seq(self, mocker):
+        """Test the sampled position is scaled to the highest q.seq"""
+        from services.etl import neo4j_service
+
+        service, session = make_service()
+        mocker.patch.object(neo4j_service.random, 'random', return_value=0.5)
+        session.run.side_effect = [
+            self.result({'seq': 99}),
+            self.result({'text': 'Love all.', 'author': 'Shakespeare'}),
+        ]
+
+        assert service.get_random_quote() == {'text': 'Love all.', 'author': 'Shakespeare'}
+        assert session.run.call_args[1] == {'seq': 50}
+
+    def test_random_quote_wraps_past_last_seq(self):
+        """Test a position after the last remaining quote wraps to the start"""
+        service, session = make_service()
+        service._max_seq, service._max_seq_at = 9, float('inf')
+        session.run.side_effect = [self.result(None), self.result({'text': 't', 'author': 'a'})]
+
+        assert service.get_random_quote() == {'text': 't', 'author': 'a'}
+        assert session.run.call_args[1] == {'seq': 0}
+
+    def test_quote_of_the_day_is_stable(self):
+        """Test the same day picks the same position and another day usually does not"""
+        import datetime
+        from services.etl.neo4j_service import RANDOM_AUTHOR_QUOTE_CYPHER, day_fraction
+
+        service, session = make_service()
+        session.run.return_value = self.result({'text': 't', 'author': 'Seneca'})
+        day = datetime.date(2026, 1, 1)
+
+        service.get_quote_of_the_day(day, author='Seneca')
+        service.get_quote_of_the_day(day, author='Seneca')
+
+        first, second = session.run.call_args_list
+        assert first == second
+        assert first[0][0] == RANDOM_AUTHOR_QUOTE_CYPHER
+        assert 0 <= first[1]['r'] < 1
+        assert day_fraction(day) != day_fraction(datetime.date(2026, 1, 2))
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not os.getenv('NEO4J_URI'), reason='needs a running Neo4j (NEO4J_URI)')
+class TestQueryPlans:
+    """EXPLAIN the service queries against a live database"""
+
+    def test_no_full_scans(self):
+        """Test no query plans an AllNodesScan, label scan or CartesianProduct"""
+        from services.etl.neo4j_service import Neo4jQuoteService, check_query_plans
+
+        service = Neo4jQuoteService(os.getenv('NEO4J_URI'), os.getenv('NEO4J_USER'),
+                                    os.getenv('NEO4J_PASSWORD'))
+        try:
+            service.ensure_indexes()
+            with service.driver.session() as session:
+                report = check_query_plans(session)
+        finally:
+            service.close()
+
+        assert report == {name: [] for name in report}
@@ -0,0 +1,408 @@
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def chatbot():
+    """RAGChatbot with mocked embedder and LLM, and empty process caches"""
+    from services.rag import rag_chatbot
+    from services.rag.rag_chatbot import RAGChatbot
+
+    rag_chatbot.query_embedding_cache.clear()
+    rag_chatbot.retrieval_cache.clear()
+    rag_chatbot.response_cache.clear()
+
+    bot = RAGChatbot.__new__(RAGChatbot)
+    bot.driver = MagicMock()
+    bot.embedder = MagicMock()
+    bot.embedder.embed_text.return_value = np.array([1.0, 0.0])
+    bot.llm = MagicMock()
+    bot.retrieval_mode = 'scan'
+    yield bot
+
+    rag_chatbot.query_embedding_cache.clear()
+    rag_chatbot.retrieval_cache.clear()
+    rag_chatbot.response_cache.clear()
+
+
+@pytest.mark.unit
+class TestLRUCache:
+    """Test the bounded LRU/TTL cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted first"""
+        from services.rag.cache import LRUCache
+
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    def test_ttl_expiry_and_stats(self, mocker):
+        """Test expired entries count as misses"""
+        from services.rag import cache as cache_module
+
+        clock = mocker.patch.object(cache_module.time, 'monotonic', return_value=100.0)
+        cache = cache_module.LRUCache(maxsize=10, ttl=60)
+        cache.set('q', 'v')
+
+        assert cache.get('q') == 'v'
+        clock.return_value = 161.0
+        assert cache.get('q') is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['hit_rate'] == 0.5
+
+
+@pytest.mark.unit
+class TestRAGChatbotQueryCache:
+    """Test query embedding and retrieval caching in RAGChatbot"""
+
+    def test_query_embedding_is_reused(self, chatbot):
+        """Test repeated queries differing in case or spacing embed once"""
+        chatbot.embed_query('Quotes about love')
+        chatbot.embed_query('  quotes  about LOVE ')
+
+        assert chatbot.embedder.embed_text.call_count == 1
+        assert chatbot.cache_stats()['query_embeddings']['hits'] == 1
+
+    def test_retrieval_results_are_reused(self, chatbot, mocker):
+        """Test a hot query skips both embedding and search"""
+        search = mocker.patch.object(chatbot, '_scan_similar_quotes', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+
+        first = chatbot.retrieve_similar_quotes('motivation', top_k=3)
+        second = chatbot.retrieve_similar_quotes('Motivation', top_k=3)
+
+        assert first == second
+        assert search.call_count == 1
+        assert chatbot.embedder.embed_text.call_count == 1
+        assert chatbot.cache_stats()['retrieval']['hits'] == 1
+
+
+@pytest.mark.unit
+class TestSemanticResponseCache:
+    """Test reuse of generated answers for paraphrased queries"""
+
+    def test_close_queries_share_an_answer(self):
+        """Test hits need the same context key and a close embedding"""
+        from services.rag.cache import SemanticResponseCache
+
+        cache = SemanticResponseCache(maxsize=10, threshold=0.95)
+        cache.set(('q1',), [1.0, 0.0], 'answer')
+
+        assert cache.get(('q1',), [0.99, 0.05]) == 'answer'
+        assert cache.get(('q1',), [0.5, 0.5]) is None
+        assert cache.get(('q2',), [1.0, 0.0]) is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+
+    def test_groups_are_evicted_lru(self):
+        """Test the number of context groups stays bounded"""
+        from services.rag.cache import SemanticResponseCache
+
+        cache = SemanticResponseCache(maxsize=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, [1.0], key)
+
+        assert cache.stats()['size'] == 2
+        assert cache.get('a', [1.0]) is None
+
+    def test_paraphrase_skips_generation(self, chatbot, mocker):
+        """Test a paraphrase with the same retrieved quotes reuses the answer"""
+        mocker.patch.object(chatbot, 'retrieve_similar_quotes', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+        chatbot.embedder.embed_text.side_effect = lambda text: (
+            np.array([1.0, 0.0]) if 'love' in text else np.array([0.98, 0.1])
+        )
+        chatbot.llm.generate.return_value = 'Love wins.'
+
+        first = chatbot.query('quotes about love', username='ann')
+        second = chatbot.query('sayings on romance', username='ann')
+        other_user = chatbot.query('sayings on romance', username='bob')
+
+        assert first['response'] == second['response'] == 'Love wins.'
+        assert chatbot.llm.generate.call_count == 2
+        assert other_user['method'] == 'rag'
+        assert chatbot.cache_stats()['responses']['hits'] == 1
+
+
+@pytest.mark.unit
+class TestRAGChatbotHealth:
+    """Test background health checking"""
+
+    def test_check_health_records_status(self, chatbot):
+        """Test health checks record embedding and LLM status"""
+        chatbot.embedder.health_check.return_value = True
+        chatbot.llm.health_check.return_value = False
+
+        health = chatbot.check_health()
+
+        assert health['embeddings'] is True
+        assert health['llm'] is False
+        assert health['checked_at'] is not None
+
+    def test_monitor_runs_in_background(self, chatbot):
+        """Test the monitor thread checks health without blocking the caller"""
+        import threading
+
+        checked = threading.Event()
+        chatbot.health = {}
+        chatbot._health_thread = None
+        chatbot._health_stop = threading.Event()
+        chatbot.embedder.health_check.side_effect = lambda: checked.set() or True
+
+        chatbot.start_health_monitor(interval=60)
+
+        assert checked.wait(timeout=5)
+        chatbot._health_stop.set()
+
+
+@pytest.mark.unit
+class TestStreaming:
+    """Test token streaming from the LLM through RAGChatbot"""
+
+    def test_ollama_yields_tokens_until_done(self, mocker):
+        """Test NDJSON chunks from /api/generate are yielded as they arrive"""
+        import json
+        from services.rag.llm_providers import OllamaProvider
+
+        post = mocker.patch('services.rag.llm_providers.requests.post')
+        response = post.return_value.__enter__.return_value
+        response.iter_lines.return_value = [
+            json.dumps({'response': 'Hello', 'done': False}).encode(),
+            b'',
+            json.dumps({'response': ' there', 'done': False}).encode(),
+            json.dumps({'response': '', 'done': True}).encode(),
+        ]
+        provider = OllamaProvider(check_connection=False)
+
+        tokens = list(provider.generate_stream('prompt'))
+
+        assert tokens == ['Hello', ' there']
+        assert post.call_args[1]['json']['stream'] is True
+        assert post.call_args[1]['stream'] is True
+
+    def test_query_stream_event_order(self, chatbot, mocker):
+        """Test quotes are sent before tokens and done carries the full text"""
+        mocker.patch.object(chatbot, 'retrieve_similar_quotes', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+        chatbot.llm.generate_stream.return_value = iter(['Love ', 'wins.'])
+
+        events = list(chatbot.query_stream('love'))
+
+        assert [e['event'] for e in events] == ['quotes', 'token', 'token', 'done']
+        assert events[0]['data']['quotes'][0]['id'] == 'q1'
+        assert events[-1]['data'] == {'response': 'Love wins.', 'method': 'rag'}
+
+    def test_query_stream_fallback(self, chatbot, mocker):
+        """Test weak matches skip generation"""
+        mocker.patch.object(chatbot, 'retrieve_similar_quotes', return_value=[])
+
+        events = list(chatbot.query_stream('gibberish'))
+
+        assert [e['event'] for e in events] == ['quotes', 'done']
+        assert events[-1]['data']['method'] == 'fallback'
+        chatbot.llm.generate_stream.assert_not_called()
+
+    def test_ollama_async_stream_yields_before_done(self, mocker):
+        """Test aiohttp chunks are yielded while Ollama is still generating"""
+        import asyncio
+        import json
+        from services.rag.llm_providers import OllamaProvider
+
+        finish = asyncio.Event()
+
+        class Content:
+            async def __aiter__(self):
+                yield json.dumps({'response': 'Hello', 'done': False}).encode() + b'\n'
+                await finish.wait()
+                yield json.dumps({'response': ' there', 'done': False}).encode() + b'\n'
+                yield json.dumps({'response': '', 'done': True}).encode() + b'\n'
+
+        response = MagicMock(status=200, content=Content())
+        post = MagicMock()
+        post.return_value.__aenter__.return_value = response
+        mocker.patch('services.rag.async_http.get_async_session').return_value.post = post
+        provider = OllamaProvider(check_connection=False)
+
+        async def main():
+            stream = provider.agenerate_stream('prompt')
+            first = await asyncio.wait_for(stream.__anext__(), timeout=1)
+            finish.set()
+            return [first] + [token async for token in stream]
+
+        assert asyncio.run(main()) == ['Hello', ' there']
+        assert post.call_args[1]['json']['stream'] is True
+
+    def test_aquery_stream_event_order(self, chatbot, mocker):
+        """Test the async stream matches query_stream using the async clients"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        mocker.patch.object(chatbot, '_scan_similar_quotes', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+        chatbot.embedder.aembed_text = AsyncMock(return_value=np.array([1.0, 0.0]))
+
+        async def tokens(*args, **kwargs):
+            for token in ('Love ', 'wins.'):
+                yield token
+
+        chatbot.llm.agenerate_stream = tokens
+
+        async def main():
+            return [e async for e in chatbot.aquery_stream('love')]
+
+        events = asyncio.run(main())
+
+        assert [e['event'] for e in events] == ['quotes', 'token', 'token', 'done']
+        assert events[-1]['data'] == {'response': 'Love wins.', 'method': 'rag'}
+        chatbot.llm.generate_stream.assert_not_called()
+
+
+@pytest.mark.unit
+class TestAsyncQuery:
+    """Test the async RAG pipeline used by ASGI views"""
+
+    def test_aquery_awaits_embedding_and_llm(self, chatbot, mocker):
+        """Test aquery matches query() using the async clients"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        mocker.patch.object(chatbot, '_scan_similar_quotes', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+        chatbot.embedder.aembed_text = AsyncMock(return_value=np.array([1.0, 0.0]))
+        chatbot.llm.agenerate = AsyncMock(return_value=' Love wins. ')
+
+        result = asyncio.run(chatbot.aquery('love'))
+
+        assert result == {'response': 'Love wins.', 'quotes': [
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ], 'method': 'rag'}
+        chatbot.embedder.aembed_text.assert_awaited_once_with('love')
+        chatbot.embedder.embed_text.assert_not_called()
+
+    def test_aquery_shares_sync_caches(self, chatbot, mocker):
+        """Test a query answered synchronously is served from cache asynchronously"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        mocker.patch.object(chatbot, '_scan_similar_quotes', return_value=[])
+        chatbot.embedder.aembed_text = AsyncMock()
+
+        chatbot.query('hope')
+        result = asyncio.run(chatbot.aquery('Hope'))
+
+        assert result['method'] == 'fallback'
+        chatbot.embedder.aembed_text.assert_not_awaited()
+
+
+@pytest.mark.unit
+class TestHybridRetrieval:
+    """Test fulltext + vector retrieval fused with reciprocal rank fusion"""
+
+    def test_rrf_rewards_agreement(self):
+        """Test a quote ranked by both legs beats one ranked first by a single leg"""
+        from services.rag.hybrid import reciprocal_rank_fusion
+
+        fused = reciprocal_rank_fusion({
+            'vector': [{'id': 'a', 'similarity': 0.9}, {'id': 'b', 'similarity': 0.8}],
+            'fulltext': [{'id': 'c', 'similarity': None}, {'id': 'b', 'similarity': None}],
+        }, top_k=2)
+
+        assert [q['id'] for q in fused] == ['b', 'a']
+        assert fused[0]['sources'] == ['vector', 'fulltext']
+        assert fused[0]['similarity'] == 0.8
+
+    def test_slow_leg_is_dropped(self):
+        """Test a leg that misses its budget is left out of the fusion"""
+        import time
+        from services.rag.hybrid import HybridRetriever
+
+        retriever = HybridRetriever(budgets={'vector': 0.05, 'fulltext': 1.0})
+        results, complete = retriever.retrieve('love', 3, {
+            'vector': lambda q, k: time.sleep(0.5) or [{'id': 'slow'}],
+            'fulltext': lambda q, k: [{'id': 'fast', 'similarity': None}],
+        })
+
+        assert [q['id'] for q in results] == ['fast']
+        assert complete is False
+        assert retriever.stats()['dropped'] == {'vector': 1}
+
+    def test_degraded_results_are_not_cached(self, chatbot, mocker):
+        """Test hybrid results missing a leg are retried on the next query"""
+        from services.rag.hybrid import HybridRetriever
+
+        chatbot.retrieval_mode = 'hybrid'
+        chatbot.hybrid = HybridRetriever()
+        mocker.patch('services.rag.rag_chatbot.fulltext_search', side_effect=RuntimeError('down'))
+        mocker.patch.object(chatbot, '_warm_index')
+        mocker.patch.object(chatbot, '_search', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+
+        chatbot.retrieve_similar_quotes('love', top_k=3)
+        results = chatbot.retrieve_similar_quotes('love', top_k=3)
+
+        assert results[0]['id'] == 'q1'
+        assert chatbot._search.call_count == 2
+        assert chatbot.hybrid.stats()['failed'] == {'fulltext': 2}
+
+    def test_vector_budget_excludes_embedding_and_index_load(self, chatbot, mocker):
+        """Test a slow query embedding or index load does not drop the vector leg"""
+        import time
+        from services.rag.hybrid import HybridRetriever
+
+        chatbot.retrieval_mode = 'hybrid'
+        chatbot.hybrid = HybridRetriever(budgets={'vector': 0.05, 'fulltext': 1.0})
+        chatbot.embedder.embed_text.side_effect = lambda q: time.sleep(0.1) or np.array([1.0, 0.0])
+        mocker.patch.object(chatbot, '_warm_index', side_effect=lambda mode: time.sleep(0.1))
+        mocker.patch('services.rag.rag_chatbot.fulltext_search', return_value=[])
+        mocker.patch.object(chatbot, '_search', return_value=[
+            {'id': 'q1', 'text': 'Love all.', 'author': 'Shakespeare', 'work': None, 'similarity': 0.9}
+        ])
+
+        results = chatbot.retrieve_similar_quotes('love', top_k=3)
+
+        assert results[0]['id'] == 'q1'
+        assert chatbot.hybrid.stats()['dropped'] == {}
+
+    def test_failed_embedding_falls_back_to_fulltext(self, chatbot, mocker):
+        """Test hybrid retrieval answers from fulltext alone when the query cannot be embedded"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from services.rag.hybrid import HybridRetriever
+
+        chatbot.retrieval_mode = 'hybrid'
+        chatbot.hybrid = HybridRetriever()
+        chatbot.embedder.aembed_text = AsyncMock(side_effect=RuntimeError('ollama down'))
+        fulltext = mocker.patch('services.rag.rag_chatbot.fulltext_search', return_value=[
+            {'id': 'q2', 'text': 'Love is blind.', 'author': 'Chaucer', 'work': None,
+             'similarity': None, 'score': 1.5}
+        ])
+
+        asyncio.run(chatbot.aretrieve_similar_quotes('love', top_k=3))
+        results = asyncio.run(chatbot.aretrieve_similar_quotes('love', top_k=3))
+
+        assert results[0]['id'] == 'q2'
+        assert fulltext.call_count == 2
+        assert chatbot.hybrid.stats()['failed'] == {'vector': 2}
+
+    def test_fulltext_only_match_is_not_weak(self):
+        """Test keyword hits without a cosine similarity still get answered"""
+        from services.rag.rag_chatbot import weak_match
+
+        assert weak_match([]) is True
+        assert weak_match([{'similarity': 0.1}]) is True
+        assert weak_match([{'similarity': None}]) is False
@@ -0,0 +1,98 @@
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+
+
+def make_index(authors, dim=8, seed=0):
+    from services.rag.vector_index import QuoteVectorIndex
+
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(len(authors), dim)).astype(np.float32)
+    ids = [f'q{i}' for i in range(len(authors))]
+    quotes = [{'text': f'quote {i}', 'author': author, 'work': None} for i, author in enumerate(authors)]
+    return QuoteVectorIndex(ids, matrix, quotes)
+
+
+@pytest.mark.unit
+class TestKnnGraph:
+    """Test the blocked all-pairs nearest neighbour computation"""
+
+    def test_matches_brute_force_across_blocks(self):
+        """Test blocked top-k agrees with a full similarity matrix and skips self"""
+        from services.rag.similarity_graph import knn_graph
+
+        index = make_index(['a'] * 50)
+        full = index.matrix @ index.matrix.T
+        np.fill_diagonal(full, -np.inf)
+
+        neighbours, similarities = knn_graph(index.matrix, k=4, block_size=7)
+
+        expected = np.argsort(-full, axis=1)[:, :4]
+        np.testing.assert_array_equal(neighbours, expected)
+        np.testing.assert_allclose(similarities, np.take_along_axis(full, expected, axis=1), rtol=1e-5)
+        assert not np.any(neighbours == np.arange(50)[:, None])
+
+    def test_block_size_fits_memory_budget(self):
+        """Test the default block size keeps one block's scores within the budget"""
+        from services.rag.similarity_graph import KNN_BYTES_PER_SCORE, knn_block_size
+
+        block = knn_block_size(150_000, budget_mb=256)
+
+        assert block * 150_000 * KNN_BYTES_PER_SCORE <= 256 * 1024 * 1024
+        assert 64 <= block < 1024
+        assert knn_block_size(10 ** 9, budget_mb=1) == 1
+
+    def test_k_is_capped(self):
+        """Test k larger than the corpus returns every other row"""
+        from services.rag.similarity_graph import knn_graph
+
+        neighbours, _ = knn_graph(make_index(['a', 'b', 'c']).matrix, k=10)
+
+        assert neighbours.shape == (3, 2)
+
+
+@pytest.mark.unit
+class TestSimilarityEdges:
+    """Test quote and author edge rows"""
+
+    def test_quote_edges_drop_weak_neighbours(self):
+        """Test edges below min_score are not written and ranks start at 1"""
+        from services.rag.similarity_graph import quote_edges
+
+        index = make_index(['a', 'b', 'c'])
+        neighbours = np.array([[1, 2], [0, 2], [0, 1]])
+        similarities = np.array([[0.9, 0.2], [0.9, 0.6], [0.6, 0.6]], dtype=np.float32)
+
+        rows = quote_edges(index, neighbours, similarities, min_score=0.5)
+
+        assert rows[0] == {'id': 'q0', 'neighbours': [{'id': 'q1', 'score': pytest.approx(0.9), 'rank': 1}]}
+        assert len(rows[1]['neighbours']) == 2
+
+    def test_author_edges_aggregate_and_normalize(self):
+        """Test author scores sum quote edges over sqrt of both quote counts"""
+        from services.rag.similarity_graph import author_edges
+
+        index = make_index(['a', 'a', 'b', 'c', 'Unknown'])
+        neighbours = np.array([[2, 1], [2, 3], [0, 1], [1, 4], [0, 1]])
+        similarities = np.full((5, 2), 0.8, dtype=np.float32)
+
+        rows = {row['author']: row['neighbours'] for row in author_edges(index, neighbours, similarities)}
+
+        assert set(rows) == {'a', 'b', 'c'}
+        assert [n['author'] for n in rows['a']] == ['b', 'c']
+        assert rows['a'][0]['score'] == pytest.approx(1.6 / np.sqrt(2))
+        assert rows['a'][0]['quotes'] == 2
+        assert rows['c'] == [{'author': 'a', 'score': pytest.approx(0.8 / np.sqrt(2)), 'rank': 1, 'quotes': 1}]
+
+    def test_write_edges_batches(self):
+        """Test rows are written in batched write transactions"""
+        from services.rag.similarity_graph import write_edges, WRITE_QUOTE_EDGES_CYPHER
+
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        rows = [{'id': f'q{i}', 'neighbours': [{'id': 'x', 'score': 0.9, 'rank': 1}]} for i in range(5)]
+
+        written = write_edges(driver, WRITE_QUOTE_EDGES_CYPHER, rows, batch_size=2)
+
+        assert written == 5
+        assert session.execute_write.call_count == 3
@@ -0,0 +1,239 @@
+import pytest
+import numpy as np
+
+
+def make_index(n=200, dim=16, seed=0):
+    from services.rag.vector_index import QuoteVectorIndex
+
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f'q{i}' for i in range(n)]
+    quotes = [{'text': f'quote {i}', 'author': f'author {i}', 'work': None} for i in range(n)]
+    return QuoteVectorIndex(ids, matrix, quotes), matrix
+
+
+@pytest.mark.unit
+class TestQuoteVectorIndex:
+    """Test the in-memory vector index"""
+
+    def test_rows_are_normalized(self):
+        """Test the matrix is float32 with unit-length rows"""
+        index, _ = make_index()
+
+        assert index.matrix.dtype == np.float32
+        assert index.matrix.flags['C_CONTIGUOUS']
+        np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-5)
+
+    def test_top_k_matches_brute_force(self):
+        """Test argpartition top-k agrees with a full sort of cosine scores"""
+        index, matrix = make_index()
+        query = np.random.default_rng(1).normal(size=16)
+
+        rows, scores = index.top_k(query, top_k=5)
+
+        expected = [
+            float(np.dot(query, m) / (np.linalg.norm(query) * np.linalg.norm(m)))
+            for m in matrix
+        ]
+        assert list(rows) == list(np.argsort(expected)[::-1][:5])
+        np.testing.assert_allclose(scores, sorted(expected, reverse=True)[:5], rtol=1e-4)
+
+    def test_search_returns_quote_dicts(self):
+        """Test search returns retrieval-formatted results, best first"""
+        index, matrix = make_index()
+
+        results = index.search(matrix[42], top_k=3)
+
+        assert results[0]['id'] == 'q42'
+        assert results[0]['text'] == 'quote 42'
+        assert results[0]['author'] == 'author 42'
+        assert results[0]['similarity'] == pytest.approx(1.0, abs=1e-5)
+        assert len(results) == 3
+
+    def test_dimension_mismatch(self):
+        """Test a query with the wrong dimension is rejected"""
+        index, _ = make_index()
+
+        with pytest.raises(ValueError):
+            index.top_k(np.ones(8), top_k=3)
+
+
+@pytest.mark.unit
+class TestEmbeddingStore:
+    """Test the memory-mapped embedding store"""
+
+    def test_store_round_trip(self, tmp_path):
+        """Test a written store maps back read-only with identical results"""
+        from services.rag.vector_index import QuoteVectorIndex, write_embedding_store
+
+        index, matrix = make_index(n=50)
+        rows = [
+            {'id': f'q{i}', 'embedding': matrix[i].tolist(),
+             'text': f'quote {i}', 'author': f'author {i}', 'work': None}
+            for i in range(50)
+        ]
+        path = str(tmp_path / 'quotes')
+
+        assert write_embedding_store(path, rows, model='test-model') == 50
+        mapped = QuoteVectorIndex.from_store(path)
+
+        assert isinstance(mapped.matrix, np.memmap)
+        assert not mapped.matrix.flags['WRITEABLE']
+        np.testing.assert_allclose(mapped.matrix, index.matrix, rtol=1e-6)
+        assert isinstance(mapped.ids.blob, np.memmap)
+        assert mapped.search(matrix[7], top_k=1)[0] == {
+            'id': 'q7', 'text': 'quote 7', 'author': 'author 7', 'work': None,
+            'similarity': pytest.approx(1.0, abs=1e-5),
+        }
+
+    def test_store_publishes_versions(self, tmp_path):
+        """Test a rewrite swaps the manifest and keeps only the previous version"""
+        import os
+        from services.rag.vector_index import QuoteVectorIndex, read_store_manifest, write_embedding_store
+
+        path = str(tmp_path / 'quotes')
+        for n in (1, 2, 3):
+            write_embedding_store(path, [
+                {'id': f'q{i}', 'embedding': [1.0, float(i)], 'text': 't', 'author': 'a', 'work': 'w'}
+                for i in range(n)
+            ])
+        old = QuoteVectorIndex.from_store(path)
+        write_embedding_store(path, [])
+
+        assert read_store_manifest(path)['version'] == 3
+        assert sorted(os.listdir(tmp_path)) == ['quotes.manifest.json', 'quotes.v2', 'quotes.v3']
+        assert len(QuoteVectorIndex.from_store(path)) == 0
+        assert list(old.ids) == ['q0', 'q1', 'q2']
+
+    def test_shared_index_prefers_store(self, tmp_path, mocker):
+        """Test the shared index maps the store instead of querying Neo4j"""
+        from services.rag import vector_index
+
+        path = str(tmp_path / 'quotes')
+        vector_index.write_embedding_store(path, [
+            {'id': 'q0', 'embedding': [1.0, 0.0], 'text': 't', 'author': 'a', 'work': None}
+        ])
+        driver = mocker.MagicMock()
+        vector_index.reset_shared_index()
+        try:
+            index = vector_index.get_shared_index(driver, store_path=path)
+        finally:
+            vector_index.reset_shared_index()
+
+        assert len(index) == 1
+        driver.session.assert_not_called()
+
+
+@pytest.mark.unit
+class TestIVFFlatIndex:
+    """Test the approximate IVF-flat index"""
+
+    def test_every_row_is_in_one_list(self):
+        """Test the inverted lists partition the rows"""
+        from services.rag.ann_index import IVFFlatIndex
+
+        index, _ = make_index(n=300)
+        ann = IVFFlatIndex.build(index, nlist=10)
+
+        assert ann.list_offsets[-1] == 300
+        assert sorted(ann.list_rows.tolist()) == list(range(300))
+
+    def test_full_probe_equals_exact_search(self):
+        """Test probing every list gives the exact top-k"""
+        from services.rag.ann_index import IVFFlatIndex, benchmark_recall, sample_queries
+
+        index, _ = make_index(n=300)
+        ann = IVFFlatIndex.build(index, nlist=10)
+        queries = sample_queries(index, 20)
+
+        stats = benchmark_recall(index, ann, queries, k=5, nprobe=10)
+
+        assert stats['recall'] == 1.0
+
+    def test_save_and_load(self, tmp_path):
+        """Test the lists persist next to the store"""
+        from services.rag.ann_index import IVFFlatIndex
+
+        index, matrix = make_index(n=300)
+        ann = IVFFlatIndex.build(index, nlist=10)
+        path = str(tmp_path / 'quotes')
+        ann.save(path)
+
+        loaded = IVFFlatIndex.load(index, path, nprobe=3)
+
+        np.testing.assert_array_equal(loaded.list_rows, ann.list_rows)
+        assert loaded.search(matrix[5], top_k=1)[0]['id'] == 'q5'
+
+    def test_load_rejects_other_rows(self, tmp_path):
+        """Test lists saved for a store with the same row count but other ids are stale"""
+        from services.rag.ann_index import IVFFlatIndex
+        from services.rag.vector_index import QuoteVectorIndex
+
+        index, matrix = make_index(n=300)
+        path = str(tmp_path / 'quotes')
+        IVFFlatIndex.build(index, nlist=10).save(path)
+        other = QuoteVectorIndex([f'r{i}' for i in range(300)], matrix, index.quotes)
+
+        with pytest.raises(ValueError):
+            IVFFlatIndex.load(other, path)
+
+    def test_shared_index_rebuilds_stale_lists(self, tmp_path, mocker):
+        """Test the shared IVF index is rebuilt when the store was rewritten"""
+        from services.rag import ann_index
+        from services.rag.vector_index import write_embedding_store
+
+        index, matrix = make_index(n=100)
+        path = str(tmp_path / 'quotes')
+        ann_index.IVFFlatIndex.build(index, nlist=4).save(path)
+        write_embedding_store(path, [
+            {'id': f'q{i}', 'embedding': matrix[i].tolist(), 'text': 't', 'author': 'a', 'work': None}
+            for i in range(100)
+        ], model='other-model')
+        mocker.patch.object(ann_index, 'get_shared_index',
+                            return_value=ann_index.QuoteVectorIndex.from_store(path))
+        build = mocker.spy(ann_index.IVFFlatIndex, 'build')
+        ann_index.reset_shared_ann_index()
+        try:
+            ann_index.get_shared_ann_index(mocker.MagicMock(), store_path=path)
+        finally:
+            ann_index.reset_shared_ann_index()
+
+        build.assert_called_once()
+
+
+@pytest.mark.unit
+class TestNeo4jVectorIndex:
+    """Test retrieval through the Neo4j native vector index"""
+
+    def mock_driver(self, mocker, records):
+        driver = mocker.MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        session.run.return_value = records
+        return driver, session
+
+    def test_search_maps_scores_to_cosine(self, mocker):
+        """Test only top-k rows are requested and scores map back to cosine"""
+        from services.rag.vector_index import Neo4jVectorIndex, NEO4J_VECTOR_INDEX
+
+        driver, session = self.mock_driver(mocker, [
+            {'id': 'q1', 'text': 'Be yourself.', 'author': 'Oscar Wilde', 'work': None, 'score': 0.9},
+        ])
+
+        results = Neo4jVectorIndex(driver).search(np.ones(4), top_k=3)
+
+        kwargs = session.run.call_args[1]
+        assert kwargs['index'] == NEO4J_VECTOR_INDEX
+        assert kwargs['k'] == 3
+        assert results[0]['id'] == 'q1'
+        assert results[0]['similarity'] == pytest.approx(0.8)
+
+    def test_ensure_index_detects_dimensions(self, mocker):
+        """Test index creation uses the size of a stored embedding"""
+        from services.rag.vector_index import ensure_neo4j_vector_index
+
+        driver, session = self.mock_driver(mocker, mocker.MagicMock())
+        session.run.return_value.single.return_value = {'dimensions': 768}
+
+        assert ensure_neo4j_vector_index(driver) == 768
+        create_query = session.run.call_args_list[-1][0][0]
+        assert '`vector.dimensions`: 768' in create_query
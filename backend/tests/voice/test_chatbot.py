@@ -12,6 +12,17 @@ class TestQuoteChatbot:
         chatbot = QuoteChatbot()
         assert chatbot is not None
     
+    def test_rag_chatbot_imports_from_services_path(self, monkeypatch):
+        """Test the RAG path imports rag.rag_chatbot as a top-level package"""
+        from backend.voice.chatbot import QuoteChatbot
+        
+        monkeypatch.setenv('ENABLE_RAG', 'true')
+        with patch('rag.rag_chatbot.RAGChatbot') as rag_chatbot:
+            chatbot = QuoteChatbot()
+        
+        rag_chatbot.assert_called_once()
+        assert chatbot.rag_bot is rag_chatbot.return_value
+    
     @patch('backend.voice.chatbot.requests.get')
     def test_search_quote_success(self, mock_get):
         """Test successful quote search"""
@@ -95,4 +106,26 @@ class TestQuoteChatbot:
         assert 'query' in result
         assert 'response' in result
         assert 'quote_found' in result
-        assert result['quote_found'] is True
\ No newline at end of file
+        assert result['quote_found'] is True    
+    def test_async_search_uses_search_endpoint_logic(self, mocker):
+        """Test asearch_quote goes through the search cache and backend like the endpoint"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from backend.quotes import views
+        from backend.quotes.search_cache import SearchCache
+        from backend.voice.chatbot import QuoteChatbot
+        
+        mocker.patch.object(views, 'search_cache', SearchCache())
+        search_rows = mocker.patch.object(views, 'search_rows', AsyncMock(return_value=([
+            {'qid': 'q1', 'short_text': 'Be yourself.', 'full_text': 'Be yourself.',
+             'author': 'Oscar Wilde', 'score': 2.5}
+        ], 'yourself')))
+        chatbot = QuoteChatbot()
+        
+        first = asyncio.run(chatbot.aprocess_query(' yourslef '))
+        second = asyncio.run(chatbot.asearch_quote('yourslef'))
+        
+        assert first['quote_data'] == second
+        assert second['quote_id'] == 'q1'
+        search_rows.assert_awaited_once_with('yourslef', views.SEARCH_DEFAULT_K)
+        assert asyncio.run(chatbot.asearch_quote('a')) is None
@@ -101,6 +101,21 @@ class QuoteChatbot:
             return None
     
     
+    async def asearch_quote(self, query: str) -> Optional[Dict]:
+        """Async search_quote; runs the search endpoint's logic (cache, prefix
+        index, spell correction) in-process instead of calling our own HTTP API"""
+        from backend.quotes.views import SEARCH_DEFAULT_K, search_hits
+        
+        query = (query or "").strip()
+        if len(query) < 2:
+            return None
+        try:
+            hits, _ = await search_hits(query, SEARCH_DEFAULT_K)
+            return hits[0] if hits else None
+        except Exception as e:
+            print(f"Error searching quote: {e}")
+            return None
+    
     def craft_response(self, user_query: str, quote_data: Optional[Dict] = None, 
                       username: str = None, accent: str = 'american') -> str:
         """Craft response with personalization"""
@@ -204,3 +219,15 @@ class QuoteChatbot:
             'quote_found': quote_data is not None,
             'quote_data': quote_data
         }
+    
+    async def aprocess_query(self, user_query: str, username: str = None, accent: str = 'american') -> Dict:
+        """Async process_query for ASGI views"""
+        quote_data = await self.asearch_quote(user_query)
+        response_text = self.craft_response(user_query, quote_data, username, accent)
+        
+        return {
+            'query': user_query,
+            'response': response_text,
+            'quote_found': quote_data is not None,
+            'quote_data': quote_data
+        }
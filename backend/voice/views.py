@@ -8,6 +8,8 @@ from django.utils import timezone
 import os
 import sys
 import base64
+import asyncio
+from asgiref.sync import sync_to_async
 
 
 # Import services
@@ -15,6 +17,7 @@ from services.voice.asr.whisper_service import WhisperASR
 from services.voice.speaker_id.ecapa_service import SpeakerIdentifier
 from services.voice.tts.gtts_service import GTTSService
 from .chatbot import QuoteChatbot
+from backend.quotes.async_api import async_api_view
 
 # Initialize services (singleton pattern)
 asr_service = None
@@ -223,9 +226,8 @@ def list_speakers(request):
         )
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def voice_query(request):
+@async_api_view(['POST'], permission_class=IsAuthenticated)
+async def voice_query(request):
     """Voice pipeline: ASR → RAG → TTS (no speaker identification)"""
     if 'audio' not in request.FILES:
         return Response({'error': 'No audio file provided'}, status=status.HTTP_400_BAD_REQUEST)
@@ -237,28 +239,30 @@ def voice_query(request):
         audio_bytes = audio_file.read()
         
         # Get user's accent preference from profile
-        user_accent = user.profile.tts_voice_type
+        profile = await sync_to_async(lambda: user.profile)()
+        user_accent = profile.tts_voice_type
         username = user.first_name or user.username
         
-        # Step 1: Transcribe only (no speaker identification)
+        # Step 1: Transcribe only (no speaker identification); Whisper is CPU-bound
         asr = get_asr_service()
-        transcription_result = asr.transcribe_bytes(audio_bytes)
+        transcription_result = await asyncio.to_thread(asr.transcribe_bytes, audio_bytes)
         user_query = transcription_result['text']
         
         # Step 2: Process with RAG chatbot
         chatbot = QuoteChatbot()
-        chat_result = chatbot.process_query(user_query, username=username, accent=user_accent)
+        chat_result = await chatbot.aprocess_query(user_query, username=username, accent=user_accent)
         response_text = chat_result['response']
         
         # Step 3: Synthesize with user's selected accent
         tts = get_tts_service()
-        response_audio = tts.synthesize_to_bytes(response_text, speaker_id=user.username)
+        response_audio = await asyncio.to_thread(
+            tts.synthesize_to_bytes, response_text, speaker_id=user.username
+        )
         
         # Update statistics
-        profile = user.profile
         profile.queries_count += 1
         profile.last_query = timezone.now()
-        profile.save()
+        await profile.asave()
         
         # Encode audio
         audio_base64 = base64.b64encode(response_audio).decode('utf-8') if response_audio else None
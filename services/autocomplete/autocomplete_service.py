@@ -1,51 +1,58 @@
 from fastapi import FastAPI, Query
 from fastapi.responses import JSONResponse
-from elasticsearch import Elasticsearch
 from dotenv import load_dotenv
 import os
 
+from services.autocomplete.prefix_index import get_shared_engine, get_loaded_engine
+from services.neo4j_driver import create_driver
+
 load_dotenv()
 
 # Initialize FastAPI app
 app = FastAPI(title="Wikiquote Autocomplete API")
 
-# Connect to Elasticsearch
-ES_URI = os.getenv("ES_URI", "http://localhost:9200")
-INDEX_NAME = "wikiquote"
+# Only used to build the index when no persisted one exists
+NEO4J_URI = os.getenv("NEO4J_URI")
+NEO4J_USER = os.getenv("NEO4J_USER")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+
+def load_engine():
+    """Load (or build from Neo4j) the process-wide engine; run once at startup"""
+    if not NEO4J_URI:
+        return get_shared_engine()
+    driver = create_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        return get_shared_engine(driver)
+    finally:
+        driver.close()
+
+
+@app.on_event("startup")
+def startup():
+    load_engine()
 
-es = Elasticsearch(ES_URI)
 
 @app.get("/autocomplete")
-def autocomplete(text: str = Query(..., min_length=2, description="Text to search for")):
+def autocomplete(text: str = Query(..., min_length=2, description="Text to search for"),
+                 k: int = Query(5, ge=1, le=20)):
     """
-    Search for quotes matching a given text query.
+    Complete a partially typed query from the in-memory prefix index,
+    correcting typos when nothing matches.
     """
+    engine = get_loaded_engine()
+    if engine is None:
+        return JSONResponse(status_code=503, content={"error": "Autocomplete index not loaded"})
     try:
-        response = es.search(
-            index=INDEX_NAME,
-            body={
-                "query": {
-                    "multi_match": {
-                        "query": text,
-                        "fields": ["quote^3", "author"],
-                        "fuzziness": "AUTO"
-                    }
-                },
-                "size": 5,
-                "_source": ["quote", "author"]
-            }
-        )
-
-        results = [
-            {
-                "quote": hit["_source"]["quote"],
-                "author": hit["_source"]["author"],
-                "score": hit["_score"]
-            }
-            for hit in response["hits"]["hits"]
-        ]
-
-        return JSONResponse(content={"matches": results})
+        results = engine.complete(text, k)
+        return JSONResponse(content={
+            "matches": [
+                {"id": q["id"], "quote": q["text"], "author": q["author"], "score": q["score"]}
+                for q in results["quotes"]
+            ],
+            "authors": [{"name": a["name"], "score": a["score"]} for a in results["authors"]],
+            "corrected": results["corrected"],
+        })
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -54,4 +61,3 @@ def autocomplete(text: str = Query(..., min_length=2, description="Text to searc
 @app.get("/")
 def root():
     return {"message": "Wikiquote Autocomplete API is running 🚀"}
-
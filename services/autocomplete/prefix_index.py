@@ -0,0 +1,471 @@
+"""
+In-memory prefix index for quote and author autocomplete
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from .spelling import SpellingIndex
+
+# Base path of the persisted engine: <base>.quotes.{npz,json} and <base>.authors.{npz,json}
+AUTOCOMPLETE_INDEX_PATH = os.getenv('AUTOCOMPLETE_INDEX_PATH', 'data/autocomplete/index')
+
+# Results kept at each precomputed trie node; larger k falls back to a postings scan
+MAX_K = 20
+
+# Prefixes matching more postings than this get a precomputed top-k
+HEAVY_POSTINGS = 256
+
+# Tokens indexed per entry (short_text can be long)
+MAX_TOKENS = 64
+
+TOKEN_RE = re.compile(r"\w+")
+
+LOAD_QUOTES_CYPHER = """
+MATCH (a:Author)-[:SAID]->(q:Quote)
+WITH q, head(collect(a.name)) AS author
+RETURN elementId(q) AS id,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) AS text,
+       author
+"""
+
+LOAD_AUTHORS_CYPHER = """
+MATCH (a:Author)
+RETURN a.name AS name, COUNT { (a)-[:SAID]->() } AS quotes
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded word tokens"""
+    return TOKEN_RE.findall(text.casefold())
+
+
+class PrefixIndex:
+    """Top-k prefix search over the tokens of ranked entries
+
+    Entries are stored best first, so an entry's position is its rank and
+    smaller ids are better. Terms are kept sorted with their postings laid
+    out contiguously (CSR), which makes the postings of every term sharing
+    a prefix one slice, and the term ids sharing a prefix one range. Trie
+    nodes whose slice is large store their top-k entry ids; any other
+    prefix is answered from its (small) slice.
+    """
+
+    def __init__(self, entries: List[Dict], fields: Sequence[str], terms: List[str],
+                 offsets: np.ndarray, postings: np.ndarray, topk: Dict[str, np.ndarray],
+                 entry_offsets: np.ndarray, entry_terms: np.ndarray):
+        """
+        Args:
+            entries: Result dicts, best first
+            fields: Entry fields whose tokens are indexed
+            terms: Sorted vocabulary
+            offsets: (len(terms) + 1,) start of each term's postings
+            postings: Entry ids per term, ascending (best first)
+            topk: Prefix -> best MAX_K entry ids, for heavy prefixes
+            entry_offsets: (len(entries) + 1,) start of each entry's term ids
+            entry_terms: Term ids per entry (the forward index)
+        """
+        self.entries = entries
+        self.fields = tuple(fields)
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.topk = topk
+        self.entry_offsets = entry_offsets
+        self.entry_terms = entry_terms
+
+    def __len__(self):
+        return len(self.entries)
+
+    def entry_tokens(self, entry: Dict) -> List[str]:
+        tokens = []
+        for field in self.fields:
+            tokens.extend(tokenize(entry.get(field) or ''))
+        return tokens
+
+    @classmethod
+    def build(cls, entries: List[Dict], fields: Sequence[str] = ('text',),
+              score: str = 'score') -> "PrefixIndex":
+        """Index entries by the tokens of their fields, ranked by entry[score]"""
+        entries = sorted(entries, key=lambda e: e[score], reverse=True)
+        empty = np.empty(0, dtype=np.int32)
+        index = cls(entries, fields, [], np.zeros(1, dtype=np.int64), empty, {},
+                    np.zeros(1, dtype=np.int64), empty)
+
+        postings = {}
+        entry_tokens = []
+        for entry_id, entry in enumerate(entries):
+            tokens = list(dict.fromkeys(index.entry_tokens(entry)[:MAX_TOKENS]))
+            entry_tokens.append(tokens)
+            for token in tokens:
+                postings.setdefault(token, []).append(entry_id)
+
+        index.terms = sorted(postings)
+        counts = [len(postings[t]) for t in index.terms]
+        index.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        index.postings = np.fromiter(
+            (e for t in index.terms for e in postings[t]),
+            dtype=np.int32, count=int(index.offsets[-1])
+        )
+
+        term_ids = {t: i for i, t in enumerate(index.terms)}
+        index.entry_offsets = np.concatenate(
+            [[0], np.cumsum([len(tokens) for tokens in entry_tokens])]
+        ).astype(np.int64)
+        index.entry_terms = np.fromiter(
+            (term_ids[t] for tokens in entry_tokens for t in tokens),
+            dtype=np.int32, count=int(index.entry_offsets[-1])
+        )
+        if index.terms:
+            index._build_topk(0, len(index.terms), 0)
+        return index
+
+    def _build_topk(self, lo: int, hi: int, depth: int) -> np.ndarray:
+        """Best MAX_K ids for terms[lo:hi], which share their first depth characters
+
+        Heavy nodes merge the top-k of their children, so each posting is
+        read once while building.
+        """
+        start, end = self.offsets[lo], self.offsets[hi]
+        if end - start <= HEAVY_POSTINGS:
+            return np.unique(self.postings[start:end])[:MAX_K]
+
+        prefix = self.terms[lo][:depth]
+        parts = []
+        i = lo
+        if len(self.terms[i]) == depth:
+            parts.append(self.postings[self.offsets[i]:self.offsets[i + 1]][:MAX_K])
+            i += 1
+        while i < hi:
+            char = self.terms[i][depth]
+            j = bisect_left(self.terms, prefix + chr(ord(char) + 1), i, hi)
+            parts.append(self._build_topk(i, j, depth + 1))
+            i = j
+
+        top = np.unique(np.concatenate(parts))[:MAX_K]
+        if depth > 0:
+            self.topk[prefix] = top
+        return top
+
+    def _term_range(self, prefix: str):
+        """Ids [lo, hi) of the terms starting with prefix"""
+        lo = bisect_left(self.terms, prefix)
+        return lo, bisect_left(self.terms, prefix + chr(0x10FFFF), lo)
+
+    def _range(self, prefix: str):
+        lo, hi = self._term_range(prefix)
+        return self.postings[self.offsets[lo]:self.offsets[hi]]
+
+    def _has_term_in(self, entry_ids: np.ndarray, lo: int, hi: int) -> np.ndarray:
+        """Mask of entries with at least one term id in [lo, hi)"""
+        starts = self.entry_offsets[entry_ids]
+        lengths = self.entry_offsets[entry_ids + 1] - starts
+        owner = np.repeat(np.arange(len(entry_ids)), lengths)
+        # Position of every term of every entry in entry_terms
+        positions = starts[owner] + np.arange(len(owner)) - (np.cumsum(lengths) - lengths)[owner]
+        terms = self.entry_terms[positions]
+        return np.bincount(owner, weights=(terms >= lo) & (terms < hi), minlength=len(entry_ids)) > 0
+
+    def _term(self, term: str) -> np.ndarray:
+        i = bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return self.postings[self.offsets[i]:self.offsets[i + 1]]
+        return self.postings[:0]
+
+    def has_prefix(self, prefix: str) -> bool:
+        lo, hi = self._term_range(prefix)
+        return hi > lo
+
+    def has_term(self, term: str) -> bool:
+        return len(self._term(term)) > 0
+
+    def term_counts(self) -> Dict[str, int]:
+        """Number of entries containing each term"""
+        return dict(zip(self.terms, np.diff(self.offsets).tolist()))
+
+    def prefix_ids(self, prefix: str, k: int = 8) -> np.ndarray:
+        """Best k entry ids with a token starting with prefix"""
+        if k <= MAX_K:
+            top = self.topk.get(prefix)
+            if top is not None:
+                return top[:k]
+        return np.unique(self._range(prefix))[:k]
+
+    def search_ids(self, query: str, k: int = 8) -> np.ndarray:
+        """
+        Best k entry ids matching every word of query
+
+        All words but the last must match a token exactly; the last is a
+        prefix unless the query ends in whitespace.
+        """
+        tokens = tokenize(query)
+        if not tokens or k <= 0:
+            return np.empty(0, dtype=np.int32)
+        partial = not query[-1:].isspace()
+        if partial and len(tokens) == 1:
+            return self.prefix_ids(tokens[0], k)
+
+        words = tokens[:-1] if partial else tokens
+        lists = sorted((self._term(t) for t in dict.fromkeys(words)), key=len)
+        candidates = lists[0]
+        for other in lists[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, other, assume_unique=True)
+
+        if partial and len(candidates):
+            lo, hi = self._term_range(tokens[-1])
+            candidates = candidates[self._has_term_in(candidates, lo, hi)]
+        return candidates[:k]
+
+    def search(self, query: str, k: int = 8) -> List[Dict]:
+        """Best k entries matching query, as their stored dicts"""
+        return [self.entries[i] for i in self.search_ids(query, k)]
+
+    def save(self, path: str):
+        """Write <path>.npz (postings, top-k lists, forward index) and <path>.json (terms and entries)"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        prefixes = list(self.topk)
+        tops = [self.topk[p] for p in prefixes]
+        top_offsets = np.concatenate([[0], np.cumsum([len(t) for t in tops])]).astype(np.int64)
+        top_ids = np.concatenate(tops).astype(np.int32) if tops else np.empty(0, dtype=np.int32)
+
+        np.savez(f"{path}.tmp.npz", offsets=self.offsets, postings=self.postings,
+                 top_offsets=top_offsets, top_ids=top_ids,
+                 entry_offsets=self.entry_offsets, entry_terms=self.entry_terms)
+        with open(f"{path}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump({'fields': self.fields, 'terms': self.terms,
+                       'prefixes': prefixes, 'entries': self.entries}, f)
+        os.replace(f"{path}.tmp.npz", f"{path}.npz")
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    @classmethod
+    def load(cls, path: str) -> "PrefixIndex":
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(f"{path}.npz") as data:
+            top_offsets, top_ids = data['top_offsets'], data['top_ids']
+            topk = {
+                prefix: top_ids[top_offsets[i]:top_offsets[i + 1]]
+                for i, prefix in enumerate(meta['prefixes'])
+            }
+            return cls(meta['entries'], meta['fields'], meta['terms'],
+                       data['offsets'], data['postings'], topk,
+                       data['entry_offsets'], data['entry_terms'])
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(f"{path}.npz") and os.path.exists(f"{path}.json")
+
+
+class AutocompleteEngine:
+    """Quote and author prefix indexes built from the graph, with typo correction"""
+
+    def __init__(self, quotes: PrefixIndex, authors: PrefixIndex,
+                 speller: Optional[SpellingIndex] = None):
+        """
+        Args:
+            speller: Typo correction index; built from the vocabulary of
+                both indexes if omitted
+        """
+        self.quotes = quotes
+        self.authors = authors
+        if speller is None:
+            counts = quotes.term_counts()
+            for term, count in authors.term_counts().items():
+                counts[term] = counts.get(term, 0) + count
+            speller = SpellingIndex.build(counts)
+        self.speller = speller
+
+    @classmethod
+    def build(cls, quotes: List[Dict], authors: List[Dict]) -> "AutocompleteEngine":
+        """
+        Args:
+            quotes: dicts with id, text and author
+            authors: dicts with name and quotes (their quote count)
+
+        Quotes are ranked by how many quotes their author has, then by
+        length (shorter first); authors by quote count.
+        """
+        quote_counts = {a['name']: a['quotes'] for a in authors}
+        quote_entries = [
+            {'id': q['id'], 'text': q['text'], 'author': q['author'],
+             'score': float(quote_counts.get(q['author'], 0))}
+            for q in quotes if q['text']
+        ]
+        quote_entries.sort(key=lambda q: len(q['text']))
+        author_entries = [{'name': a['name'], 'score': float(a['quotes'])} for a in authors if a['name']]
+        return cls(PrefixIndex.build(quote_entries, ('text', 'author')),
+                   PrefixIndex.build(author_entries, ('name',)))
+
+    @classmethod
+    def from_neo4j(cls, driver, database: Optional[str] = None) -> "AutocompleteEngine":
+        with driver.session(database=database) as session:
+            quotes = session.run(LOAD_QUOTES_CYPHER).data()
+            authors = session.run(LOAD_AUTHORS_CYPHER).data()
+        return cls.build(quotes, authors)
+
+    def save(self, path: str = AUTOCOMPLETE_INDEX_PATH):
+        self.quotes.save(f"{path}.quotes")
+        self.authors.save(f"{path}.authors")
+
+    @classmethod
+    def load(cls, path: str = AUTOCOMPLETE_INDEX_PATH) -> "AutocompleteEngine":
+        return cls(PrefixIndex.load(f"{path}.quotes"), PrefixIndex.load(f"{path}.authors"))
+
+    @staticmethod
+    def exists(path: str = AUTOCOMPLETE_INDEX_PATH) -> bool:
+        return PrefixIndex.exists(f"{path}.quotes") and PrefixIndex.exists(f"{path}.authors")
+
+    def _known(self, token: str, partial: bool) -> bool:
+        if partial:
+            return self.quotes.has_prefix(token) or self.authors.has_prefix(token)
+        return self.quotes.has_term(token) or self.authors.has_term(token)
+
+    def correct_query(self, query: str) -> Optional[str]:
+        """
+        Replace words that match nothing with their closest known word
+
+        A final word still being typed is kept while it prefixes some word.
+
+        Returns:
+            The corrected query, or None if no word was changed
+        """
+        tokens = tokenize(query)
+        partial = not query[-1:].isspace()
+        corrected = [
+            token if self._known(token, partial and i == len(tokens) - 1) else self.speller.correct(token)
+            for i, token in enumerate(tokens)
+        ]
+        if corrected == tokens:
+            return None
+        return " ".join(corrected) + ("" if partial else " ")
+
+    def search_quotes(self, query: str, k: int = 8):
+        """
+        Best k quotes, retried with a corrected query when nothing matches
+
+        Returns:
+            (quote entries, corrected query or None)
+        """
+        results = self.quotes.search(query, k)
+        if not results:
+            corrected = self.correct_query(query)
+            if corrected is not None:
+                return self.quotes.search(corrected, k), corrected
+        return results, None
+
+    def complete(self, query: str, k: int = 8) -> Dict:
+        """Best k quotes and best k authors for a partially typed query
+
+        When neither index matches, the query is spell-corrected and retried;
+        'corrected' holds the query actually used, or None.
+        """
+        results = {'quotes': self.quotes.search(query, k), 'authors': self.authors.search(query, k),
+                   'corrected': None}
+        if not results['quotes'] and not results['authors']:
+            corrected = self.correct_query(query)
+            if corrected is not None:
+                results = {'quotes': self.quotes.search(corrected, k),
+                           'authors': self.authors.search(corrected, k),
+                           'corrected': corrected}
+        return results
+
+
+# Process-wide engine, loaded on first use
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_shared_engine(driver=None, path: str = AUTOCOMPLETE_INDEX_PATH,
+                      database: Optional[str] = None) -> AutocompleteEngine:
+    """Return the process-wide engine
+
+    On first call, loads the persisted index if one exists and otherwise
+    builds it from Neo4j through driver.
+    """
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                if AutocompleteEngine.exists(path):
+                    engine = AutocompleteEngine.load(path)
+                    source = path
+                elif driver is not None:
+                    engine = AutocompleteEngine.from_neo4j(driver, database)
+                    source = "Neo4j"
+                else:
+                    raise RuntimeError(f"No autocomplete index at {path} and no Neo4j driver to build one")
+                print(f"✓ Loaded autocomplete index from {source}: "
+                      f"{len(engine.quotes)} quotes, {len(engine.authors)} authors")
+                _shared_engine = engine
+    return _shared_engine
+
+
+def get_loaded_engine() -> Optional[AutocompleteEngine]:
+    """The process-wide engine if it has already been loaded, without loading it"""
+    return _shared_engine
+
+
+def reset_shared_engine():
+    """Drop the process-wide engine so the next query reloads it"""
+    global _shared_engine
+    with _shared_engine_lock:
+        _shared_engine = None
+
+
+def benchmark_latency(index: PrefixIndex, queries: List[str], k: int = 8, repeat: int = 5) -> Dict:
+    """Mean and p99 search latency in microseconds"""
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            index.search_ids(query, k)
+            timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings) * 1e6
+    return {'mean_us': float(timings.mean()), 'p99_us': float(np.percentile(timings, 99)),
+            'queries': len(timings)}
+
+
+def sample_prefixes(index: PrefixIndex, count: int = 500, seed: int = 1) -> List[str]:
+    """1-6 character prefixes of random indexed terms, for benchmarking"""
+    rng = np.random.default_rng(seed)
+    terms = [index.terms[i] for i in rng.integers(0, len(index.terms), size=count)]
+    return [t[:int(rng.integers(1, 7))] for t in terms]
+
+
+if __name__ == "__main__":
+    from services.neo4j_driver import create_driver
+
+    parser = argparse.ArgumentParser(description='Build and benchmark the autocomplete prefix index')
+    parser.add_argument('--path', default=AUTOCOMPLETE_INDEX_PATH, help='Index base path')
+    parser.add_argument('--benchmark', action='store_true', help='Only benchmark the persisted index')
+    parser.add_argument('--queries', type=int, default=500, help='Benchmark queries')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        engine = AutocompleteEngine.load(args.path)
+    else:
+        driver = create_driver()
+        try:
+            start = time.perf_counter()
+            engine = AutocompleteEngine.from_neo4j(driver)
+        finally:
+            driver.close()
+        engine.save(args.path)
+        print(f"✅ Indexed {len(engine.quotes)} quotes ({len(engine.quotes.terms)} terms, "
+              f"{len(engine.quotes.topk)} precomputed prefixes) and {len(engine.authors)} authors "
+              f"in {time.perf_counter() - start:.1f}s -> {args.path}")
+
+    for name, index in (('quotes', engine.quotes), ('authors', engine.authors)):
+        if not index.terms:
+            continue
+        stats = benchmark_latency(index, sample_prefixes(index, args.queries))
+        print(f"  {name:<8} mean={stats['mean_us']:.1f}us  p99={stats['p99_us']:.1f}us")
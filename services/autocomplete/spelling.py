@@ -0,0 +1,237 @@
+"""
+Typo correction for autocomplete with a SymSpell-style deletion index
+"""
+import argparse
+import os
+import time
+from bisect import bisect_left
+from itertools import combinations
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Characters of each word whose deletes are indexed (SymSpell prefix length)
+PREFIX_LENGTH = 7
+
+# Words seen in fewer entries are not suggested as corrections
+MIN_COUNT = 2
+
+# Shorter words are never corrected
+MIN_WORD_LENGTH = 3
+
+# Lucene fuzzy query (term~), the baseline for benchmark()
+FUZZY_QUERY_CYPHER = """
+CALL db.index.fulltext.queryNodes($index, $q, {limit: 1})
+YIELD node, score
+RETURN count(node) AS hits
+"""
+
+
+def max_distance(word: str) -> int:
+    """Edits allowed for a word, as Elasticsearch's fuzziness AUTO"""
+    if len(word) < MIN_WORD_LENGTH:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def deletes(word: str, distance: int) -> set:
+    """The word and every string reachable from it by up to distance deletions"""
+    found = {word}
+    for d in range(1, min(distance, len(word)) + 1):
+        for removed in combinations(range(len(word)), d):
+            found.add("".join(c for i, c in enumerate(word) if i not in removed))
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellingIndex:
+    """Deletion-neighbourhood index over a word vocabulary
+
+    Each word is indexed under every string obtained by deleting up to two
+    characters from its first PREFIX_LENGTH characters. A misspelling is
+    looked up under its own deletes, so candidates are found with a fixed
+    number of probes however large the vocabulary, and only those
+    candidates are checked with a real edit distance.
+
+    Deletes are kept as a sorted array of their hashes, with the word id of
+    each, rather than a dict of strings; hash collisions only add
+    candidates that fail the distance check.
+    """
+
+    def __init__(self, words: List[str], counts: np.ndarray, hashes: np.ndarray, word_ids: np.ndarray):
+        """
+        Args:
+            words: Sorted vocabulary
+            counts: Number of entries containing each word
+            hashes: Sorted hashes of every indexed delete
+            word_ids: Word id of each delete, aligned with hashes
+        """
+        self.words = words
+        self.counts = counts
+        self.hashes = hashes
+        self.word_ids = word_ids
+
+    def __len__(self):
+        return len(self.words)
+
+    @classmethod
+    def build(cls, word_counts: Dict[str, int], min_count: int = MIN_COUNT) -> "SpellingIndex":
+        """Index the words seen at least min_count times (alphabetic, MIN_WORD_LENGTH or longer)"""
+        words = sorted(
+            w for w, c in word_counts.items()
+            if c >= min_count and len(w) >= MIN_WORD_LENGTH and w.isalpha()
+        )
+        counts = np.asarray([word_counts[w] for w in words], dtype=np.int64)
+
+        hashes, word_ids = [], []
+        for word_id, word in enumerate(words):
+            for delete in deletes(word[:PREFIX_LENGTH], 2):
+                hashes.append(hash(delete))
+                word_ids.append(word_id)
+        hashes = np.asarray(hashes, dtype=np.int64)
+        word_ids = np.asarray(word_ids, dtype=np.int32)
+        order = np.argsort(hashes, kind='stable')
+        return cls(words, counts, hashes[order], word_ids[order])
+
+    def __contains__(self, word: str) -> bool:
+        i = bisect_left(self.words, word)
+        return i < len(self.words) and self.words[i] == word
+
+    def candidates(self, word: str, distance: int) -> set:
+        """Ids of words sharing a delete with word"""
+        probes = np.fromiter((hash(d) for d in deletes(word[:PREFIX_LENGTH], distance)), dtype=np.int64)
+        los = np.searchsorted(self.hashes, probes, side='left')
+        his = np.searchsorted(self.hashes, probes, side='right')
+        found = set()
+        for lo, hi in zip(los.tolist(), his.tolist()):
+            found.update(self.word_ids[lo:hi].tolist())
+        return found
+
+    def lookup(self, word: str, distance: Optional[int] = None) -> Optional[Tuple[str, int, int]]:
+        """
+        Closest known word, preferring fewer edits then more frequent words
+
+        Returns:
+            (word, distance, count), or None if nothing is within distance
+        """
+        distance = max_distance(word) if distance is None else distance
+        if word in self:
+            i = bisect_left(self.words, word)
+            return word, 0, int(self.counts[i])
+        if distance == 0:
+            return None
+
+        best = None
+        for word_id in self.candidates(word, distance):
+            candidate = self.words[word_id]
+            d = edit_distance(word, candidate, distance)
+            if d > distance:
+                continue
+            key = (d, -self.counts[word_id], candidate)
+            if best is None or key < best:
+                best = key
+        if best is None:
+            return None
+        return best[2], best[0], int(-best[1])
+
+    def correct(self, word: str) -> str:
+        """The closest known word, or word itself if there is none"""
+        match = self.lookup(word)
+        return match[0] if match else word
+
+
+def make_typo(word: str, rng) -> str:
+    """Apply one random deletion, insertion, substitution or transposition"""
+    i = int(rng.integers(0, len(word)))
+    letter = chr(int(rng.integers(ord('a'), ord('z') + 1)))
+    edit = int(rng.integers(0, 4))
+    if edit == 0:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + letter + word[i:]
+    if edit == 2:
+        return word[:i] + letter + word[i + 1:]
+    if i == len(word) - 1:
+        i -= 1
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def benchmark(index: SpellingIndex, count: int = 500, seed: int = 1, driver=None,
+              fulltext_index: str = 'quoteTextIndex') -> Dict:
+    """
+    Correct random one-edit typos of indexed words
+
+    With a driver, also times the same words as Lucene fuzzy queries
+    (word~) against the fulltext index.
+
+    Returns:
+        Dict with accuracy and mean latencies in microseconds
+    """
+    rng = np.random.default_rng(seed)
+    words = [index.words[i] for i in rng.integers(0, len(index), size=count)]
+    typos = [make_typo(w, rng) for w in words]
+
+    correct = 0
+    start = time.perf_counter()
+    for word, typo in zip(words, typos):
+        correct += index.correct(typo) == word
+    stats = {
+        'queries': count,
+        'accuracy': correct / max(count, 1),
+        'symspell_us': (time.perf_counter() - start) / max(count, 1) * 1e6,
+    }
+
+    if driver is not None:
+        with driver.session() as session:
+            start = time.perf_counter()
+            for typo in typos:
+                session.run(FUZZY_QUERY_CYPHER, index=fulltext_index, q=f"{typo}~").consume()
+            stats['lucene_fuzzy_us'] = (time.perf_counter() - start) / max(count, 1) * 1e6
+    return stats
+
+
+if __name__ == "__main__":
+    from .prefix_index import AUTOCOMPLETE_INDEX_PATH, AutocompleteEngine
+
+    parser = argparse.ArgumentParser(description='Benchmark typo correction against Lucene fuzzy queries')
+    parser.add_argument('--path', default=AUTOCOMPLETE_INDEX_PATH, help='Autocomplete index base path')
+    parser.add_argument('--queries', type=int, default=500, help='Typos to correct')
+    parser.add_argument('--no-neo4j', action='store_true', help='Skip the Lucene fuzzy comparison')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = AutocompleteEngine.load(args.path)
+    print(f"✓ Spelling index: {len(engine.speller)} words, {len(engine.speller.hashes)} deletes "
+          f"(engine loaded in {time.perf_counter() - start:.1f}s)")
+
+    driver = None
+    if not args.no_neo4j and os.getenv("NEO4J_URI"):
+        from services.neo4j_driver import create_driver
+        driver = create_driver()
+    try:
+        stats = benchmark(engine.speller, args.queries, driver=driver)
+    finally:
+        if driver is not None:
+            driver.close()
+
+    print(f"  accuracy={stats['accuracy']:.3f}  symspell={stats['symspell_us']:.1f}us", end="")
+    if 'lucene_fuzzy_us' in stats:
+        print(f"  lucene fuzzy={stats['lucene_fuzzy_us']:.1f}us", end="")
+    print()
@@ -1,4 +1,14 @@
+import argparse
 import bz2
+import csv
+import hashlib
+import json
+import sqlite3
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
@@ -10,16 +20,38 @@ NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
-# Initialize driver
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Driver is created lazily so the parsing helpers can be used without a database
+driver = None
 
 # Limit constants
 MAX_SHORT_TEXT_LEN = 1000  # For indexing
 MAX_FULL_TEXT_LEN = 10000  # Just to be safe with memory
 
+# Rows sent per UNWIND transaction in batched mode
+DEFAULT_BATCH_SIZE = 1000
+
+# Parallel pipeline defaults
+PAGES_PER_TASK = 64  # Pages handed to a parser process at once
+MAX_PENDING_TASKS_PER_WORKER = 4  # In-flight parse tasks per process
+MAX_QUEUED_BATCHES = 8  # Batches waiting for a writer
+
 # Path to Wikiquote dump
 DUMP_PATH = "data/enwikiquote-latest.xml.bz2"
 
+# Local state for incremental runs
+STATE_PATH = "data/etl_state.sqlite3"
+
+# Quotes numbered per transaction when assigning q.seq
+SEQ_BATCH_SIZE = 10000
+
+
+def get_driver():
+    """Return the shared Neo4j driver, creating it on first use."""
+    global driver
+    if driver is None:
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    return driver
+
 
 def create_constraints(tx):
     """Create unique constraints on author name and short_text."""
@@ -33,6 +65,11 @@ def create_constraints(tx):
     FOR (q:Quote)
     REQUIRE q.short_text IS UNIQUE;
     """)
+    tx.run("""
+    CREATE CONSTRAINT quote_seq_unique IF NOT EXISTS
+    FOR (q:Quote)
+    REQUIRE q.seq IS UNIQUE;
+    """)
 
 
 def insert_quote(tx, author, quote):
@@ -47,6 +84,72 @@ def insert_quote(tx, author, quote):
     """, author=author, short_text=short_text, full_text=full_text)
 
 
+def insert_quotes_batch(tx, rows):
+    """Insert a batch of quote rows with a single UNWIND + MERGE.
+
+    Uses the same MERGE keys as insert_quote, so re-running a batch is
+    idempotent.
+
+    Args:
+        rows: list of dicts with author, short_text and full_text keys
+    """
+    tx.run("""
+        UNWIND $rows AS row
+        MERGE (a:Author {name: row.author})
+        MERGE (q:Quote {short_text: row.short_text})
+        SET q.full_text = row.full_text
+        MERGE (a)-[:SAID]->(q)
+    """, rows=rows)
+
+
+def assign_quote_seq(session, batch_size=SEQ_BATCH_SIZE):
+    """Number quotes that have no q.seq yet, continuing after the current maximum.
+
+    q.seq is a dense integer key backed by the quote_seq_unique index, so a
+    random quote is one index seek (see Neo4jQuoteService.get_random_quote).
+    Existing numbers are never changed; quotes deleted later leave gaps.
+
+    Returns:
+        Number of quotes numbered
+    """
+    record = session.run("""
+        MATCH (q:Quote) WHERE q.seq IS NOT NULL
+        RETURN q.seq AS seq ORDER BY seq DESC LIMIT 1
+    """).single()
+    next_seq = record["seq"] + 1 if record else 0
+
+    ids = [r["id"] for r in session.run(
+        "MATCH (q:Quote) WHERE q.seq IS NULL RETURN elementId(q) AS id"
+    )]
+    for start in range(0, len(ids), batch_size):
+        rows = [
+            {"id": qid, "seq": next_seq + start + i}
+            for i, qid in enumerate(ids[start:start + batch_size])
+        ]
+        session.execute_write(lambda tx: tx.run("""
+            UNWIND $rows AS row
+            MATCH (q:Quote) WHERE elementId(q) = row.id
+            SET q.seq = row.seq
+        """, rows=rows).consume())
+    return len(ids)
+
+
+def bump_graph_version(session):
+    """Increment the graph version after a load.
+
+    The backend keys its search result cache by this version, so bumping it
+    invalidates cached results in every worker (see backend/quotes/search_cache.py).
+
+    Returns:
+        The new version
+    """
+    return session.run("""
+        MERGE (v:GraphVersion {name: 'graph'})
+        SET v.version = coalesce(v.version, 0) + 1, v.updated_at = datetime()
+        RETURN v.version AS version
+    """).single()["version"]
+
+
 def parse_wikiquote_dump(path):
     """Stream parse Wikiquote XML dump using bz2."""
     with bz2.open(path, "rt", encoding="utf-8") as f:
@@ -59,6 +162,61 @@ def parse_wikiquote_dump(path):
                 elem.clear()
 
 
+def iter_page_blobs(path):
+    """Stream raw <page>...</page> XML blobs from the dump without parsing them."""
+    with bz2.open(path, "rt", encoding="utf-8") as f:
+        lines = None
+        for line in f:
+            if lines is None:
+                if "<page>" in line:
+                    lines = [line]
+                continue
+            lines.append(line)
+            if "</page>" in line:
+                yield "".join(lines)
+                lines = None
+
+
+def parse_page(blob):
+    """Parse one <page> blob into (title, rev_id, text), or None if unusable."""
+    try:
+        page = ET.fromstring(blob)
+    except ET.ParseError:
+        return None
+    title = page.findtext("./{*}title")
+    rev_id = page.findtext("./{*}revision/{*}id")
+    text = page.findtext(".//{*}text")
+    if not title or not text:
+        return None
+    return title, rev_id, text
+
+
+def page_rows(title, text):
+    """Turn a page's title and wikitext into (author, short_text, full_text) rows."""
+    author = title.strip()
+    return [
+        (author, quote[:MAX_SHORT_TEXT_LEN], quote[:MAX_FULL_TEXT_LEN])
+        for quote in extract_quotes(text)
+    ]
+
+
+def extract_page_rows(blob):
+    """Parse one <page> blob into (author, short_text, full_text) rows."""
+    page = parse_page(blob)
+    if page is None:
+        return []
+    title, _, text = page
+    return page_rows(title, text)
+
+
+def extract_pages_rows(blobs):
+    """Process-pool task: extract rows from a chunk of page blobs."""
+    rows = []
+    for blob in blobs:
+        rows.extend(extract_page_rows(blob))
+    return rows
+
+
 def extract_quotes(text):
     """Simple heuristic to extract sentences with quotes."""
     quotes = []
@@ -69,13 +227,387 @@ def extract_quotes(text):
     return quotes
 
 
-def build_graph():
-    with driver.session() as session:
+def iter_quote_rows(path):
+    """Yield (author, short_text, full_text) rows for every quote in the dump."""
+    for title, text in parse_wikiquote_dump(path):
+        author = title.strip()
+        for quote in extract_quotes(text):
+            yield author, quote[:MAX_SHORT_TEXT_LEN], quote[:MAX_FULL_TEXT_LEN]
+
+
+def iter_chunks(items, size):
+    """Group an iterable into lists of at most size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_batches(rows, batch_size):
+    """Group rows into lists of at most batch_size row dicts."""
+    for chunk in iter_chunks(rows, batch_size):
+        yield [
+            {"author": author, "short_text": short_text, "full_text": full_text}
+            for author, short_text, full_text in chunk
+        ]
+
+
+def write_rows(session, rows, name="Batch"):
+    """Write rows one transaction each through insert_quote, skipping failures.
+
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    for row in rows:
+        try:
+            session.execute_write(insert_quote, row["author"], row["full_text"])
+        except Exception as e:
+            print(f"⚠️ {name}: skipped quote by {row['author']}: {e}")
+            continue
+        written += 1
+    return written
+
+
+def write_batches(session, batches, name="Batch"):
+    """Flush batches through insert_quotes_batch, reporting per-batch throughput.
+
+    A batch whose transaction fails is retried row by row, so one bad
+    quote only costs itself.
+
+    Returns:
+        Number of rows written
+    """
+    count = 0
+    started = time.perf_counter()
+    for batch_no, batch in enumerate(batches, 1):
+        batch_started = time.perf_counter()
+        try:
+            session.execute_write(insert_quotes_batch, batch)
+            written = len(batch)
+        except Exception as e:
+            print(f"⚠️ {name} {batch_no}: batch failed, retrying {len(batch)} rows singly: {e}")
+            written = write_rows(session, batch, name=f"{name} {batch_no}")
+        elapsed = time.perf_counter() - batch_started
+        count += written
+        total_elapsed = time.perf_counter() - started
+        print(
+            f"{name} {batch_no}: {written} rows in {elapsed:.2f}s "
+            f"({written / max(elapsed, 1e-9):.0f} rows/s, "
+            f"{count} total, {count / max(total_elapsed, 1e-9):.0f} rows/s overall)"
+        )
+    return count
+
+
+def build_graph_batched(path=DUMP_PATH, batch_size=DEFAULT_BATCH_SIZE):
+    """Load the dump with one UNWIND transaction per batch of quotes."""
+    with get_driver().session() as session:
+        session.execute_write(create_constraints)
+        print("✅ Constraints ensured.")
+
+        count = write_batches(session, iter_batches(iter_quote_rows(path), batch_size))
+        print(f"✅ Finished inserting {count} quotes.")
+
+
+def iter_parallel_rows(path, workers=None, pages_per_task=PAGES_PER_TASK):
+    """Yield quote rows, extracting pages in a process pool.
+
+    The reader stays at most workers * MAX_PENDING_TASKS_PER_WORKER tasks
+    ahead of the consumer, so a slow consumer stalls decompression instead
+    of buffering the dump in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * MAX_PENDING_TASKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in iter_chunks(iter_page_blobs(path), pages_per_task):
+            pending.append(pool.submit(extract_pages_rows, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def build_graph_parallel(path=DUMP_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                         workers=None, writers=1):
+    """Load the dump with a producer/consumer pipeline.
+
+    One reader streams raw <page> blobs out of the bz2 file, a process pool
+    turns them into quote rows, and writer threads drain a bounded queue of
+    batches into Neo4j with insert_quotes_batch. Decompression, parsing and
+    database I/O overlap, and the bounded queue applies backpressure all the
+    way back to the reader.
+
+    Args:
+        workers: Parser processes (default: CPU count)
+        writers: Concurrent Neo4j writer threads, each with its own session
+    """
+    with get_driver().session() as session:
+        session.execute_write(create_constraints)
+    print("✅ Constraints ensured.")
+
+    batches = queue.Queue(maxsize=MAX_QUEUED_BATCHES)
+    counts = []
+
+    def writer(n):
+        with get_driver().session() as session:
+            counts.append(write_batches(session, iter(batches.get, None), name=f"Writer {n}"))
+
+    threads = [threading.Thread(target=writer, args=(n,), daemon=True) for n in range(1, writers + 1)]
+    for t in threads:
+        t.start()
+
+    def put(item):
+        while True:
+            if not any(t.is_alive() for t in threads):
+                raise RuntimeError("All Neo4j writers stopped")
+            try:
+                batches.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    for batch in iter_batches(iter_parallel_rows(path, workers), batch_size):
+        put(batch)
+    for _ in threads:
+        put(None)
+    for t in threads:
+        t.join()
+
+    print(f"✅ Finished inserting {sum(counts)} quotes.")
+
+
+def stable_id(prefix, value):
+    """Deterministic ID for a node key, identical across exports of the same dump."""
+    return f"{prefix}:{hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]}"
+
+
+def export_csv(rows, out_dir):
+    """Stream quote rows into neo4j-admin import CSV files.
+
+    Writes authors.csv, quotes.csv and said.csv to out_dir. Authors are keyed
+    on name and quotes on short_text, the same keys build_graph MERGEs on, so
+    duplicates in the dump collapse to a single node or relationship. Quotes
+    are numbered 0..n-1 in q.seq as they are first seen.
+
+    Returns:
+        Dict with the number of authors, quotes and SAID relationships written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    seen_authors, seen_quotes, seen_said = set(), set(), set()
+
+    with open(os.path.join(out_dir, "authors.csv"), "w", newline="", encoding="utf-8") as af, \
+         open(os.path.join(out_dir, "quotes.csv"), "w", newline="", encoding="utf-8") as qf, \
+         open(os.path.join(out_dir, "said.csv"), "w", newline="", encoding="utf-8") as sf:
+        authors = csv.writer(af)
+        quotes = csv.writer(qf)
+        said = csv.writer(sf)
+        authors.writerow(["authorId:ID(Author)", "name", ":LABEL"])
+        quotes.writerow(["quoteId:ID(Quote)", "short_text", "full_text", "seq:long", ":LABEL"])
+        said.writerow([":START_ID(Author)", ":END_ID(Quote)", ":TYPE"])
+
+        for author, short_text, full_text in rows:
+            author_id = stable_id("a", author)
+            quote_id = stable_id("q", short_text)
+            if author_id not in seen_authors:
+                seen_authors.add(author_id)
+                authors.writerow([author_id, author, "Author"])
+            if quote_id not in seen_quotes:
+                seen_quotes.add(quote_id)
+                quotes.writerow([quote_id, short_text, full_text, len(seen_quotes) - 1, "Quote"])
+            if (author_id, quote_id) not in seen_said:
+                seen_said.add((author_id, quote_id))
+                said.writerow([author_id, quote_id, "SAID"])
+                if len(seen_said) % 100000 == 0:
+                    print(f"Exported {len(seen_said)} quotes...")
+
+    return {"authors": len(seen_authors), "quotes": len(seen_quotes), "said": len(seen_said)}
+
+
+def export_graph(path=DUMP_PATH, out_dir="data/import", parallel=False, workers=None):
+    """Export the dump as neo4j-admin CSV files without touching the database."""
+    rows = iter_parallel_rows(path, workers) if parallel else iter_quote_rows(path)
+    started = time.perf_counter()
+    counts = export_csv(rows, out_dir)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"✅ Exported {counts['authors']} authors, {counts['quotes']} quotes and "
+        f"{counts['said']} SAID relationships to {out_dir} in {elapsed:.1f}s"
+    )
+    print("Import with:")
+    print(
+        f"  neo4j-admin database import full --nodes={out_dir}/authors.csv "
+        f"--nodes={out_dir}/quotes.csv --relationships={out_dir}/said.csv neo4j"
+    )
+    print("Then start the database and run create_constraints (build_graph --constraints-only).")
+
+
+class EtlState:
+    """Checkpoint and per-page hashes for incremental ETL runs, kept in SQLite.
+
+    A page is recorded only after its quotes are committed to Neo4j, so a
+    crash at worst re-writes the last uncommitted batch.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                title TEXT PRIMARY KEY,
+                rev_id TEXT,
+                text_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def page_hash(self, title):
+        row = self.conn.execute("SELECT text_hash FROM pages WHERE title = ?", (title,)).fetchone()
+        return row[0] if row else None
+
+    def get_checkpoint(self):
+        row = self.conn.execute("SELECT value FROM checkpoint WHERE key = 'dump'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def commit_pages(self, pages, checkpoint):
+        """Record ingested pages and advance the checkpoint atomically.
+
+        Args:
+            pages: list of (title, rev_id, text_hash)
+            checkpoint: dict with dump, position, title and rev_id
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pages (title, rev_id, text_hash) VALUES (?, ?, ?)",
+                pages
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoint (key, value) VALUES ('dump', ?)",
+                (json.dumps(checkpoint),)
+            )
+
+
+def dump_identity(path):
+    """Identify a dump file so a newly downloaded dump restarts from page 0."""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def sync_pages_batch(tx, rows, pages):
+    """Write rows for changed pages and drop SAID edges the new revision no longer has.
+
+    Quotes left with no author are deleted in the same transaction; kept,
+    they would hold on to their seq, embedding and index entries, and a
+    random seq landing on one would never return a quote.
+
+    Args:
+        rows: list of row dicts as for insert_quotes_batch
+        pages: list of dicts with author and keep (the page's current short_texts)
+    """
+    insert_quotes_batch(tx, rows)
+    tx.run("""
+        UNWIND $pages AS page
+        MATCH (a:Author {name: page.author})-[r:SAID]->(q:Quote)
+        WHERE NOT q.short_text IN page.keep
+        DELETE r
+        WITH DISTINCT q
+        WHERE NOT ()-[:SAID]->(q)
+        DETACH DELETE q
+    """, pages=pages)
+
+
+def build_graph_incremental(path=DUMP_PATH, state_path=STATE_PATH, batch_size=DEFAULT_BATCH_SIZE):
+    """Resumable load that only re-extracts pages whose text changed.
+
+    bz2 dumps cannot be seeked into, so a resumed run still decompresses
+    from the start but skips the pages before the checkpoint without
+    parsing them. Pages whose text hash matches the state file are skipped
+    too, which makes a run over a newer dump touch only changed pages.
+    """
+    state = EtlState(state_path)
+    identity = dump_identity(path)
+    checkpoint = state.get_checkpoint()
+    resume_from = 0
+    if checkpoint and checkpoint["dump"] == identity:
+        resume_from = checkpoint["position"]
+        print(f"↩️ Resuming after page {resume_from} ({checkpoint['title']})")
+
+    with get_driver().session() as session:
+        session.execute_write(create_constraints)
+        print("✅ Constraints ensured.")
+
+        rows, pages, done = [], [], []
+        last = None
+        written = skipped = 0
+        started = time.perf_counter()
+
+        def flush(position):
+            nonlocal rows, pages, done, written
+            if done:
+                session.execute_write(sync_pages_batch, rows, pages)
+                written += len(rows)
+            state.commit_pages(done, {
+                "dump": identity,
+                "position": position,
+                "title": last[0] if last else None,
+                "rev_id": last[1] if last else None,
+            })
+            elapsed = time.perf_counter() - started
+            print(
+                f"Checkpoint at page {position}: {written} quotes written, "
+                f"{skipped} unchanged pages skipped ({written / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+            rows, pages, done = [], [], []
+
+        position = 0
+        for position, blob in enumerate(iter_page_blobs(path), 1):
+            if position <= resume_from:
+                continue
+            page = parse_page(blob)
+            if page is None:
+                continue
+            title, rev_id, text = page
+            last = (title, rev_id)
+            text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if state.page_hash(title) == text_hash:
+                skipped += 1
+                continue
+
+            new_rows = [
+                {"author": author, "short_text": short_text, "full_text": full_text}
+                for author, short_text, full_text in page_rows(title, text)
+            ]
+            rows.extend(new_rows)
+            pages.append({"author": title.strip(), "keep": [r["short_text"] for r in new_rows]})
+            done.append((title, rev_id, text_hash))
+            if len(rows) >= batch_size:
+                flush(position)
+
+        flush(max(position, resume_from))
+
+    state.close()
+    print(f"✅ Finished: {written} quotes written, {skipped} unchanged pages skipped.")
+
+
+def build_graph(path=DUMP_PATH):
+    with get_driver().session() as session:
         session.execute_write(create_constraints)
         print("✅ Constraints ensured.")
 
         count = 0
-        for title, text in parse_wikiquote_dump(DUMP_PATH):
+        for title, text in parse_wikiquote_dump(path):
             author = title.strip()
             quotes = extract_quotes(text)
             for quote in quotes:
@@ -91,7 +623,47 @@ def build_graph():
 
 
 if __name__ == "__main__":
-    print(f"Connecting to Neo4j at {NEO4J_URI}...")
-    build_graph()
-    driver.close()
+    parser = argparse.ArgumentParser(description="Load the Wikiquote dump into Neo4j")
+    parser.add_argument("--dump", default=DUMP_PATH, help="Path to the bz2 XML dump")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Quotes per UNWIND transaction (1 = one transaction per quote)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Parse pages in a process pool and write from a queue")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--writers", type=int, default=1, help="Concurrent Neo4j writers")
+    parser.add_argument("--export", metavar="DIR",
+                        help="Write neo4j-admin import CSVs to DIR instead of loading over Bolt")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Checkpoint progress and skip pages unchanged since the last run")
+    parser.add_argument("--state", default=STATE_PATH, help="State file for --incremental")
+    parser.add_argument("--constraints-only", action="store_true",
+                        help="Only create the constraints (e.g. after a bulk import)")
+    parser.add_argument("--no-seq", action="store_true",
+                        help="Skip numbering new quotes with q.seq after loading")
+    args = parser.parse_args()
 
+    if args.export:
+        export_graph(args.dump, args.export, args.parallel, args.workers)
+    else:
+        print(f"Connecting to Neo4j at {NEO4J_URI}...")
+        if args.constraints_only:
+            with get_driver().session() as session:
+                session.execute_write(create_constraints)
+            print("✅ Constraints ensured.")
+        elif args.incremental:
+            build_graph_incremental(args.dump, args.state, args.batch_size)
+        elif args.parallel:
+            build_graph_parallel(args.dump, args.batch_size, args.workers, args.writers)
+        elif args.batch_size > 1:
+            build_graph_batched(args.dump, args.batch_size)
+        else:
+            build_graph(args.dump)
+        if not args.no_seq:
+            with get_driver().session() as session:
+                numbered = assign_quote_seq(session)
+            print(f"✅ Numbered {numbered} new quotes with q.seq.")
+        # Also run after a bulk import (--constraints-only), which replaces the graph
+        with get_driver().session() as session:
+            version = bump_graph_version(session)
+        print(f"✅ Graph version {version}: cached search results invalidated.")
+        get_driver().close()
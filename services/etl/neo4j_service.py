@@ -1,56 +1,268 @@
-from neo4j import GraphDatabase
+import datetime
+import hashlib
+import random
+import re
+import time
+
+from services.neo4j_driver import get_shared_driver
+
+FULLTEXT_INDEX = 'quoteTextIndex'
+
+# Quote text properties, in the order every query coalesces them: the ETL
+# writes short_text and full_text, older loads text_clean or text
+QUOTE_TEXT_PROPERTIES = ['short_text', 'full_text', 'text_clean', 'text']
+
+CREATE_FULLTEXT_INDEX_CYPHER = """
+CREATE FULLTEXT INDEX quoteTextIndex IF NOT EXISTS
+FOR (q:Quote) ON EACH [q.short_text, q.full_text, q.text_clean, q.text]
+"""
+
+FULLTEXT_INDEX_PROPERTIES_CYPHER = """
+SHOW FULLTEXT INDEXES YIELD name, properties
+WHERE name = $index
+RETURN properties
+"""
+
+DROP_FULLTEXT_INDEX_CYPHER = "DROP INDEX quoteTextIndex IF EXISTS"
+
+# Author-level edges precomputed by services/rag/similarity_graph.py
+SIMILAR_AUTHORS_CYPHER = """
+MATCH (:Author {name: $author})-[s:SIMILAR_TO]->(a2:Author)
+RETURN a2.name as name, s.score as score
+ORDER BY s.score DESC
+LIMIT $limit
+"""
+
+# Fallback when author edges are missing: aggregate the quote edges around
+# this author's own quotes, starting from the unique name index
+LOCAL_SIMILAR_AUTHORS_CYPHER = """
+MATCH (a1:Author {name: $author})-[:SAID]->(:Quote)-[s:SIMILAR_TO]->(:Quote)<-[:SAID]-(a2:Author)
+WHERE a2 <> a1
+RETURN a2.name as name, sum(s.score) as score
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+SIMILAR_QUOTES_CYPHER = """
+MATCH (q:Quote)-[s:SIMILAR_TO]->(q2:Quote)
+WHERE elementId(q) = $qid
+WITH q2, s
+ORDER BY s.score DESC
+LIMIT $limit
+OPTIONAL MATCH (q2)<-[:SAID]-(a:Author)
+RETURN elementId(q2) as id,
+       coalesce(q2.short_text, q2.full_text, q2.text_clean, q2.text) as text,
+       head(collect(a.name)) as author,
+       s.score as score
+ORDER BY score DESC
+"""
+
+QUOTES_BY_THEME_CYPHER = """
+CALL db.index.fulltext.queryNodes($index, $theme, {limit: $limit})
+YIELD node AS q, score
+MATCH (a:Author)-[:SAID]->(q)
+WITH q, score, head(collect(a.name)) as author
+RETURN coalesce(q.short_text, q.full_text, q.text_clean, q.text) as text, author
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+# Highest q.seq assigned by the ETL (build_graph.assign_quote_seq); an
+# ordered scan of the quote_seq_unique index stopped after one row
+MAX_SEQ_CYPHER = """
+MATCH (q:Quote) WHERE q.seq IS NOT NULL
+RETURN q.seq as seq
+ORDER BY seq DESC
+LIMIT 1
+"""
+
+# First quote at or after a sampled position; seeks skip gaps left by deletes
+RANDOM_QUOTE_CYPHER = """
+MATCH (q:Quote) WHERE q.seq >= $seq
+WITH q ORDER BY q.seq LIMIT 1
+MATCH (a:Author)-[:SAID]->(q)
+RETURN coalesce(q.short_text, q.full_text, q.text_clean, q.text) as text, head(collect(a.name)) as author
+"""
+
+# Sampled among one author's quotes, starting from the unique name index
+RANDOM_AUTHOR_QUOTE_CYPHER = """
+MATCH (a:Author {name: $author})
+WITH a, [(a)-[:SAID]->(q:Quote) | q] as quotes
+WHERE size(quotes) > 0
+WITH a, quotes[toInteger($r * size(quotes))] as q
+RETURN coalesce(q.short_text, q.full_text, q.text_clean, q.text) as text, a.name as author
+"""
+
+# Seconds the highest q.seq is cached between lookups
+MAX_SEQ_TTL = 300
+
+# Queries that must run on index seeks and graph-local expansion only,
+# with example parameters; checked by check_query_plans()
+INDEXED_QUERIES = {
+    'similar_authors': (SIMILAR_AUTHORS_CYPHER, {'author': '', 'limit': 5}),
+    'local_similar_authors': (LOCAL_SIMILAR_AUTHORS_CYPHER, {'author': '', 'limit': 5}),
+    'similar_quotes': (SIMILAR_QUOTES_CYPHER, {'qid': '', 'limit': 5}),
+    'quotes_by_theme': (QUOTES_BY_THEME_CYPHER, {'index': FULLTEXT_INDEX, 'theme': 'love', 'limit': 10}),
+    'max_seq': (MAX_SEQ_CYPHER, {}),
+    'random_quote': (RANDOM_QUOTE_CYPHER, {'seq': 0}),
+    'random_author_quote': (RANDOM_AUTHOR_QUOTE_CYPHER, {'author': '', 'r': 0.0}),
+}
+
+# Plan operators that touch every node of a label, or every pair of rows
+FULL_SCAN_OPERATORS = frozenset({'AllNodesScan', 'NodeByLabelScan', 'CartesianProduct'})
+
+
+def theme_terms(theme):
+    """Reduce a theme to plain Lucene terms (no operators or syntax errors)
+
+    Terms are lowercased because Lucene only treats upper-case AND/OR/NOT
+    as operators; the index analyzer lowercases anyway.
+    """
+    return " ".join(re.findall(r"\w+", theme.lower()))
+
+
+def day_fraction(day, salt=""):
+    """Deterministic number in [0, 1) for a date, identical across processes"""
+    digest = hashlib.sha256(f"{day.isoformat()}:{salt}".encode("utf-8")).hexdigest()
+    return int(digest[:13], 16) / 16 ** 13
+
+
+def plan_operators(plan):
+    """Flatten an EXPLAIN/PROFILE plan tree into its operator names
+
+    The driver reports operators as e.g. 'NodeIndexSeek@neo4j'; the
+    '@database' suffix is dropped.
+    """
+    operators = [plan['operatorType'].split('@')[0]]
+    for child in plan.get('children', []):
+        operators.extend(plan_operators(child))
+    return operators
+
+
+def explain(session, query, **params):
+    """Operator names of a query's plan, without executing it"""
+    summary = session.run(f"EXPLAIN {query}", **params).consume()
+    return plan_operators(summary.plan)
+
+
+def check_query_plans(session, queries=None):
+    """
+    EXPLAIN each query and report full-scan operators in its plan
+
+    Args:
+        queries: Name -> (cypher, params); defaults to INDEXED_QUERIES
+
+    Returns:
+        Name -> sorted full-scan operators found (empty when the plan is clean)
+    """
+    queries = queries or INDEXED_QUERIES
+    return {
+        name: sorted(set(explain(session, query, **params)) & FULL_SCAN_OPERATORS)
+        for name, (query, params) in queries.items()
+    }
+
 
 class Neo4jQuoteService:
     """Advanced Neo4j operations for quotes"""
-    
+
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-    
+        self.driver = get_shared_driver(uri, user, password)
+        self._max_seq = None
+        self._max_seq_at = 0.0
+
     def close(self):
-        self.driver.close()
-    
+        """Nothing to release: the driver is shared by the process
+        (see services.neo4j_driver.close_shared_drivers)"""
+
+    def ensure_indexes(self):
+        """Create the fulltext index used by search and get_quotes_by_theme
+
+        An existing index over other properties (e.g. only text_clean) is
+        dropped and recreated, since CREATE ... IF NOT EXISTS keeps it as is.
+        """
+        with self.driver.session() as session:
+            record = session.run(FULLTEXT_INDEX_PROPERTIES_CYPHER, index=FULLTEXT_INDEX).single()
+            if record is not None and list(record['properties']) != QUOTE_TEXT_PROPERTIES:
+                print(f"⚠️  Rebuilding {FULLTEXT_INDEX} over {QUOTE_TEXT_PROPERTIES} "
+                      f"(was {list(record['properties'])})")
+                session.run(DROP_FULLTEXT_INDEX_CYPHER).consume()
+            session.run(CREATE_FULLTEXT_INDEX_CYPHER).consume()
+
     def get_similar_authors(self, author_name, limit=5):
-        """Get authors with similar themes"""
-        query = """
-        MATCH (a1:Author {name: $author})-[:SAID_BY]-(q1:Quote)
-        MATCH (q2:Quote)-[:SAID_BY]-(a2:Author)
-        WHERE a1 <> a2
-        WITH a2, count(DISTINCT q2) as quote_count
-        RETURN a2.name as name, quote_count
-        ORDER BY quote_count DESC
-        LIMIT $limit
+        """Get authors with similar themes
+
+        Reads the precomputed author SIMILAR_TO edges written by
+        services/rag/similarity_graph.py, falling back to aggregating the
+        quote edges around the author's own quotes.
         """
-        
         with self.driver.session() as session:
-            result = session.run(query, author=author_name, limit=limit)
-            return [record['name'] for record in result]
-    
-    def get_quotes_by_theme(self, theme, limit=10):
-        """Get quotes containing theme keywords"""
-        query = """
-        MATCH (q:Quote)-[:SAID_BY]->(a:Author)
-        WHERE toLower(q.text) CONTAINS toLower($theme)
-        RETURN q.text as text, a.name as author
-        LIMIT $limit
+            result = session.run(SIMILAR_AUTHORS_CYPHER, author=author_name, limit=limit)
+            names = [record['name'] for record in result]
+            if not names:
+                result = session.run(LOCAL_SIMILAR_AUTHORS_CYPHER, author=author_name, limit=limit)
+                names = [record['name'] for record in result]
+            return names
+
+    def get_similar_quotes(self, quote_id, limit=5):
+        """Get the nearest quotes to a quote by embedding similarity
+
+        Reads the precomputed quote SIMILAR_TO edges written by
+        services/rag/similarity_graph.py.
         """
-        
         with self.driver.session() as session:
-            result = session.run(query, theme=theme, limit=limit)
+            result = session.run(SIMILAR_QUOTES_CYPHER, qid=quote_id, limit=limit)
+            return [
+                {'id': r['id'], 'text': r['text'], 'author': r['author'], 'score': r['score']}
+                for r in result
+            ]
+
+    def get_quotes_by_theme(self, theme, limit=10):
+        """Get quotes matching theme keywords through the fulltext index"""
+        terms = theme_terms(theme)
+        if not terms:
+            return []
+
+        with self.driver.session() as session:
+            result = session.run(QUOTES_BY_THEME_CYPHER, index=FULLTEXT_INDEX,
+                                 theme=terms, limit=limit)
             return [{'text': r['text'], 'author': r['author']} for r in result]
-    
-    def get_random_quote(self):
-        """Get a random quote"""
-        query = """
-        MATCH (q:Quote)-[:SAID_BY]->(a:Author)
-        WITH q, a, rand() as random
-        ORDER BY random
-        LIMIT 1
-        RETURN q.text as text, a.name as author
-        """
-        
+
+    def max_seq(self):
+        """Highest q.seq, cached for MAX_SEQ_TTL seconds (None if unnumbered)"""
+        if self._max_seq is None or time.monotonic() - self._max_seq_at > MAX_SEQ_TTL:
+            with self.driver.session() as session:
+                record = session.run(MAX_SEQ_CYPHER).single()
+            self._max_seq = record['seq'] if record else None
+            self._max_seq_at = time.monotonic()
+        return self._max_seq
+
+    def _sample(self, r, author=None):
+        """Quote at position r in [0, 1) of all quotes, or of one author's"""
         with self.driver.session() as session:
-            result = session.run(query)
-            record = result.single()
+            if author is not None:
+                record = session.run(RANDOM_AUTHOR_QUOTE_CYPHER, author=author, r=r).single()
+            else:
+                max_seq = self.max_seq()
+                if max_seq is None:
+                    return None
+                record = session.run(RANDOM_QUOTE_CYPHER, seq=int(r * (max_seq + 1))).single()
+                if record is None:
+                    # Sampled past the last remaining quote; wrap around
+                    record = session.run(RANDOM_QUOTE_CYPHER, seq=0).single()
             if record:
                 return {'text': record['text'], 'author': record['author']}
-        return None
\ No newline at end of file
+        return None
+
+    def get_random_quote(self, author=None):
+        """Get a random quote, optionally by one author
+
+        Samples a position in the dense q.seq numbering and seeks to it
+        through the index; by author, samples among the author's quotes.
+        Quotes right after a gap in q.seq are slightly more likely.
+        """
+        return self._sample(random.random(), author)
+
+    def get_quote_of_the_day(self, day=None, author=None):
+        """Get the same random quote for every request on a given day"""
+        day = day or datetime.date.today()
+        return self._sample(day_fraction(day, author or ""), author)
@@ -0,0 +1,67 @@
+"""
+Per-event-loop clients that are closed when their loop shuts down
+
+Async drivers and HTTP sessions are bound to the loop that created them.
+Under ASGI that is one long-lived loop per worker, but under WSGI,
+runserver and the test client every async view runs in a fresh loop
+(asgiref's async_to_sync uses asyncio.run), so clients cached per loop
+must be closed with it or each request leaks a connection pool.
+
+asyncio.run() calls loop.shutdown_asyncgens() before closing a loop, which
+closes every async generator still suspended on it. Each loop's clients are
+held by one such generator, whose finally block awaits their close().
+"""
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List
+
+# loop -> {'resources': {name: (resource, close)}, 'closer': async generator}
+_loops = weakref.WeakKeyDictionary()
+
+
+async def _close_on_shutdown(resources: Dict):
+    try:
+        yield
+    finally:
+        for name, (resource, close) in reversed(list(resources.items())):
+            try:
+                await close(resource)
+            except Exception as e:
+                print(f"⚠️  Closing {name} at loop shutdown failed: {e}")
+        resources.clear()
+
+
+def _loop_state(loop) -> Dict:
+    state = _loops.get(loop)
+    if state is None:
+        resources = {}
+        closer = _close_on_shutdown(resources)
+        # Run the generator up to its yield so the loop tracks it: the first
+        # __anext__() registers it with the running loop, and since nothing is
+        # awaited before the yield, one send() suspends it there
+        step = closer.__anext__()
+        try:
+            step.send(None)
+        except StopIteration:
+            pass
+        state = _loops[loop] = {'resources': resources, 'closer': closer}
+    return state
+
+
+def loop_resource(name: str, create: Callable[[], Any],
+                  close: Callable[[Any], Awaitable]) -> Any:
+    """The running loop's resource called name, created on first use
+
+    close(resource) is awaited on the loop when it shuts down.
+    """
+    resources = _loop_state(asyncio.get_running_loop())['resources']
+    entry = resources.get(name)
+    if entry is None:
+        entry = resources[name] = (create(), close)
+    return entry[0]
+
+
+def loop_resources(name: str) -> List[Any]:
+    """The live resource called name of every loop"""
+    return [state['resources'][name][0] for state in list(_loops.values())
+            if name in state['resources']]
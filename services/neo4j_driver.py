@@ -0,0 +1,124 @@
+"""
+Shared Neo4j driver factory with an explicitly sized connection pool
+
+The Django views, RAGChatbot, Neo4jQuoteService, neomodel and the embedding
+scripts all get their driver here, so a process holds one pool per
+(uri, user) instead of one per component. Each gunicorn worker is a
+process, so the database sees up to workers * NEO4J_MAX_POOL_SIZE
+connections (plus one async pool per event loop).
+"""
+import atexit
+import os
+import threading
+from typing import Dict, Optional
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
+# Connections per driver; size against the threads (or concurrent
+# requests) of one worker, not the whole deployment
+NEO4J_MAX_POOL_SIZE = int(os.getenv('NEO4J_MAX_POOL_SIZE', '50'))
+
+# Seconds a query waits for a free connection before failing, instead of
+# queueing behind a saturated pool for the driver's default minute
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_ACQUISITION_TIMEOUT', '10'))
+
+# Seconds before a pooled connection is replaced; below the idle cutoff of
+# load balancers and Aura so connections are not dropped under us
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv('NEO4J_MAX_CONNECTION_LIFETIME', '1800'))
+
+# Idle seconds after which a pooled connection is pinged before reuse
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.getenv('NEO4J_LIVENESS_CHECK_TIMEOUT', '60'))
+
+NEO4J_KEEP_ALIVE = os.getenv('NEO4J_KEEP_ALIVE', 'true').lower() == 'true'
+
+_drivers = {}
+_drivers_lock = threading.Lock()
+
+
+def pool_config() -> Dict:
+    """Connection pool settings passed to every driver"""
+    return {
+        'max_connection_pool_size': NEO4J_MAX_POOL_SIZE,
+        'connection_acquisition_timeout': NEO4J_ACQUISITION_TIMEOUT,
+        'max_connection_lifetime': NEO4J_MAX_CONNECTION_LIFETIME,
+        'liveness_check_timeout': NEO4J_LIVENESS_CHECK_TIMEOUT,
+        'keep_alive': NEO4J_KEEP_ALIVE,
+    }
+
+
+def _credentials(uri=None, user=None, password=None):
+    return (uri or os.getenv('NEO4J_URI'), user or os.getenv('NEO4J_USER'),
+            password or os.getenv('NEO4J_PASSWORD'))
+
+
+def create_driver(uri: Optional[str] = None, user: Optional[str] = None,
+                  password: Optional[str] = None, asynchronous: bool = False):
+    """
+    New driver with the configured pool (credentials default to NEO4J_*)
+
+    Async drivers are bound to the event loop that uses them, so they are
+    created per loop rather than shared.
+    """
+    uri, user, password = _credentials(uri, user, password)
+    factory = AsyncGraphDatabase if asynchronous else GraphDatabase
+    return factory.driver(uri, auth=(user, password), **pool_config())
+
+
+def get_shared_driver(uri: Optional[str] = None, user: Optional[str] = None,
+                      password: Optional[str] = None):
+    """Return the process-wide driver for (uri, user), creating it on first use
+
+    Callers must not close it; close_shared_drivers() does at exit.
+    """
+    uri, user, password = _credentials(uri, user, password)
+    key = (uri, user)
+    driver = _drivers.get(key)
+    if driver is None:
+        with _drivers_lock:
+            driver = _drivers.get(key)
+            if driver is None:
+                driver = _drivers[key] = create_driver(uri, user, password)
+    return driver
+
+
+def close_shared_drivers():
+    with _drivers_lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+    for driver in drivers:
+        driver.close()
+
+
+atexit.register(close_shared_drivers)
+
+
+def pool_stats(driver) -> Dict:
+    """
+    In-use, idle and waiting connections of a driver's pool
+
+    The driver has no public pool metrics, so this reads its internals;
+    counts are None if a driver version lays them out differently.
+    """
+    try:
+        pool = driver._pool
+        connections = [c for address in list(pool.connections.values()) for c in list(address)]
+        in_use = sum(1 for c in connections if c.in_use)
+        waiting = len(pool.cond._waiters)
+        max_size = pool.pool_config.max_connection_pool_size
+    except (AttributeError, TypeError):
+        return {'in_use': None, 'idle': None, 'waiting': None,
+                'max_size': NEO4J_MAX_POOL_SIZE, 'utilization': None}
+    return {
+        'in_use': in_use,
+        'idle': len(connections) - in_use,
+        'waiting': waiting,
+        'max_size': max_size,
+        'utilization': in_use / max_size if max_size else None,
+    }
+
+
+def shared_pool_stats() -> Dict:
+    """pool_stats() of every shared driver, by user@uri"""
+    with _drivers_lock:
+        drivers = dict(_drivers)
+    return {f"{user}@{uri}": pool_stats(driver) for (uri, user), driver in drivers.items()}
@@ -0,0 +1,261 @@
+"""
+Approximate nearest neighbour (IVF-flat) index for semantic quote search
+"""
+import argparse
+import os
+import threading
+import time
+import numpy as np
+from typing import List, Dict, Optional
+
+from .vector_index import QuoteVectorIndex, EMBEDDING_STORE_PATH, get_shared_index
+
+# Lists probed per query; higher is slower and closer to exact search
+DEFAULT_NPROBE = int(os.getenv('RAG_IVF_NPROBE', '8'))
+
+# Rows scored per matrix multiply while assigning rows to lists
+ASSIGN_BLOCK_SIZE = 8192
+
+
+def assign_lists(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by cosine) for every row, computed in blocks"""
+    assignments = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), ASSIGN_BLOCK_SIZE):
+        block = np.asarray(matrix[start:start + ASSIGN_BLOCK_SIZE], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int = 10,
+                    sample_size: int = 50000, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of unit-length rows"""
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    sample_rows = rng.choice(n, size=min(n, max(sample_size, nlist)), replace=False)
+    sample = np.asarray(matrix[np.sort(sample_rows)], dtype=np.float32)
+
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = ~np.any(sums, axis=1)
+        # Re-seed empty lists with random sample rows
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFFlatIndex:
+    """Inverted-file index over a QuoteVectorIndex
+
+    Rows are bucketed by their nearest k-means centroid. A query scores the
+    centroids, then does exact cosine search over the rows of the nprobe
+    closest lists only.
+    """
+
+    def __init__(self, base: QuoteVectorIndex, centroids: np.ndarray,
+                 list_offsets: np.ndarray, list_rows: np.ndarray,
+                 nprobe: int = DEFAULT_NPROBE):
+        """
+        Args:
+            base: Exact index whose matrix and metadata are searched
+            centroids: (nlist, dim) unit-length centroids
+            list_offsets: (nlist + 1,) start of each list in list_rows
+            list_rows: Row indices of base, grouped by list
+            nprobe: Lists scanned per query
+        """
+        self.base = base
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    def __len__(self):
+        return len(self.base)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, base: QuoteVectorIndex, nlist: Optional[int] = None,
+              iterations: int = 10, nprobe: int = DEFAULT_NPROBE, seed: int = 0) -> "IVFFlatIndex":
+        """Train centroids and bucket every row of base
+
+        Args:
+            nlist: Number of lists (default: 4 * sqrt(n))
+        """
+        n = len(base)
+        nlist = max(1, min(n, nlist or int(4 * np.sqrt(n))))
+        centroids = train_centroids(base.matrix, nlist, iterations, seed=seed)
+        assignments = assign_lists(base.matrix, centroids)
+
+        list_rows = np.argsort(assignments, kind='stable').astype(np.int64)
+        counts = np.bincount(assignments, minlength=nlist)
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(base, centroids, list_offsets, list_rows, nprobe)
+
+    @staticmethod
+    def index_path(store_path: str) -> str:
+        return f"{store_path}.ivf.npz"
+
+    def save(self, store_path: str = EMBEDDING_STORE_PATH):
+        """Persist the lists next to the embedding store, with the store's fingerprint"""
+        path = self.index_path(store_path)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids,
+                 list_offsets=self.list_offsets, list_rows=self.list_rows,
+                 fingerprint=np.array(self.base.fingerprint))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, base: QuoteVectorIndex, store_path: str = EMBEDDING_STORE_PATH,
+             nprobe: int = DEFAULT_NPROBE) -> "IVFFlatIndex":
+        """Load persisted lists, raising ValueError if they were built over other rows
+
+        A rewritten store with the same number of rows (edited quotes, a
+        new model) has a different fingerprint, so its lists are stale too.
+        """
+        with np.load(cls.index_path(store_path)) as data:
+            if 'fingerprint' not in data or str(data['fingerprint']) != base.fingerprint:
+                raise ValueError("IVF index does not match the embedding store; rebuild it")
+            return cls(base, data['centroids'], data['list_offsets'], data['list_rows'], nprobe)
+
+    def top_k(self, query_embedding: np.ndarray, top_k: int = 5, nprobe: Optional[int] = None):
+        """
+        Approximate top_k search
+
+        Returns:
+            (row indices, cosine similarities), best match first
+        """
+        if len(self) == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = query / norm
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        candidates = np.concatenate([
+            self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probe
+        ])
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self.base.matrix[candidates] @ query
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return candidates[best], scores[best]
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict]:
+        """Return the top_k quotes in the same format as RAGChatbot retrieval"""
+        rows, scores = self.top_k(query_embedding, top_k)
+        return self.base.results(rows, scores)
+
+
+def benchmark_recall(exact: QuoteVectorIndex, ann: IVFFlatIndex, queries: np.ndarray,
+                     k: int = 10, nprobe: Optional[int] = None) -> Dict:
+    """Recall@k of the ANN index against exact search, with mean latencies"""
+    hits = 0
+    exact_time = ann_time = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        expected, _ = exact.top_k(query, k)
+        exact_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found, _ = ann.top_k(query, k, nprobe=nprobe)
+        ann_time += time.perf_counter() - start
+
+        hits += len(set(expected.tolist()) & set(found.tolist()))
+
+    n = max(len(queries), 1)
+    return {
+        'recall': hits / (n * k),
+        'exact_ms': exact_time / n * 1000,
+        'ann_ms': ann_time / n * 1000,
+        'nprobe': nprobe or ann.nprobe,
+    }
+
+
+def sample_queries(index: QuoteVectorIndex, count: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random stored embeddings, for benchmarking"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), size=min(count, len(index)), replace=False)
+    queries = np.asarray(index.matrix[np.sort(rows)], dtype=np.float32)
+    return queries + rng.normal(scale=noise, size=queries.shape).astype(np.float32)
+
+
+# Process-wide ANN index, built or loaded on first use
+_shared_ann_index = None
+_shared_ann_index_lock = threading.Lock()
+
+
+def get_shared_ann_index(driver, store_path: str = EMBEDDING_STORE_PATH) -> IVFFlatIndex:
+    """Return the process-wide IVF index over the shared exact index
+
+    Loads the persisted lists next to the embedding store when they exist
+    and match it, otherwise builds them in-process.
+    """
+    global _shared_ann_index
+    if _shared_ann_index is None:
+        with _shared_ann_index_lock:
+            if _shared_ann_index is None:
+                base = get_shared_index(driver, store_path=store_path)
+                index = None
+                if os.path.exists(IVFFlatIndex.index_path(store_path)):
+                    try:
+                        index = IVFFlatIndex.load(base, store_path)
+                    except ValueError as e:
+                        print(f"⚠️  {e}; building one in-process")
+                else:
+                    print("⚠️  No persisted IVF index found, building one in-process")
+                if index is None:
+                    index = IVFFlatIndex.build(base)
+                print(f"✓ IVF index ready: {index.nlist} lists, nprobe {index.nprobe}")
+                _shared_ann_index = index
+    return _shared_ann_index
+
+
+def reset_shared_ann_index():
+    global _shared_ann_index
+    with _shared_ann_index_lock:
+        _shared_ann_index = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build and benchmark the IVF quote index')
+    parser.add_argument('--store', default=EMBEDDING_STORE_PATH, help='Embedding store base path')
+    parser.add_argument('--nlist', type=int, help='Number of lists (default: 4 * sqrt(n))')
+    parser.add_argument('--iterations', type=int, default=10, help='k-means iterations')
+    parser.add_argument('--benchmark', action='store_true', help='Only benchmark the persisted index')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32],
+                        help='nprobe values to benchmark')
+    parser.add_argument('--queries', type=int, default=200, help='Benchmark queries')
+    parser.add_argument('--k', type=int, default=10, help='Benchmark recall@k')
+    args = parser.parse_args()
+
+    exact = QuoteVectorIndex.from_store(args.store)
+    if args.benchmark:
+        ann = IVFFlatIndex.load(exact, args.store)
+    else:
+        start = time.perf_counter()
+        ann = IVFFlatIndex.build(exact, args.nlist, args.iterations)
+        ann.save(args.store)
+        print(f"✅ Built {ann.nlist} lists over {len(exact)} quotes in "
+              f"{time.perf_counter() - start:.1f}s -> {IVFFlatIndex.index_path(args.store)}")
+
+    queries = sample_queries(exact, args.queries)
+    print(f"\nrecall@{args.k} over {len(queries)} queries:")
+    for nprobe in args.nprobe:
+        stats = benchmark_recall(exact, ann, queries, args.k, nprobe)
+        print(f"  nprobe={stats['nprobe']:<4} recall={stats['recall']:.3f}  "
+              f"exact={stats['exact_ms']:.2f}ms  ivf={stats['ann_ms']:.2f}ms")
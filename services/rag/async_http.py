@@ -0,0 +1,26 @@
+"""
+Shared aiohttp session for async calls to Ollama
+"""
+import os
+import aiohttp
+
+from services.loop_resources import loop_resource
+
+# Concurrent connections per event loop (0: unlimited)
+ASYNC_POOL_LIMIT = int(os.getenv('OLLAMA_ASYNC_POOL_LIMIT', '100'))
+
+def get_async_session() -> aiohttp.ClientSession:
+    """Return the keep-alive session for the running event loop
+
+    aiohttp sessions are bound to the loop that created them; the session
+    is closed with its loop (see services.loop_resources).
+    """
+    return loop_resource(
+        'aiohttp',
+        lambda: aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=ASYNC_POOL_LIMIT)),
+        lambda session: session.close(),
+    )
+
+
+def client_timeout(seconds: float) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=seconds)
@@ -0,0 +1,313 @@
+"""
+Caches for the RAG pipeline
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'data/embedding_cache.sqlite3')
+# Bounds on the SQLite embedding cache (0: unbounded); the least recently
+# used vectors are evicted first
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv('EMBEDDING_CACHE_MAX_ROWS', '1000000'))
+EMBEDDING_CACHE_MAX_AGE_DAYS = float(os.getenv('EMBEDDING_CACHE_MAX_AGE_DAYS', '90'))
+# Rows written between two prune passes
+EMBEDDING_CACHE_PRUNE_EVERY = 10000
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used cache with optional TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Maximum number of entries
+            ttl: Seconds an entry stays valid (None: until evicted)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+
+class SemanticResponseCache:
+    """Generated answers reused for paraphrased queries
+
+    Entries are grouped by a context key (e.g. the retrieved quote ids and
+    prompt settings); within a group a cached answer is returned when the
+    new query embedding is within `threshold` cosine of the cached query.
+    Groups are evicted least-recently-used.
+    """
+
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.95,
+                 ttl: Optional[float] = None, per_key: int = 8):
+        """
+        Args:
+            maxsize: Maximum number of context groups
+            threshold: Minimum cosine similarity between queries for a hit
+            ttl: Seconds a group stays valid (None: until evicted)
+            per_key: Queries remembered per context group
+        """
+        self.groups = LRUCache(maxsize, ttl)
+        self.threshold = threshold
+        self.per_key = per_key
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, key, embedding) -> Optional[str]:
+        """Cached answer for a query close to `embedding`, or None"""
+        entries = self.groups.get(key) or []
+        query = self._unit(embedding)
+        best, best_score = None, self.threshold
+        for cached_query, response in entries:
+            score = float(np.dot(cached_query, query))
+            if score >= best_score:
+                best, best_score = response, score
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best
+
+    def set(self, key, embedding, response: str):
+        entries = list(self.groups.get(key) or [])
+        entries.append((self._unit(embedding), response))
+        self.groups.set(key, entries[-self.per_key:])
+
+    def clear(self):
+        self.groups.clear()
+
+    def stats(self) -> Dict:
+        """Semantic hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.groups),
+            'maxsize': self.groups.maxsize,
+            'threshold': self.threshold,
+        }
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, trimmed, single spaces"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache keyed by (model, text hash)
+
+    An in-process LRU sits in front of a SQLite file, so vectors survive
+    restarts and are shared by every process that opens the same file.
+    The file is bounded by prune(): rows unused for max_age_days, and the
+    least recently used rows beyond max_rows, are deleted and their pages
+    returned to the filesystem.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, memory_size: int = 10000,
+                 max_rows: int = EMBEDDING_CACHE_MAX_ROWS,
+                 max_age_days: float = EMBEDDING_CACHE_MAX_AGE_DAYS,
+                 prune_every: int = EMBEDDING_CACHE_PRUNE_EVERY):
+        """
+        Args:
+            path: SQLite file
+            memory_size: Vectors kept in the in-process LRU
+            max_rows: Rows kept in the file (0: unbounded)
+            max_age_days: Days an unused row is kept (0: forever)
+            prune_every: Rows written between automatic prune() calls
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.memory = LRUCache(memory_size)
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.prune_every = prune_every
+        self._written = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            # Only takes effect on a new file; lets prune() shrink it in place
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            # WAL lets several gunicorn workers read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    used_at REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")]
+            if "used_at" not in columns:
+                # Files written before eviction existed: start their clock now
+                self._conn.execute("ALTER TABLE embeddings ADD COLUMN used_at REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE embeddings SET used_at = ?", (time.time(),))
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)"
+            )
+        self.prune()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Look up vectors by text hash; missing hashes are left out"""
+        found = {}
+        missing = []
+        for h in hashes:
+            vector = self.memory.get((model, h))
+            if vector is not None:
+                found[h] = vector
+            else:
+                missing.append(h)
+
+        # Stay under SQLite's host-parameter limit
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock, self._conn:
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET used_at = ? "
+                        f"WHERE model = ? AND text_hash IN ({placeholders})",
+                        [time.time(), model, *chunk]
+                    )
+            for h, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self.memory.set((model, h), vector)
+                found[h] = vector
+        return found
+
+    def set_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        """Store vectors keyed by text hash"""
+        rows = []
+        now = time.time()
+        for h, vector in vectors.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            self.memory.set((model, h), vector)
+            rows.append((model, h, vector.tobytes(), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._written += len(rows)
+            due = self.prune_every and self._written >= self.prune_every
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete expired and least recently used rows beyond the bounds
+
+        Returns:
+            Number of rows deleted
+        """
+        deleted = 0
+        with self._lock:
+            self._written = 0
+            with self._conn:
+                if self.max_age_days:
+                    cutoff = time.time() - self.max_age_days * 86400
+                    deleted += self._conn.execute(
+                        "DELETE FROM embeddings WHERE used_at < ?", (cutoff,)
+                    ).rowcount
+                if self.max_rows:
+                    (rows,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                    if rows > self.max_rows:
+                        deleted += self._conn.execute(
+                            "DELETE FROM embeddings WHERE rowid IN ("
+                            "SELECT rowid FROM embeddings ORDER BY used_at LIMIT ?)",
+                            (rows - self.max_rows,)
+                        ).rowcount
+            if deleted:
+                # Hand freed pages back (a no-op on files without auto_vacuum)
+                self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+        return deleted
+
+
+# Process-wide cache, opened on first use
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(path: str = EMBEDDING_CACHE_PATH) -> Optional[EmbeddingCache]:
+    """Return the shared embedding cache, or None if it cannot be opened"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                try:
+                    _default_cache = EmbeddingCache(path)
+                except (sqlite3.Error, OSError) as e:
+                    print(f"⚠️  Embedding cache disabled ({path}): {e}")
+                    return None
+    return _default_cache
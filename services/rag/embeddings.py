@@ -1,26 +1,62 @@
 """
 Embedding service for semantic search - Ollama only
 """
+import asyncio
 import numpy as np
 from typing import List, Union
 import requests
+from requests.adapters import HTTPAdapter
+from .cache import EmbeddingCache, normalize_text, text_hash
+
+
+def resolve_model_tag(model: str) -> str:
+    """Ollama model name with its tag spelled out (an untagged name means :latest)
+
+    Keeps cache keys the same whether or not the name was resolved against
+    the server, since Ollama treats both spellings as one model.
+    """
+    if ":" in model.rsplit("/", 1)[-1]:
+        return model
+    return f"{model}:latest"
+
 
 class EmbeddingService:
     """Generate embeddings using Ollama"""
     
-    def __init__(self, model: str = None):
+    def __init__(self, model: str = None, batch_size: int = 32, pool_size: int = 16,
+                 cache: EmbeddingCache = None, check_connection: bool = True):
         """
         Initialize embedding service with Ollama
         
         Args:
             model: Model name (default: nomic-embed-text)
+            batch_size: Texts sent per /api/embed request
+            pool_size: Keep-alive connections kept open to Ollama
+            cache: Optional EmbeddingCache; texts found there skip Ollama
+            check_connection: Verify Ollama and the model before returning;
+                long-lived callers can skip it and use health_check() instead
         """
         self.base_url = "http://ollama:11434"
-        self.model_name = model or "nomic-embed-text"
+        self.model_name = resolve_model_tag(model or "nomic-embed-text")
+        self.batch_size = batch_size
+        self.cache = cache
+        # Falls back to one /api/embeddings call per text on older Ollama versions
+        self.batch_supported = True
+        
+        # Pooled keep-alive connections, shared by every request (and thread)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
+        if check_connection:
+            self.check_connection()
+    
+    def check_connection(self):
+        """Raise ConnectionError unless Ollama is up and serves the model"""
         try:
             # Test connection
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=2)
             if response.status_code != 200:
                 raise ConnectionError(f"Ollama returned status {response.status_code}")
             
@@ -28,22 +64,12 @@ class EmbeddingService:
             models = models_data.get('models', [])
             model_names = [m.get('name', '') for m in models]
             
-            # Check for exact match or with :latest suffix
-            model_found = (
-                self.model_name in model_names or 
-                f"{self.model_name}:latest" in model_names
-            )
-            
-            if not model_found:
+            if self.model_name not in model_names:
                 print(f"⚠️  Model '{self.model_name}' not found")
                 print(f"    Available: {model_names}")
                 print(f"    Run: ollama pull {self.model_name}")
                 raise ConnectionError(f"Model {self.model_name} not available")
             
-            # Use the full name with :latest if that's what exists
-            if f"{self.model_name}:latest" in model_names and self.model_name not in model_names:
-                self.model_name = f"{self.model_name}:latest"
-            
             print(f"✓ Connected to Ollama: {self.model_name}")
             
         except requests.exceptions.RequestException as e:
@@ -52,44 +78,157 @@ class EmbeddingService:
                 f"Make sure Ollama is running with 'ollama serve'. Error: {e}"
             )
     
-    def embed_text(self, text: Union[str, List[str]]) -> np.ndarray:
+    def health_check(self) -> bool:
+        """Non-raising variant of check_connection"""
+        try:
+            self.check_connection()
+            return True
+        except ConnectionError:
+            return False
+    
+    def embed_text(self, text: Union[str, List[str]], batch_size: int = None) -> np.ndarray:
         """
         Generate embeddings for text using Ollama
         
         Args:
             text: Single string or list of strings
+            batch_size: Texts per request (default: the service batch_size)
             
         Returns:
             numpy array of embeddings
         """
-        if isinstance(text, str):
-            text = [text]
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        batch_size = batch_size or self.batch_size
         
-        embeddings = []
-        for t in text:
-            try:
-                response = requests.post(
-                    f"{self.base_url}/api/embeddings",
-                    json={"model": self.model_name, "prompt": t},
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                # Handle different possible response formats
-                if 'embedding' in data:
-                    embeddings.append(data['embedding'])
-                elif 'embeddings' in data:
-                    embeddings.append(data['embeddings'][0])
-                else:
-                    raise KeyError(f"Unexpected response format: {list(data.keys())}")
-                    
-            except Exception as e:
-                print(f"Error embedding text '{t[:50]}...': {e}")
-                raise
+        if self.cache is not None:
+            embeddings = self._embed_cached(texts, batch_size)
+        else:
+            embeddings = []
+            for start in range(0, len(texts), batch_size):
+                embeddings.extend(self._embed_batch(texts[start:start + batch_size]))
         
         result = np.array(embeddings)
-        return result[0] if len(text) == 1 else result
+        return result[0] if single or len(texts) == 1 else result
+    
+    async def aembed_text(self, text: str) -> np.ndarray:
+        """
+        Embed a single text without blocking the event loop
+
+        Uses the same cache and endpoints as embed_text over a shared
+        aiohttp session. Only the in-memory LRU is read on the loop; the
+        SQLite level is read and written on a worker thread.
+        """
+        from .async_http import get_async_session, client_timeout
+
+        h = text_hash(text)
+        if self.cache is not None:
+            vector = self.cache.memory.get((self.model_name, h))
+            if vector is not None:
+                return vector
+            found = await asyncio.to_thread(self.cache.get_many, self.model_name, [h])
+            if h in found:
+                return found[h]
+
+        session = get_async_session()
+        if self.batch_supported:
+            url = f"{self.base_url}/api/embed"
+            payload = {"model": self.model_name, "input": [normalize_text(text)]}
+        else:
+            url = f"{self.base_url}/api/embeddings"
+            payload = {"model": self.model_name, "prompt": normalize_text(text)}
+
+        async with session.post(url, json=payload, timeout=client_timeout(60)) as response:
+            if self.batch_supported and response.status == 404 and "model" not in (await response.text()).lower():
+                # Ollama before 0.3 has no /api/embed
+                self.batch_supported = False
+                return await self.aembed_text(text)
+            response.raise_for_status()
+            data = await response.json()
+
+        if 'embeddings' in data:
+            vector = data['embeddings'][0]
+        elif 'embedding' in data:
+            vector = data['embedding']
+        else:
+            raise KeyError(f"Unexpected response format: {list(data.keys())}")
+
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set_many, self.model_name, {h: vector})
+        return vector
+
+    def _embed_cached(self, texts: List[str], batch_size: int) -> List[np.ndarray]:
+        """Serve texts from the cache and embed only the distinct misses"""
+        hashes = [text_hash(t) for t in texts]
+        found = self.cache.get_many(self.model_name, list(set(hashes)))
+        
+        misses = {}
+        for t, h in zip(texts, hashes):
+            if h not in found and h not in misses:
+                misses[h] = normalize_text(t)
+        
+        if misses:
+            miss_hashes = list(misses)
+            miss_texts = [misses[h] for h in miss_hashes]
+            new_vectors = {}
+            for start in range(0, len(miss_texts), batch_size):
+                batch = self._embed_batch(miss_texts[start:start + batch_size])
+                new_vectors.update(zip(miss_hashes[start:start + batch_size], batch))
+            self.cache.set_many(self.model_name, new_vectors)
+            found.update({h: np.asarray(v, dtype=np.float32) for h, v in new_vectors.items()})
+        
+        return [found[h] for h in hashes]
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch with one /api/embed request"""
+        if not self.batch_supported:
+            return [self._embed_one(t) for t in texts]
+        
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.model_name, "input": texts},
+                timeout=60
+            )
+            if response.status_code == 404 and "model" not in response.text.lower():
+                # Ollama before 0.3 has no /api/embed
+                print("⚠️  /api/embed not available, falling back to /api/embeddings")
+                self.batch_supported = False
+                return [self._embed_one(t) for t in texts]
+            response.raise_for_status()
+            data = response.json()
+            
+            if 'embeddings' not in data or len(data['embeddings']) != len(texts):
+                raise KeyError(f"Unexpected response format: {list(data.keys())}")
+            return data['embeddings']
+        
+        except Exception as e:
+            print(f"Error embedding batch of {len(texts)} texts starting '{texts[0][:50]}...': {e}")
+            raise
+    
+    def _embed_one(self, t: str) -> List[float]:
+        """Embed a single text with the legacy /api/embeddings endpoint"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.model_name, "prompt": t},
+                timeout=30
+            )
+            response.raise_for_status()
+            data = response.json()
+            
+            # Handle different possible response formats
+            if 'embedding' in data:
+                return data['embedding']
+            elif 'embeddings' in data:
+                return data['embeddings'][0]
+            else:
+                raise KeyError(f"Unexpected response format: {list(data.keys())}")
+                
+        except Exception as e:
+            print(f"Error embedding text '{t[:50]}...': {e}")
+            raise
     
     @staticmethod
     def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
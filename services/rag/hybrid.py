@@ -0,0 +1,177 @@
+"""
+Hybrid retrieval: fulltext (BM25) and vector search fused with reciprocal rank fusion
+"""
+import asyncio
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+FULLTEXT_INDEX = 'quoteTextIndex'
+
+FULLTEXT_QUERY_CYPHER = """
+CALL db.index.fulltext.queryNodes($index, $q, {limit: $k})
+YIELD node AS q, score
+MATCH (q)-[:SAID]-(a:Author)
+OPTIONAL MATCH (q)-[:FROM]->(w:Work)
+WITH q, score, head(collect(DISTINCT a.name)) AS author, head(collect(w.title)) AS work
+RETURN elementId(q) AS id,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) AS text,
+       coalesce(author, 'Unknown') AS author,
+       work,
+       score
+ORDER BY score DESC
+LIMIT $k
+"""
+
+# Standard RRF damping constant (Cormack et al.)
+RRF_K = 60
+
+# Per-leg latency budgets; a leg that misses its budget is left out of the
+# fusion. The vector budget only covers the search: the query is embedded
+# and the index loaded before the legs start (see RAGChatbot)
+VECTOR_BUDGET = float(os.getenv('RAG_HYBRID_VECTOR_BUDGET_MS', '500')) / 1000
+FULLTEXT_BUDGET = float(os.getenv('RAG_HYBRID_FULLTEXT_BUDGET_MS', '300')) / 1000
+
+# Shared by every retriever in the process; dropped legs finish in the background
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('RAG_HYBRID_WORKERS', '16')),
+                               thread_name_prefix='rag-hybrid')
+
+
+def fulltext_terms(text: str) -> str:
+    """Reduce free text to plain Lucene terms (no operators or syntax errors)"""
+    return " ".join(re.findall(r"\w+", text))
+
+
+def fulltext_search(driver, query: str, top_k: int = 5, index: str = FULLTEXT_INDEX,
+                    database: Optional[str] = None) -> List[Dict]:
+    """Top-k quotes from the fulltext index, in RAGChatbot retrieval format
+
+    Fulltext hits carry a BM25 'score' and no cosine 'similarity'.
+    """
+    terms = fulltext_terms(query)
+    if not terms:
+        return []
+    with driver.session(database=database) as session:
+        records = list(session.run(FULLTEXT_QUERY_CYPHER, index=index, q=terms, k=top_k))
+    return [
+        {
+            'id': r['id'],
+            'text': r['text'] or '',
+            'author': r['author'],
+            'work': r['work'],
+            'similarity': None,
+            'score': float(r['score']),
+        }
+        for r in records
+    ]
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Dict]], top_k: int = 5,
+                           k: int = RRF_K) -> List[Dict]:
+    """
+    Fuse ranked result lists by summing 1 / (k + rank) per quote id
+
+    Args:
+        rankings: Leg name -> results, best first
+        top_k: Results returned
+        k: Damping constant; higher flattens the contribution of top ranks
+
+    Returns:
+        Merged quote dicts with 'rrf_score' and 'sources', best first
+    """
+    fused = {}
+    for name, results in rankings.items():
+        for rank, quote in enumerate(results, 1):
+            entry = fused.get(quote['id'])
+            if entry is None:
+                entry = fused[quote['id']] = dict(quote, rrf_score=0.0, sources=[])
+            elif entry.get('similarity') is None and quote.get('similarity') is not None:
+                entry['similarity'] = quote['similarity']
+            entry['rrf_score'] += 1.0 / (k + rank)
+            entry['sources'].append(name)
+    return sorted(fused.values(), key=lambda q: q['rrf_score'], reverse=True)[:top_k]
+
+
+class HybridRetriever:
+    """Run retrieval legs concurrently and fuse whatever returns in time"""
+
+    def __init__(self, budgets: Dict[str, float] = None, candidates: int = 20, rrf_k: int = RRF_K):
+        """
+        Args:
+            budgets: Leg name -> seconds allowed (default: vector and fulltext budgets)
+            candidates: Minimum results requested from each leg before fusion
+            rrf_k: RRF damping constant
+        """
+        self.budgets = budgets or {'vector': VECTOR_BUDGET, 'fulltext': FULLTEXT_BUDGET}
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.dropped = Counter()
+        self.failed = Counter()
+
+    def _leg_size(self, top_k: int) -> int:
+        return max(self.candidates, top_k * 4)
+
+    def _drop(self, name: str, error: Exception = None):
+        if error is None:
+            self.dropped[name] += 1
+            print(f"⚠️  {name} retrieval missed its {self.budgets[name] * 1000:.0f}ms budget, skipped")
+        else:
+            self.failed[name] += 1
+            print(f"⚠️  {name} retrieval failed, skipped: {error}")
+
+    def fail(self, name: str, error: Exception):
+        """Count a leg that could not be started (e.g. its query failed to embed)"""
+        self._drop(name, error)
+
+    def retrieve(self, query: str, top_k: int,
+                 legs: Dict[str, Callable[[str, int], List[Dict]]]) -> Tuple[List[Dict], bool]:
+        """
+        Run every leg on the shared thread pool and fuse the ones that finish
+        within their budget
+
+        Args:
+            legs: Leg name -> fn(query, k) returning ranked quote dicts
+
+        Returns:
+            (fused results, whether every leg contributed)
+        """
+        start = time.monotonic()
+        size = self._leg_size(top_k)
+        futures = {name: _executor.submit(fn, query, size) for name, fn in legs.items()}
+
+        rankings = {}
+        for name, future in futures.items():
+            remaining = start + self.budgets.get(name, 0) - time.monotonic()
+            try:
+                rankings[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                self._drop(name)
+            except Exception as e:
+                self._drop(name, e)
+        return reciprocal_rank_fusion(rankings, top_k, self.rrf_k), len(rankings) == len(legs)
+
+    async def aretrieve(self, query: str, top_k: int,
+                        legs: Dict[str, Callable[[str, int], Awaitable[List[Dict]]]]) -> Tuple[List[Dict], bool]:
+        """Async retrieve(); legs are coroutine functions, cancelled at their budget"""
+        size = self._leg_size(top_k)
+
+        async def run(name, fn):
+            try:
+                return await asyncio.wait_for(fn(query, size), timeout=self.budgets.get(name, 0))
+            except asyncio.TimeoutError:
+                self._drop(name)
+            except Exception as e:
+                self._drop(name, e)
+            return None
+
+        results = await asyncio.gather(*(run(name, fn) for name, fn in legs.items()))
+        rankings = {name: r for name, r in zip(legs, results) if r is not None}
+        return reciprocal_rank_fusion(rankings, top_k, self.rrf_k), len(rankings) == len(legs)
+
+    def stats(self) -> Dict:
+        """Legs dropped for missing their budget, or for raising"""
+        return {'budgets_ms': {n: b * 1000 for n, b in self.budgets.items()},
+                'dropped': dict(self.dropped), 'failed': dict(self.failed)}
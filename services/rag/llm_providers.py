@@ -1,6 +1,7 @@
+import asyncio
 import requests
 import json
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator, AsyncIterator
 from abc import ABC, abstractmethod
 
 class LLMProvider(ABC):
@@ -9,25 +10,50 @@ class LLMProvider(ABC):
     @abstractmethod
     def generate(self, prompt: str, max_tokens: int = 200, temperature: float = 0.7) -> str:
         pass
+    
+    def generate_stream(self, prompt: str, max_tokens: int = 200,
+                        temperature: float = 0.7) -> Iterator[str]:
+        """Yield the response in chunks; providers without streaming yield it whole"""
+        yield self.generate(prompt, max_tokens=max_tokens, temperature=temperature)
+    
+    async def agenerate(self, prompt: str, max_tokens: int = 200, temperature: float = 0.7) -> str:
+        """Async generate; providers without an async client run generate() in a thread"""
+        return await asyncio.to_thread(self.generate, prompt, max_tokens, temperature)
+    
+    async def agenerate_stream(self, prompt: str, max_tokens: int = 200,
+                               temperature: float = 0.7) -> AsyncIterator[str]:
+        """Async generate_stream; providers without an async client yield agenerate() whole"""
+        yield await self.agenerate(prompt, max_tokens=max_tokens, temperature=temperature)
 
 
 class OllamaProvider(LLMProvider):
     """Local LLM using Ollama"""
     
-    def __init__(self, model: str = "llama3.2:3b", base_url: str = "http://ollama:11434"):
+    def __init__(self, model: str = "llama3.2:3b", base_url: str = "http://ollama:11434",
+                 check_connection: bool = True):
         self.model = model
         self.base_url = base_url
         
         # Check if Ollama is available
+        if check_connection:
+            self.health_check(verbose=True)
+        
+        print(f"Ollama provider initialized (model: {model})")
+    
+    def health_check(self, verbose: bool = False) -> bool:
+        """Return True if Ollama is reachable and serves the model"""
         try:
             response = requests.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 available_models = [m['name'] for m in response.json().get('models', [])]
-                print(f"✓ Ollama available. Models: {available_models}")
+                if verbose:
+                    print(f"✓ Ollama available. Models: {available_models}")
                 
                 if self.model not in available_models:
                     print(f"⚠ Model {self.model} not found. Available: {available_models}")
                     print(f"  Run: ollama pull {self.model}")
+                    return False
+                return True
             else:
                 print(f"⚠ Ollama responded with status {response.status_code}")
         except requests.exceptions.ConnectionError:
@@ -35,25 +61,45 @@ class OllamaProvider(LLMProvider):
             print(f"  Make sure Ollama is running: 'ollama serve'")
         except Exception as e:
             print(f"⚠ Error checking Ollama: {e}")
-        
-        print(f"Ollama provider initialized (model: {model})")
+        return False
     
-    def generate(self, prompt: str, max_tokens: int = 200, temperature: float = 0.7) -> str:
-        """Generate text using Ollama"""
-        
-        # Updated API endpoint - use /api/generate
-        url = f"{self.base_url}/api/generate"
-        
-        payload = {
+    def _payload(self, prompt: str, max_tokens: int, temperature: float, stream: bool) -> Dict:
+        return {
             "model": self.model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": temperature,
                 "num_predict": max_tokens,
                 "stop": ["\n\n", "User:", "Assistant:"]  # Stop tokens
             }
         }
+    
+    def _raise_for_error(self, error: Exception):
+        """Re-raise a requests error with an actionable message"""
+        if isinstance(error, requests.exceptions.ConnectionError):
+            raise Exception(
+                "Cannot connect to Ollama. "
+                "Make sure it's running with: 'ollama serve'\n"
+                f"Tried to connect to: {self.base_url}"
+            )
+        if isinstance(error, requests.exceptions.Timeout):
+            raise Exception("Ollama request timed out. Model might be loading.")
+        if isinstance(error, requests.exceptions.HTTPError):
+            if error.response.status_code == 404:
+                raise Exception(
+                    f"Model '{self.model}' not found. "
+                    f"Install it with: 'ollama pull {self.model}'"
+                )
+            raise Exception(f"Ollama HTTP error: {error}")
+        raise Exception(f"Ollama generation failed: {error}")
+    
+    def generate(self, prompt: str, max_tokens: int = 200, temperature: float = 0.7) -> str:
+        """Generate text using Ollama"""
+        
+        # Updated API endpoint - use /api/generate
+        url = f"{self.base_url}/api/generate"
+        payload = self._payload(prompt, max_tokens, temperature, stream=False)
         
         try:
             response = requests.post(url, json=payload, timeout=60)
@@ -62,23 +108,103 @@ class OllamaProvider(LLMProvider):
             result = response.json()
             return result.get('response', '').strip()
             
-        except requests.exceptions.ConnectionError:
+        except Exception as e:
+            self._raise_for_error(e)
+    
+    async def agenerate(self, prompt: str, max_tokens: int = 200, temperature: float = 0.7) -> str:
+        """Generate text without blocking the event loop"""
+        import aiohttp
+        from .async_http import get_async_session, client_timeout
+        
+        url = f"{self.base_url}/api/generate"
+        payload = self._payload(prompt, max_tokens, temperature, stream=False)
+        
+        try:
+            async with get_async_session().post(url, json=payload, timeout=client_timeout(60)) as response:
+                if response.status == 404:
+                    raise Exception(
+                        f"Model '{self.model}' not found. "
+                        f"Install it with: 'ollama pull {self.model}'"
+                    )
+                response.raise_for_status()
+                result = await response.json()
+                return result.get('response', '').strip()
+        
+        except aiohttp.ClientConnectionError:
             raise Exception(
                 "Cannot connect to Ollama. "
                 "Make sure it's running with: 'ollama serve'\n"
                 f"Tried to connect to: {self.base_url}"
             )
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             raise Exception("Ollama request timed out. Model might be loading.")
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                raise Exception(
-                    f"Model '{self.model}' not found. "
-                    f"Install it with: 'ollama pull {self.model}'"
-                )
+        except aiohttp.ClientResponseError as e:
             raise Exception(f"Ollama HTTP error: {e}")
+    
+    def generate_stream(self, prompt: str, max_tokens: int = 200,
+                        temperature: float = 0.7) -> Iterator[str]:
+        """Yield tokens as Ollama produces them"""
+        
+        url = f"{self.base_url}/api/generate"
+        payload = self._payload(prompt, max_tokens, temperature, stream=True)
+        
+        try:
+            # The timeout applies between chunks, not to the whole generation
+            with requests.post(url, json=payload, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(chunk['error'])
+                    if chunk.get('response'):
+                        yield chunk['response']
+                    if chunk.get('done'):
+                        return
         except Exception as e:
-            raise Exception(f"Ollama generation failed: {e}")
+            self._raise_for_error(e)
+    
+    async def agenerate_stream(self, prompt: str, max_tokens: int = 200,
+                               temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yield tokens as Ollama produces them, without blocking the event loop"""
+        import aiohttp
+        from .async_http import get_async_session
+        
+        url = f"{self.base_url}/api/generate"
+        payload = self._payload(prompt, max_tokens, temperature, stream=True)
+        # The timeout applies between chunks, not to the whole generation
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+        
+        try:
+            async with get_async_session().post(url, json=payload, timeout=timeout) as response:
+                if response.status == 404:
+                    raise Exception(
+                        f"Model '{self.model}' not found. "
+                        f"Install it with: 'ollama pull {self.model}'"
+                    )
+                response.raise_for_status()
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(chunk['error'])
+                    if chunk.get('response'):
+                        yield chunk['response']
+                    if chunk.get('done'):
+                        return
+        
+        except aiohttp.ClientConnectionError:
+            raise Exception(
+                "Cannot connect to Ollama. "
+                "Make sure it's running with: 'ollama serve'\n"
+                f"Tried to connect to: {self.base_url}"
+            )
+        except asyncio.TimeoutError:
+            raise Exception("Ollama request timed out. Model might be loading.")
+        except aiohttp.ClientResponseError as e:
+            raise Exception(f"Ollama HTTP error: {e}")
 
 
 class LLMFactory:
@@ -97,7 +223,8 @@ class LLMFactory:
         if provider == "ollama":
             return OllamaProvider(
                 model=kwargs.get('model', 'llama3.2:3b'),
-                base_url=kwargs.get('base_url', 'http://ollama:11434')
+                base_url=kwargs.get('base_url', 'http://ollama:11434'),
+                check_connection=kwargs.get('check_connection', True)
             )
         else:
             raise ValueError(f"Unknown provider: {provider}")
\ No newline at end of file
@@ -1,24 +1,91 @@
-from neo4j import GraphDatabase
 from .embeddings import EmbeddingService
+from .cache import LRUCache, SemanticResponseCache, get_embedding_cache, normalize_text
 from .llm_providers import LLMFactory
+from .vector_index import get_shared_index, Neo4jVectorIndex
+from .ann_index import get_shared_ann_index
+from .hybrid import HybridRetriever, fulltext_search
+from services.neo4j_driver import get_shared_driver
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Iterator, AsyncIterator
+import asyncio
 import os
+import threading
+import time
+
+# Hot chat queries, shared by every chatbot in the process
+QUERY_CACHE_SIZE = int(os.getenv('RAG_QUERY_CACHE_SIZE', '1024'))
+QUERY_CACHE_TTL = float(os.getenv('RAG_QUERY_CACHE_TTL', '3600'))
+
+query_embedding_cache = LRUCache(QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+retrieval_cache = LRUCache(QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+
+# Generated answers, reused for paraphrases with the same retrieved context
+RESPONSE_CACHE_SIZE = int(os.getenv('RAG_RESPONSE_CACHE_SIZE', '1024'))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv('RAG_RESPONSE_CACHE_THRESHOLD', '0.95'))
+
+response_cache = SemanticResponseCache(RESPONSE_CACHE_SIZE, threshold=RESPONSE_CACHE_THRESHOLD,
+                                       ttl=QUERY_CACHE_TTL)
+
+
+# Below this cosine similarity the best match is not worth answering from
+MIN_SIMILARITY = 0.3
+
+# Vector leg used by the 'hybrid' retrieval mode
+HYBRID_VECTOR_MODE = os.getenv('RAG_HYBRID_VECTOR_MODE', 'memory')
+
+
+def weak_match(quotes: List[Dict]) -> bool:
+    """True when retrieval found nothing relevant enough to answer from
+
+    Fulltext-only hits have no cosine similarity; a keyword match counts as
+    relevant.
+    """
+    return all(q.get('similarity') is not None and q['similarity'] < MIN_SIMILARITY
+               for q in quotes)
+
+
+def query_cache_key(query: str) -> str:
+    """Chat queries that differ only in case or spacing share cache entries"""
+    return normalize_text(query).casefold()
+
+
+def response_cache_key(quotes: List[Dict], username: str, accent: str) -> tuple:
+    """Everything besides the query that shapes the prompt"""
+    return (tuple(q.get('id') for q in quotes), username, accent)
+
 
 class RAGChatbot:
     """RAG-based chatbot with local LLM support"""
     
     def __init__(self, neo4j_uri, neo4j_user, neo4j_password, 
-                 llm_provider="ollama", llm_config=None):
+                 llm_provider="ollama", llm_config=None, retrieval_mode=None,
+                 check_connections=True):
         """
         Initialize RAG chatbot
         
         Args:
             llm_provider: 'ollama', 'openai', or 'anthropic'
             llm_config: Dict with provider-specific config
+            retrieval_mode: 'memory' (exact in-process vector index over all
+                quotes), 'ivf' (approximate IVF-flat index, see ann_index),
+                'neo4j' (Neo4j native vector index on Quote.embedding),
+                'scan' (score a sample of quotes fetched per query) or
+                'hybrid' (fulltext and RAG_HYBRID_VECTOR_MODE vector search,
+                fused with reciprocal rank fusion, see hybrid);
+                defaults to RAG_RETRIEVAL_MODE or 'memory'
+            check_connections: Block on Ollama health checks while constructing;
+                long-lived instances skip them and call start_health_monitor()
         """
-        self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        self.embedder = EmbeddingService()
+        self.driver = get_shared_driver(neo4j_uri, neo4j_user, neo4j_password)
+        self.embedder = EmbeddingService(cache=get_embedding_cache(),
+                                         check_connection=check_connections)
+        self.health = {'embeddings': None, 'llm': None, 'checked_at': None}
+        self._health_thread = None
+        self._health_stop = threading.Event()
+        self.retrieval_mode = retrieval_mode or os.getenv('RAG_RETRIEVAL_MODE', 'memory')
+        if self.retrieval_mode not in ('memory', 'ivf', 'neo4j', 'scan', 'hybrid'):
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
+        self.hybrid = HybridRetriever() if self.retrieval_mode == 'hybrid' else None
         
         # Initialize LLM
         llm_config = llm_config or {}
@@ -27,7 +94,8 @@ class RAGChatbot:
             self.llm = LLMFactory.create(
                 "ollama",
                 model=llm_config.get('model', 'llama3.2:3b'),
-                base_url=llm_config.get('base_url', 'http://ollama:11434')
+                base_url=llm_config.get('base_url', 'http://ollama:11434'),
+                check_connection=check_connections
             )
         elif llm_provider == "openai":
             self.llm = LLMFactory.create(
@@ -45,12 +113,161 @@ class RAGChatbot:
             raise ValueError(f"Unknown LLM provider: {llm_provider}")
     
     def close(self):
-        self.driver.close()
+        # The driver is shared by the process, so it stays open
+        self._health_stop.set()
+    
+    def check_health(self) -> Dict:
+        """Run the Ollama health checks once and record the result"""
+        llm_check = getattr(self.llm, 'health_check', None)
+        self.health = {
+            'embeddings': self.embedder.health_check(),
+            'llm': llm_check() if llm_check else None,
+            'checked_at': time.time(),
+        }
+        return self.health
+    
+    def start_health_monitor(self, interval: float = 60.0):
+        """Re-check Ollama every `interval` seconds on a daemon thread"""
+        if self._health_thread is not None:
+            return
+        
+        def monitor():
+            while not self._health_stop.is_set():
+                try:
+                    self.check_health()
+                except Exception as e:
+                    print(f"⚠️  RAG health check failed: {e}")
+                self._health_stop.wait(interval)
+        
+        self._health_thread = threading.Thread(target=monitor, name="rag-health", daemon=True)
+        self._health_thread.start()
+    
+    @staticmethod
+    def cache_stats() -> Dict:
+        """Hit/miss counters of the query embedding, retrieval and response caches"""
+        return {
+            'query_embeddings': query_embedding_cache.stats(),
+            'retrieval': retrieval_cache.stats(),
+            'responses': response_cache.stats(),
+        }
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a chat query, reusing the embedding of recent identical queries"""
+        key = query_cache_key(query)
+        embedding = query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embedder.embed_text(query)
+            query_embedding_cache.set(key, embedding)
+        return embedding
     
     def retrieve_similar_quotes(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Retrieve most similar quotes - undirected relationship"""
+        """Retrieve most similar quotes"""
+        
+        key = (self.retrieval_mode, query_cache_key(query), top_k)
+        cached = retrieval_cache.get(key)
+        if cached is not None:
+            return [dict(q) for q in cached]
         
-        query_embedding = self.embedder.embed_text(query)
+        if self.retrieval_mode == 'hybrid':
+            legs = {'fulltext': lambda q, k: fulltext_search(self.driver, q, k)}
+            vector_leg = self._hybrid_vector_leg(query)
+            if vector_leg is not None:
+                legs['vector'] = vector_leg
+            results, complete = self.hybrid.retrieve(query, top_k, legs)
+            if not complete or vector_leg is None:
+                # Don't pin a degraded result set in the cache
+                return results
+        else:
+            results = self._search(self.embed_query(query), top_k)
+        
+        retrieval_cache.set(key, [dict(q) for q in results])
+        return results
+    
+    async def aembed_query(self, query: str) -> np.ndarray:
+        """Async embed_query, sharing its cache"""
+        key = query_cache_key(query)
+        embedding = query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = await self.embedder.aembed_text(query)
+            query_embedding_cache.set(key, embedding)
+        return embedding
+    
+    async def aretrieve_similar_quotes(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Async retrieve_similar_quotes, sharing its cache"""
+        
+        key = (self.retrieval_mode, query_cache_key(query), top_k)
+        cached = retrieval_cache.get(key)
+        if cached is not None:
+            return [dict(q) for q in cached]
+        
+        # Index lookups are CPU-bound (and the first one loads the index),
+        # so keep them off the event loop
+        if self.retrieval_mode == 'hybrid':
+            async def fulltext_leg(q, k):
+                return await asyncio.to_thread(fulltext_search, self.driver, q, k)
+            
+            legs = {'fulltext': fulltext_leg}
+            vector_leg = await self._ahybrid_vector_leg(query)
+            if vector_leg is not None:
+                legs['vector'] = vector_leg
+            results, complete = await self.hybrid.aretrieve(query, top_k, legs)
+            if not complete or vector_leg is None:
+                return results
+        else:
+            query_embedding = await self.aembed_query(query)
+            results = await asyncio.to_thread(self._search, query_embedding, top_k)
+        
+        retrieval_cache.set(key, [dict(q) for q in results])
+        return results
+    
+    def _warm_index(self, mode: str):
+        """Load the in-process index a retrieval mode searches, if it has one"""
+        if mode == 'memory':
+            get_shared_index(self.driver)
+        elif mode == 'ivf':
+            get_shared_ann_index(self.driver)
+    
+    def _hybrid_vector_leg(self, query: str):
+        """
+        The hybrid vector leg, with the query embedded and the index loaded
+        up front so the leg's budget only covers the search
+        
+        Returns None (counted as a failed leg) if either step fails.
+        """
+        try:
+            embedding = self.embed_query(query)
+            self._warm_index(HYBRID_VECTOR_MODE)
+        except Exception as e:
+            self.hybrid.fail('vector', e)
+            return None
+        return lambda q, k: self._search(embedding, k, HYBRID_VECTOR_MODE)
+    
+    async def _ahybrid_vector_leg(self, query: str):
+        """Async _hybrid_vector_leg"""
+        try:
+            embedding = await self.aembed_query(query)
+            await asyncio.to_thread(self._warm_index, HYBRID_VECTOR_MODE)
+        except Exception as e:
+            self.hybrid.fail('vector', e)
+            return None
+        
+        async def vector_leg(q, k):
+            return await asyncio.to_thread(self._search, embedding, k, HYBRID_VECTOR_MODE)
+        return vector_leg
+    
+    def _search(self, query_embedding: np.ndarray, top_k: int, mode: str = None) -> List[Dict]:
+        """Top-k vector search with the configured (or given) retrieval mode"""
+        mode = mode or self.retrieval_mode
+        if mode == 'memory':
+            return get_shared_index(self.driver).search(query_embedding, top_k)
+        if mode == 'ivf':
+            return get_shared_ann_index(self.driver).search(query_embedding, top_k)
+        if mode == 'neo4j':
+            return Neo4jVectorIndex(self.driver).search(query_embedding, top_k)
+        return self._scan_similar_quotes(query_embedding, top_k)
+    
+    def _scan_similar_quotes(self, query_embedding: np.ndarray, top_k: int) -> List[Dict]:
+        """Score a sample of quotes fetched from Neo4j - undirected relationship"""
         
         # Undirected match works both ways
         cypher = """
@@ -58,7 +275,7 @@ class RAGChatbot:
         OPTIONAL MATCH (q)-[:FROM]->(w:Work)
         WHERE q.embedding IS NOT NULL
         RETURN elementId(q) as id, 
-            coalesce(q.short_text, q.full_text, q.text) as text,
+            coalesce(q.short_text, q.full_text, q.text_clean, q.text) as text,
             q.full_text as full_text,
             q.embedding as embedding, 
             coalesce(a.name, 'Unknown') as author,
@@ -76,6 +293,7 @@ class RAGChatbot:
             similarity = self.embedder.cosine_similarity(query_embedding, quote_embedding)
             
             similarities.append({
+                'id': quote.get('id'),
                 'text': quote.get('text') or quote.get('full_text', ''),
                 'author': quote.get('author', 'Unknown'),
                 'work': quote.get('work'),  # ← Use .get() method to safely handle NULL
@@ -85,9 +303,9 @@ class RAGChatbot:
         similarities.sort(key=lambda x: x['similarity'], reverse=True)
         return similarities[:top_k]
     
-    def generate_response(self, query: str, context_quotes: List[Dict], 
-                         username: str = None, accent: str = "american") -> str:
-        """Generate response using LLM with retrieved context"""
+    def build_prompt(self, query: str, context_quotes: List[Dict],
+                     username: str = None, accent: str = "american") -> str:
+        """Build the LLM prompt from the query and retrieved context"""
         
         # Build context
         context = "Relevant quotes:\n\n"
@@ -126,6 +344,13 @@ Task: Respond to the user's query using the quotes above.
 - Be {style}
 
 Response:"""
+        return prompt
+    
+    def generate_response(self, query: str, context_quotes: List[Dict], 
+                         username: str = None, accent: str = "american") -> str:
+        """Generate response using LLM with retrieved context"""
+        
+        prompt = self.build_prompt(query, context_quotes, username, accent)
         
         # Generate with LLM
         response = self.llm.generate(prompt, max_tokens=150, temperature=0.7)
@@ -136,17 +361,123 @@ Response:"""
         
         similar_quotes = self.retrieve_similar_quotes(user_query, top_k=3)
         
-        if not similar_quotes or similar_quotes[0]['similarity'] < 0.3:
+        if weak_match(similar_quotes):
             return {
                 'response': f"I couldn't find relevant quotes about that. Try asking about something else!",
                 'quotes': [],
                 'method': 'fallback'
             }
         
-        response = self.generate_response(user_query, similar_quotes, username, accent)
+        # Paraphrases with the same context reuse an earlier answer
+        cache_key = response_cache_key(similar_quotes, username, accent)
+        query_embedding = self.embed_query(user_query)
+        response = response_cache.get(cache_key, query_embedding)
+        if response is None:
+            response = self.generate_response(user_query, similar_quotes, username, accent)
+            response_cache.set(cache_key, query_embedding, response)
+        
+        return {
+            'response': response,
+            'quotes': similar_quotes,
+            'method': 'rag'
+        }
+    
+    async def aquery(self, user_query: str, username: str = None, accent: str = "american") -> Dict:
+        """Async RAG pipeline for ASGI views; same result as query()"""
+        
+        similar_quotes = await self.aretrieve_similar_quotes(user_query, top_k=3)
+        
+        if weak_match(similar_quotes):
+            return {
+                'response': "I couldn't find relevant quotes about that. Try asking about something else!",
+                'quotes': [],
+                'method': 'fallback'
+            }
+        
+        cache_key = response_cache_key(similar_quotes, username, accent)
+        query_embedding = await self.aembed_query(user_query)
+        response = response_cache.get(cache_key, query_embedding)
+        if response is None:
+            prompt = self.build_prompt(user_query, similar_quotes, username, accent)
+            response = (await self.llm.agenerate(prompt, max_tokens=150, temperature=0.7)).strip()
+            response_cache.set(cache_key, query_embedding, response)
         
         return {
             'response': response,
             'quotes': similar_quotes,
             'method': 'rag'
-        }
\ No newline at end of file
+        }
+    
+    def query_stream(self, user_query: str, username: str = None,
+                     accent: str = "american") -> Iterator[Dict]:
+        """
+        Streaming RAG pipeline
+        
+        Yields events as dicts with 'event' and 'data' keys: one 'quotes'
+        event as soon as retrieval finishes, a 'token' event per generated
+        chunk, then a final 'done' event with the full response.
+        """
+        
+        similar_quotes = self.retrieve_similar_quotes(user_query, top_k=3)
+        
+        if weak_match(similar_quotes):
+            yield {'event': 'quotes', 'data': {'quotes': [], 'method': 'fallback'}}
+            yield {'event': 'done', 'data': {
+                'response': "I couldn't find relevant quotes about that. Try asking about something else!",
+                'method': 'fallback'
+            }}
+            return
+        
+        yield {'event': 'quotes', 'data': {'quotes': similar_quotes, 'method': 'rag'}}
+        
+        cache_key = response_cache_key(similar_quotes, username, accent)
+        query_embedding = self.embed_query(user_query)
+        response = response_cache.get(cache_key, query_embedding)
+        if response is not None:
+            yield {'event': 'token', 'data': {'token': response}}
+            yield {'event': 'done', 'data': {'response': response, 'method': 'rag'}}
+            return
+        
+        prompt = self.build_prompt(user_query, similar_quotes, username, accent)
+        chunks = []
+        for token in self.llm.generate_stream(prompt, max_tokens=150, temperature=0.7):
+            chunks.append(token)
+            yield {'event': 'token', 'data': {'token': token}}
+        
+        response = ''.join(chunks).strip()
+        response_cache.set(cache_key, query_embedding, response)
+        yield {'event': 'done', 'data': {'response': response, 'method': 'rag'}}
+    
+    async def aquery_stream(self, user_query: str, username: str = None,
+                            accent: str = "american") -> AsyncIterator[Dict]:
+        """Async query_stream for ASGI views; tokens come from the async LLM client"""
+        
+        similar_quotes = await self.aretrieve_similar_quotes(user_query, top_k=3)
+        
+        if weak_match(similar_quotes):
+            yield {'event': 'quotes', 'data': {'quotes': [], 'method': 'fallback'}}
+            yield {'event': 'done', 'data': {
+                'response': "I couldn't find relevant quotes about that. Try asking about something else!",
+                'method': 'fallback'
+            }}
+            return
+        
+        yield {'event': 'quotes', 'data': {'quotes': similar_quotes, 'method': 'rag'}}
+        
+        cache_key = response_cache_key(similar_quotes, username, accent)
+        query_embedding = await self.aembed_query(user_query)
+        response = response_cache.get(cache_key, query_embedding)
+        if response is not None:
+            yield {'event': 'token', 'data': {'token': response}}
+            yield {'event': 'done', 'data': {'response': response, 'method': 'rag'}}
+            return
+        
+        prompt = self.build_prompt(user_query, similar_quotes, username, accent)
+        chunks = []
+        async for token in self.llm.agenerate_stream(prompt, max_tokens=150, temperature=0.7):
+            chunks.append(token)
+            yield {'event': 'token', 'data': {'token': token}}
+        
+        response = ''.join(chunks).strip()
+        response_cache.set(cache_key, query_embedding, response)
+        yield {'event': 'done', 'data': {'response': response, 'method': 'rag'}}
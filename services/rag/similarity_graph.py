@@ -0,0 +1,242 @@
+"""
+Precomputed quote and author similarity graph (SIMILAR_TO relationships)
+"""
+import argparse
+import math
+import os
+import time
+from collections import defaultdict
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from .vector_index import QuoteVectorIndex, EMBEDDING_STORE_PATH, store_exists
+
+# Neighbours kept per quote, and per author after aggregation
+DEFAULT_QUOTE_K = 10
+DEFAULT_AUTHOR_K = 10
+
+# Memory for the scores of one block of query rows; the block size is
+# derived from it so the kNN pass fits whatever the corpus size
+KNN_MEMORY_BUDGET_MB = int(os.getenv('KNN_MEMORY_BUDGET_MB', '256'))
+
+# Bytes held per score while a block is ranked: the float32 scores, their
+# negation and argpartition's int64 indices
+KNN_BYTES_PER_SCORE = 16
+
+# Quote edges below this cosine similarity are not written
+DEFAULT_MIN_SCORE = 0.5
+
+# Replaces a quote's outgoing edges, so reruns do not accumulate stale neighbours
+WRITE_QUOTE_EDGES_CYPHER = """
+UNWIND $rows AS row
+MATCH (q:Quote) WHERE elementId(q) = row.id
+CALL {
+    WITH q
+    MATCH (q)-[old:SIMILAR_TO]->(:Quote)
+    DELETE old
+}
+WITH q, row
+UNWIND row.neighbours AS n
+MATCH (q2:Quote) WHERE elementId(q2) = n.id
+CREATE (q)-[:SIMILAR_TO {score: n.score, rank: n.rank}]->(q2)
+"""
+
+WRITE_AUTHOR_EDGES_CYPHER = """
+UNWIND $rows AS row
+MATCH (a:Author {name: row.author})
+CALL {
+    WITH a
+    MATCH (a)-[old:SIMILAR_TO]->(:Author)
+    DELETE old
+}
+WITH a, row
+UNWIND row.neighbours AS n
+MATCH (a2:Author {name: n.author})
+CREATE (a)-[:SIMILAR_TO {score: n.score, rank: n.rank, quotes: n.quotes}]->(a2)
+"""
+
+
+def knn_block_size(n: int, budget_mb: int = KNN_MEMORY_BUDGET_MB) -> int:
+    """Query rows per block whose n scores each fit in budget_mb (at least 1)
+
+    256 MB gives about 110 rows at 150k quotes.
+    """
+    return max(1, budget_mb * 1024 * 1024 // (KNN_BYTES_PER_SCORE * max(n, 1)))
+
+
+def knn_graph(matrix: np.ndarray, k: int = DEFAULT_QUOTE_K,
+              block_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact k nearest neighbours of every row, excluding the row itself
+
+    Rows must be unit length, so the dot product is the cosine similarity.
+    Scores are computed one block of query rows at a time against the full
+    matrix, which bounds memory to block_size * n scores.
+
+    Args:
+        block_size: Query rows per block (default: knn_block_size(n))
+
+    Returns:
+        (neighbour rows, similarities), both (n, k), best match first
+    """
+    n = len(matrix)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+    block_size = block_size or knn_block_size(n)
+
+    neighbours = np.empty((n, k), dtype=np.int64)
+    similarities = np.empty((n, k), dtype=np.float32)
+    full = np.asarray(matrix, dtype=np.float32)
+    for start in range(0, n, block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        scores = block @ full.T
+        local = np.arange(len(block))
+        scores[local, start + local] = -np.inf
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbours[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        similarities[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbours, similarities
+
+
+def quote_edges(index: QuoteVectorIndex, neighbours: np.ndarray, similarities: np.ndarray,
+                min_score: float = DEFAULT_MIN_SCORE) -> List[Dict]:
+    """Per-quote neighbour lists in WRITE_QUOTE_EDGES_CYPHER row format"""
+    rows = []
+    for row in range(len(index)):
+        kept = similarities[row] >= min_score
+        rows.append({
+            'id': index.ids[row],
+            'neighbours': [
+                {'id': index.ids[j], 'score': float(s), 'rank': rank}
+                for rank, (j, s) in enumerate(zip(neighbours[row][kept], similarities[row][kept]), 1)
+            ],
+        })
+    return rows
+
+
+def author_edges(index: QuoteVectorIndex, neighbours: np.ndarray, similarities: np.ndarray,
+                 k: int = DEFAULT_AUTHOR_K, min_score: float = DEFAULT_MIN_SCORE) -> List[Dict]:
+    """
+    Aggregate quote edges into author neighbour lists
+
+    The score of (a, b) sums the similarities of every edge from a quote by
+    a to a quote by b, divided by sqrt(quotes(a) * quotes(b)) so prolific
+    authors do not neighbour everyone.
+
+    Returns:
+        Rows in WRITE_AUTHOR_EDGES_CYPHER format
+    """
+    authors = [q['author'] for q in index.quotes]
+    quote_counts = defaultdict(int)
+    for author in authors:
+        quote_counts[author] += 1
+
+    totals = defaultdict(lambda: defaultdict(float))
+    counts = defaultdict(lambda: defaultdict(int))
+    for row, author in enumerate(authors):
+        if author == 'Unknown':
+            continue
+        for j, score in zip(neighbours[row], similarities[row]):
+            other = authors[j]
+            if other == author or other == 'Unknown' or score < min_score:
+                continue
+            totals[author][other] += float(score)
+            counts[author][other] += 1
+
+    # Every author gets a row, so one with no neighbours left loses its old edges
+    rows = []
+    for author in quote_counts:
+        if author == 'Unknown':
+            continue
+        scored = sorted(
+            ((other, total / math.sqrt(quote_counts[author] * quote_counts[other]))
+             for other, total in totals[author].items()),
+            key=lambda item: item[1], reverse=True,
+        )[:k]
+        rows.append({
+            'author': author,
+            'neighbours': [
+                {'author': other, 'score': score, 'rank': rank, 'quotes': counts[author][other]}
+                for rank, (other, score) in enumerate(scored, 1)
+            ],
+        })
+    return rows
+
+
+def write_edges(driver, cypher: str, rows: List[Dict], batch_size: int = 500,
+                database: Optional[str] = None) -> int:
+    """Write neighbour rows in batched UNWIND transactions
+
+    Returns:
+        Number of edges written
+    """
+    written = 0
+    with driver.session(database=database) as session:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            session.execute_write(lambda tx: tx.run(cypher, rows=batch).consume())
+            written += sum(len(row['neighbours']) for row in batch)
+    return written
+
+
+def build_similarity_graph(driver, index: QuoteVectorIndex, quote_k: int = DEFAULT_QUOTE_K,
+                           author_k: int = DEFAULT_AUTHOR_K, min_score: float = DEFAULT_MIN_SCORE,
+                           block_size: Optional[int] = None, batch_size: int = 500,
+                           database: Optional[str] = None) -> Dict:
+    """
+    Compute quote neighbours and write quote and author SIMILAR_TO edges
+
+    Returns:
+        Dict with quote and author edge counts and timings
+    """
+    start = time.perf_counter()
+    neighbours, similarities = knn_graph(index.matrix, quote_k, block_size)
+    knn_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    quote_count = write_edges(driver, WRITE_QUOTE_EDGES_CYPHER,
+                              quote_edges(index, neighbours, similarities, min_score),
+                              batch_size, database)
+    author_count = write_edges(driver, WRITE_AUTHOR_EDGES_CYPHER,
+                               author_edges(index, neighbours, similarities, author_k, min_score),
+                               batch_size, database)
+    return {
+        'quotes': len(index),
+        'quote_edges': quote_count,
+        'author_edges': author_count,
+        'knn_s': knn_time,
+        'write_s': time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    from services.neo4j_driver import close_shared_drivers, get_shared_driver
+
+    parser = argparse.ArgumentParser(description='Write quote and author SIMILAR_TO edges')
+    parser.add_argument('--store', default=EMBEDDING_STORE_PATH,
+                        help='Embedding store base path (falls back to Neo4j if missing)')
+    parser.add_argument('--k', type=int, default=DEFAULT_QUOTE_K, help='Neighbours per quote')
+    parser.add_argument('--author-k', type=int, default=DEFAULT_AUTHOR_K, help='Neighbours per author')
+    parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE,
+                        help='Minimum cosine similarity of a quote edge')
+    parser.add_argument('--block-size', type=int,
+                        help=f'Query rows per matrix multiply (default: fit {KNN_MEMORY_BUDGET_MB} MB)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows per write transaction')
+    args = parser.parse_args()
+
+    driver = get_shared_driver()
+    try:
+        if store_exists(args.store):
+            index = QuoteVectorIndex.from_store(args.store)
+        else:
+            index = QuoteVectorIndex.from_neo4j(driver)
+        stats = build_similarity_graph(driver, index, args.k, args.author_k, args.min_score,
+                                       args.block_size, args.batch_size)
+        print(f"✅ {stats['quote_edges']} quote and {stats['author_edges']} author SIMILAR_TO edges "
+              f"over {stats['quotes']} quotes (kNN {stats['knn_s']:.1f}s, write {stats['write_s']:.1f}s)")
+    finally:
+        close_shared_drivers()
@@ -0,0 +1,436 @@
+"""
+In-memory vector index for semantic quote retrieval
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections.abc import Sequence
+import numpy as np
+from typing import List, Dict, Optional, Iterable
+
+# Base path of the on-disk store: <base>.manifest.json names the current
+# version, whose files live in the <base>.v<version> directory
+EMBEDDING_STORE_PATH = os.getenv('EMBEDDING_STORE_PATH', 'data/embeddings/quotes')
+
+# Per-row metadata of the store, each a column of strings
+STORE_COLUMNS = ('ids', 'text', 'author', 'work')
+
+# One row per quote; a quote with several authors keeps the first one
+LOAD_QUOTES_CYPHER = """
+MATCH (q:Quote)-[:SAID]-(a:Author)
+WHERE q.embedding IS NOT NULL
+OPTIONAL MATCH (q)-[:FROM]->(w:Work)
+WITH q, head(collect(DISTINCT a.name)) AS author, head(collect(w.title)) AS work
+RETURN elementId(q) AS id,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) AS text,
+       q.embedding AS embedding,
+       coalesce(author, 'Unknown') AS author,
+       work
+"""
+
+
+# Neo4j native vector index on Quote.embedding
+NEO4J_VECTOR_INDEX = 'quoteEmbeddingIndex'
+
+CREATE_VECTOR_INDEX_CYPHER = """
+CREATE VECTOR INDEX quoteEmbeddingIndex IF NOT EXISTS
+FOR (q:Quote) ON (q.embedding)
+OPTIONS {indexConfig: {
+    `vector.dimensions`: $dimensions,
+    `vector.similarity_function`: 'cosine'
+}}
+"""
+
+EMBEDDING_DIMENSIONS_CYPHER = """
+MATCH (q:Quote)
+WHERE q.embedding IS NOT NULL
+RETURN size(q.embedding) AS dimensions
+LIMIT 1
+"""
+
+# Only the top-k rows cross the wire; embeddings stay in the database
+VECTOR_QUERY_CYPHER = """
+CALL db.index.vector.queryNodes($index, $k, $embedding)
+YIELD node AS q, score
+MATCH (q)-[:SAID]-(a:Author)
+OPTIONAL MATCH (q)-[:FROM]->(w:Work)
+WITH q, score, head(collect(DISTINCT a.name)) AS author, head(collect(w.title)) AS work
+RETURN elementId(q) AS id,
+       coalesce(q.short_text, q.full_text, q.text_clean, q.text) AS text,
+       coalesce(author, 'Unknown') AS author,
+       work,
+       score
+ORDER BY score DESC
+"""
+
+
+def store_fingerprint(ids: Iterable[str], model: Optional[str], dim: int) -> str:
+    """Hash of the row ids, model and dimensions, which indexes built over
+    the rows (IVF lists, KNN graphs) must match to be reused"""
+    digest = hashlib.sha256(f"{model}\n{dim}\n".encode("utf-8"))
+    for quote_id in ids:
+        digest.update(quote_id.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length in place (zero rows are left as zeros)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class StringColumn(Sequence):
+    """Read-only strings over an int64 offsets array and a UTF-8 blob
+
+    String i is blob[offsets[i]:offsets[i + 1]]. Both parts are mapped from
+    disk, so every process reading the same store shares them through the
+    page cache, and a string is only decoded when it is looked up.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+    @staticmethod
+    def write(path: str, strings: Iterable[str]):
+        """Write <path>.off and <path>.utf8"""
+        offsets = [0]
+        with open(f"{path}.utf8", "wb") as f:
+            for value in strings:
+                data = value.encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        np.asarray(offsets, dtype=np.int64).tofile(f"{path}.off")
+
+    @classmethod
+    def open(cls, path: str) -> "StringColumn":
+        offsets = np.memmap(f"{path}.off", dtype=np.int64, mode='r')
+        # np.memmap cannot map an empty file
+        if os.path.getsize(f"{path}.utf8") == 0:
+            blob = np.zeros(0, dtype=np.uint8)
+        else:
+            blob = np.memmap(f"{path}.utf8", dtype=np.uint8, mode='r')
+        return cls(offsets, blob)
+
+
+class StoreQuotes(Sequence):
+    """Per-row quote metadata dicts, decoded from mapped columns on access"""
+
+    def __init__(self, text: StringColumn, author: StringColumn, work: StringColumn):
+        self.text = text
+        self.author = author
+        self.work = work
+
+    def __len__(self):
+        return len(self.text)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        # The store cannot tell a missing work from an empty title
+        return {'text': self.text[i], 'author': self.author[i], 'work': self.work[i] or None}
+
+
+class QuoteVectorIndex:
+    """Exact cosine search over a contiguous, pre-normalized float32 matrix"""
+
+    def __init__(self, ids: List[str], matrix: np.ndarray, quotes: List[Dict],
+                 normalized: bool = False, model: Optional[str] = None,
+                 fingerprint: Optional[str] = None):
+        """
+        Args:
+            ids: Quote element ids, one per matrix row
+            matrix: (n, dim) embedding matrix
+            quotes: Per-row metadata dicts with text, author and work
+            normalized: Skip normalization if rows are already unit length
+            model: Embedding model, if known
+            fingerprint: store_fingerprint of the rows, if already known
+        """
+        if len(ids) != len(matrix) or len(quotes) != len(matrix):
+            raise ValueError("ids, matrix and quotes must have the same length")
+
+        self.ids = ids if isinstance(ids, StringColumn) else np.asarray(ids, dtype=object)
+        self.quotes = quotes
+        if normalized:
+            self.matrix = matrix
+        else:
+            self.matrix = normalize_rows(np.ascontiguousarray(matrix, dtype=np.float32))
+        self.model = model
+        self._fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = store_fingerprint(self.ids, self.model, self.dim)
+        return self._fingerprint
+
+    @classmethod
+    def from_neo4j(cls, driver, database: Optional[str] = None) -> "QuoteVectorIndex":
+        """Load every quote embedding from Neo4j"""
+        ids, vectors, quotes = [], [], []
+        with driver.session(database=database) as session:
+            for record in session.run(LOAD_QUOTES_CYPHER):
+                ids.append(record['id'])
+                vectors.append(np.asarray(record['embedding'], dtype=np.float32))
+                quotes.append({
+                    'text': record['text'] or '',
+                    'author': record['author'],
+                    'work': record['work'],
+                })
+
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return cls(ids, matrix, quotes)
+
+    @classmethod
+    def from_store(cls, path: str = EMBEDDING_STORE_PATH) -> "QuoteVectorIndex":
+        """Map the current version of an on-disk embedding store read-only
+
+        The matrix and the metadata columns are np.memmaps, so every
+        process that opens the same store shares one copy through the page
+        cache.
+        """
+        manifest = read_store_manifest(path)
+        directory = store_version_dir(path, manifest['version'])
+        count, dim = manifest['count'], manifest['dim']
+        if count == 0:
+            matrix = np.zeros((0, dim), dtype=np.float32)
+        else:
+            matrix = np.memmap(os.path.join(directory, 'embeddings.f32'),
+                               dtype=np.float32, mode='r', shape=(count, dim))
+        columns = {name: StringColumn.open(os.path.join(directory, name)) for name in STORE_COLUMNS}
+        quotes = StoreQuotes(columns['text'], columns['author'], columns['work'])
+        return cls(columns['ids'], matrix, quotes, normalized=True,
+                   model=manifest['model'], fingerprint=manifest.get('fingerprint'))
+
+    def top_k(self, query_embedding: np.ndarray, top_k: int = 5):
+        """
+        Find the rows most similar to a query vector
+
+        Returns:
+            (row indices, cosine similarities), best match first
+        """
+        if len(self) == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Query has {query.shape[0]} dimensions, index has {self.dim}")
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self.matrix @ (query / norm)
+        k = min(top_k, len(scores))
+        rows = np.argpartition(-scores, k - 1)[:k]
+        rows = rows[np.argsort(-scores[rows])]
+        return rows, scores[rows]
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict]:
+        """Return the top_k quotes in the same format as RAGChatbot retrieval"""
+        rows, scores = self.top_k(query_embedding, top_k)
+        return self.results(rows, scores)
+
+    def results(self, rows, scores) -> List[Dict]:
+        """Turn row indices and scores into retrieval result dicts"""
+        return [
+            {
+                'id': self.ids[row],
+                'text': self.quotes[row]['text'],
+                'author': self.quotes[row]['author'],
+                'work': self.quotes[row]['work'],
+                'similarity': float(score),
+            }
+            for row, score in zip(rows, scores)
+        ]
+
+
+def ensure_neo4j_vector_index(driver, dimensions: Optional[int] = None,
+                              database: Optional[str] = None) -> Optional[int]:
+    """
+    Create the Quote.embedding vector index if it does not exist
+
+    Args:
+        dimensions: Embedding size; detected from a stored embedding if omitted
+
+    Returns:
+        The index dimensions, or None if no quote has an embedding yet
+    """
+    with driver.session(database=database) as session:
+        if dimensions is None:
+            record = session.run(EMBEDDING_DIMENSIONS_CYPHER).single()
+            if record is None:
+                return None
+            dimensions = record['dimensions']
+        # Index options cannot be parameterized
+        session.run(CREATE_VECTOR_INDEX_CYPHER.replace('$dimensions', str(int(dimensions))))
+    return dimensions
+
+
+class Neo4jVectorIndex:
+    """Top-k search through the Neo4j native vector index"""
+
+    def __init__(self, driver, index_name: str = NEO4J_VECTOR_INDEX, database: Optional[str] = None):
+        self.driver = driver
+        self.index_name = index_name
+        self.database = database
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict]:
+        """Return the top_k quotes in the same format as RAGChatbot retrieval"""
+        embedding = np.asarray(query_embedding, dtype=np.float32).ravel().tolist()
+        with self.driver.session(database=self.database) as session:
+            records = list(session.run(
+                VECTOR_QUERY_CYPHER, index=self.index_name, k=top_k, embedding=embedding
+            ))
+        return [
+            {
+                'id': r['id'],
+                'text': r['text'] or '',
+                'author': r['author'],
+                'work': r['work'],
+                # Neo4j reports cosine as (1 + cos) / 2; map back to raw cosine
+                'similarity': 2 * float(r['score']) - 1,
+            }
+            for r in records
+        ]
+
+
+def store_manifest_path(path: str = EMBEDDING_STORE_PATH) -> str:
+    return f"{path}.manifest.json"
+
+
+def store_version_dir(path: str, version: int) -> str:
+    return f"{path}.v{version}"
+
+
+def read_store_manifest(path: str = EMBEDDING_STORE_PATH) -> Dict:
+    """The manifest of the current store version: version, count, dim, model and fingerprint"""
+    with open(store_manifest_path(path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def store_exists(path: str = EMBEDDING_STORE_PATH) -> bool:
+    return os.path.exists(store_manifest_path(path))
+
+
+def write_embedding_store(path: str, rows: Iterable[Dict], model: Optional[str] = None) -> int:
+    """
+    Stream embeddings into a new version of an on-disk store
+
+    The version directory holds embeddings.f32, a raw row-major float32
+    matrix of unit-length rows (row i starts at byte i * dim * 4), and a
+    StringColumn per entry of STORE_COLUMNS, in row order. It is published
+    by atomically replacing <path>.manifest.json, so a reader sees either
+    the old version or the new one, never a mix. The previous version is
+    kept for readers that read the old manifest but have not opened its
+    files yet; older ones are removed (processes that already mapped them
+    keep reading their pages).
+
+    Args:
+        rows: dicts with id, embedding, text, author and work
+
+    Returns:
+        Number of rows written
+    """
+    previous = read_store_manifest(path)['version'] if store_exists(path) else None
+    version = 0 if previous is None else previous + 1
+    directory = store_version_dir(path, version)
+    # Left behind by a write that failed before publishing
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+    columns = {name: [] for name in STORE_COLUMNS}
+    dim = None
+    with open(os.path.join(directory, 'embeddings.f32'), "wb") as f:
+        for row in rows:
+            vector = np.asarray(row['embedding'], dtype=np.float32)
+            if dim is None:
+                dim = vector.shape[0]
+            elif vector.shape[0] != dim:
+                raise ValueError(f"Embedding for {row['id']} has {vector.shape[0]} dimensions, expected {dim}")
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+            f.write(vector.tobytes())
+            columns['ids'].append(row['id'])
+            columns['text'].append(row['text'] or '')
+            columns['author'].append(row['author'] or '')
+            columns['work'].append(row['work'] or '')
+
+    for name, values in columns.items():
+        StringColumn.write(os.path.join(directory, name), values)
+
+    manifest = {'version': version, 'count': len(columns['ids']), 'dim': dim or 0, 'model': model,
+                'fingerprint': store_fingerprint(columns['ids'], model, dim or 0)}
+    with open(f"{store_manifest_path(path)}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(f"{store_manifest_path(path)}.tmp", store_manifest_path(path))
+
+    for old in glob.glob(f"{glob.escape(path)}.v*"):
+        suffix = old[len(path) + 2:]
+        if suffix.isdigit() and int(suffix) < version - 1:
+            shutil.rmtree(old, ignore_errors=True)
+    return manifest['count']
+
+
+def export_embedding_store(driver, path: str = EMBEDDING_STORE_PATH, model: Optional[str] = None,
+                           database: Optional[str] = None) -> int:
+    """Stream every quote embedding from Neo4j into an on-disk store"""
+    with driver.session(database=database) as session:
+        result = session.run(LOAD_QUOTES_CYPHER)
+        return write_embedding_store(path, (record.data() for record in result), model)
+
+
+# Process-wide index, loaded on first use
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def get_shared_index(driver, database: Optional[str] = None,
+                     store_path: str = EMBEDDING_STORE_PATH) -> QuoteVectorIndex:
+    """Return the process-wide index
+
+    On first call, maps the on-disk store if one exists and otherwise loads
+    the embeddings from Neo4j.
+    """
+    global _shared_index
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                if store_exists(store_path):
+                    index = QuoteVectorIndex.from_store(store_path)
+                    source = store_path
+                else:
+                    index = QuoteVectorIndex.from_neo4j(driver, database)
+                    source = "Neo4j"
+                print(f"✓ Loaded vector index from {source}: {len(index)} quotes, dim {index.dim}")
+                _shared_index = index
+    return _shared_index
+
+
+def reset_shared_index():
+    """Drop the process-wide index so the next query reloads it"""
+    global _shared_index
+    with _shared_index_lock:
+        _shared_index = None